@@ -2,11 +2,13 @@
 Módulo del agente inteligente.
 """
 from agent.llm_client import LLMClient, get_llm_client
+from agent.resilience import LLMUnavailableError
 from agent.rag_agent import RAGAgent, get_rag_agent
 
 __all__ = [
     "LLMClient",
     "get_llm_client",
+    "LLMUnavailableError",
     "RAGAgent",
     "get_rag_agent",
 ]
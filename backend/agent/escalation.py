@@ -0,0 +1,180 @@
+"""
+Clasificador de escalado previo al LLM.
+
+Decide con la consulta del usuario y las puntuaciones de la búsqueda si el
+ticket va a acabar escalado de todas formas (consultas legales, sin
+documentación relevante). En ese caso se escala directamente y se ahorra la
+búsqueda y/o la llamada al LLM. También se usa para revisar la respuesta
+generada.
+"""
+from typing import Dict, Iterable, List, Optional
+import re
+import threading
+import unicodedata
+import logging
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Raíces de la consulta que aseguran el escalado (se comparan sin tildes y
+# como inicio de palabra: "sancion" cubre sanciones, sancionado...).
+# "legal" no está: "¿es legal volar en la playa?" es una consulta normativa.
+QUERY_LEGAL_KEYWORDS = [
+    "demand",
+    "denunci",
+    "accident",
+    "sancion",
+    "multa",
+    "multad",
+    "abogad",
+    "juicio",
+    "recurso de alzada",
+]
+
+# Raíces de la respuesta generada que indican un caso legal o complejo
+ANSWER_LEGAL_KEYWORDS = ["legal", "ilegal", "demand", "accident", "sancion", "multa", "multad"]
+
+# Frases de la respuesta que indican que el agente no pudo resolver
+NO_INFO_PHRASES = ["no encuentro", "no tengo informacion"]
+OFFICIAL_CHECK_PHRASES = ["consulta con aesa", "contacta con"]
+
+REASON_LEGAL = "Consulta de naturaleza legal o compleja"
+REASON_NO_SOURCES = "No se encontró información relevante en la documentación"
+REASON_LOW_RELEVANCE = "La documentación encontrada no es suficientemente relevante"
+REASON_NO_INFO = "El agente no pudo encontrar información específica"
+REASON_OFFICIAL_CHECK = "La consulta requiere verificación oficial"
+
+
+def fold_accents(text: str) -> str:
+    """Pasa a minúsculas y elimina tildes y diacríticos ("Sanción" -> "sancion")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class KeywordMatcher:
+    """
+    Buscador de múltiples términos con una única expresión regular precompilada.
+
+    Los términos se pliegan (minúsculas, sin tildes) y se buscan como raíces:
+    anclados al inicio de una palabra y con cualquier terminación ("multa"
+    encuentra "multas"; "denunci", "denunciaron"), en una sola pasada sobre
+    el texto. El ancla inicial evita falsos positivos como "perjuicio".
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        folded = sorted({fold_accents(term) for term in terms}, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in folded) + r")\w*")
+
+    def search(self, text: str) -> Optional[str]:
+        """Retorna el primer término encontrado o None."""
+        match = self._pattern.search(fold_accents(text))
+        return match.group(0) if match else None
+
+
+class EscalationClassifier:
+    """Reglas de escalado antes y después de generar la respuesta."""
+
+    def __init__(self):
+        self.query_legal = KeywordMatcher(QUERY_LEGAL_KEYWORDS)
+        self.answer_legal = KeywordMatcher(ANSWER_LEGAL_KEYWORDS)
+        self.no_info = KeywordMatcher(NO_INFO_PHRASES)
+        self.official_check = KeywordMatcher(OFFICIAL_CHECK_PHRASES)
+
+        self._lock = threading.Lock()
+        self.fast_path_by_reason: Dict[str, int] = {}
+        self.saved_tokens = 0.0
+        self.saved_seconds = 0.0
+        self._generations = 0
+        self._avg_tokens = 0.0
+        self._avg_seconds = 0.0
+        self._retrievals = 0
+        self._avg_retrieval_seconds = 0.0
+
+    def check_query(self, query: str) -> Optional[str]:
+        """
+        Comprueba la consulta antes de buscar en los documentos.
+
+        Returns:
+            Razón del escalado o None si hay que seguir con el flujo normal
+        """
+        term = self.query_legal.search(query)
+        if term:
+            logger.info(f"⚡ Escalado previo al LLM: término '{term}' en la consulta")
+            return REASON_LEGAL
+        return None
+
+    def check_retrieval(self, sources: List[Dict]) -> Optional[str]:
+        """
+        Comprueba las puntuaciones de la búsqueda antes de llamar al LLM.
+
+        Returns:
+            Razón del escalado o None si hay que llamar al LLM
+        """
+        if not sources:
+            return REASON_NO_SOURCES
+
+        min_relevance = settings.ESCALATION_MIN_RELEVANCE
+        if min_relevance is not None and max(s["relevance"] for s in sources) < min_relevance:
+            return REASON_LOW_RELEVANCE
+
+        return None
+
+    def check_answer(self, content: str) -> Optional[str]:
+        """
+        Revisa la respuesta generada.
+
+        Returns:
+            Razón del escalado o None
+        """
+        if self.no_info.search(content):
+            return REASON_NO_INFO
+
+        if self.official_check.search(content):
+            return REASON_OFFICIAL_CHECK
+
+        if self.answer_legal.search(content):
+            return REASON_LEGAL
+
+        return None
+
+    def observe_generation(self, tokens: int, seconds: float) -> None:
+        """Registra el coste de una respuesta generada (para estimar lo ahorrado)."""
+        with self._lock:
+            self._generations += 1
+            self._avg_tokens += (tokens - self._avg_tokens) / self._generations
+            self._avg_seconds += (seconds - self._avg_seconds) / self._generations
+
+    def observe_retrieval(self, seconds: float) -> None:
+        """Registra la duración de una búsqueda en los documentos."""
+        with self._lock:
+            self._retrievals += 1
+            self._avg_retrieval_seconds += (seconds - self._avg_retrieval_seconds) / self._retrievals
+
+    def observe_fast_path(self, reason: str, skipped_retrieval: bool = False) -> None:
+        """
+        Registra un escalado sin LLM.
+
+        Se estima como ahorro el coste medio de una respuesta generada, más el
+        tiempo medio de búsqueda si se escaló antes de buscar.
+        """
+        with self._lock:
+            self.fast_path_by_reason[reason] = self.fast_path_by_reason.get(reason, 0) + 1
+            self.saved_tokens += self._avg_tokens
+            self.saved_seconds += self._avg_seconds
+            if skipped_retrieval:
+                self.saved_seconds += self._avg_retrieval_seconds
+
+    def get_stats(self) -> Dict:
+        """Retorna los escalados por la vía rápida y el ahorro estimado."""
+        with self._lock:
+            return {
+                "fast_path_escalations": sum(self.fast_path_by_reason.values()),
+                "by_reason": dict(self.fast_path_by_reason),
+                "estimated_tokens_saved": round(self.saved_tokens),
+                "estimated_seconds_saved": round(self.saved_seconds, 3),
+                "avg_generation_tokens": round(self._avg_tokens, 1),
+                "avg_generation_seconds": round(self._avg_seconds, 3),
+                "avg_retrieval_seconds": round(self._avg_retrieval_seconds, 3),
+            }
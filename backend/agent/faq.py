@@ -0,0 +1,277 @@
+"""
+Vía rápida de preguntas frecuentes (FAQ) curadas.
+
+Buena parte del tráfico son las mismas preguntas de A2 (distancias, pesos,
+examen). Los administradores mantienen respuestas aprobadas en faq_entries y,
+si la consulta coincide con confianza, se responde con ese texto y sus
+fuentes sin pasar por la búsqueda RAG ni por el LLM.
+
+La coincidencia se busca en dos pasos:
+1. Léxica: la consulta normalizada (sin tildes, signos ni palabras vacías)
+   es igual a la de una pregunta curada.
+2. Semántica: la pregunta más parecida en la colección de ChromaDB
+   "faq_entries" supera FAQ_MIN_SIMILARITY y la consulta contiene las claves
+   léxicas de la FAQ (así "¿a qué distancia de personas?" no responde con la
+   FAQ de la distancia a aeropuertos).
+"""
+from typing import Dict, Optional
+import re
+import threading
+import time
+import logging
+
+from agent.escalation import fold_accents
+from core.config import settings
+from db import SessionLocal
+from db.repository import FAQRepository
+from rag import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+FAQ_COLLECTION = "faq_entries"
+
+# Palabras vacías que no cambian el sentido de una pregunta
+STOPWORDS = {
+    "a", "al", "de", "del", "el", "la", "los", "las", "lo", "un", "una", "unos",
+    "unas", "y", "o", "en", "que", "se", "me", "mi", "mis", "es", "por", "para",
+    "con", "su", "sus", "le", "les", "como", "cual", "cuales", "hay", "puedo",
+    "debo", "tengo", "necesito", "hola", "favor", "gracias",
+}
+
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize_question(text: str) -> str:
+    """Clave léxica de una pregunta: términos sin tildes ni palabras vacías, ordenados."""
+    words = {word for word in WORD_RE.findall(fold_accents(text)) if word not in STOPWORDS}
+    return " ".join(sorted(words))
+
+
+class FAQIndex:
+    """Índice en memoria de las FAQ activas (léxico + embeddings en ChromaDB)."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._entries: Dict[str, Dict] = {}
+        self._by_key: Dict[str, str] = {}
+        self._collection = None
+
+        self.lexical_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        """Fuerza la recarga en la siguiente consulta (tras editar las FAQ)."""
+        self._loaded_at = None
+
+    def answer(self, query: str, category: Optional[str] = None) -> Optional[Dict]:
+        """
+        Busca una FAQ que responda a la consulta.
+
+        Args:
+            query: Consulta del usuario
+            category: Categoría del ticket
+
+        Returns:
+            Respuesta con el mismo formato que RAGAgent.generate_response, o
+            None si no hay coincidencia con confianza
+        """
+        if not settings.FAQ_ENABLED:
+            return None
+
+        try:
+            self._ensure_loaded()
+            entry, match_type, score = self._match(query, category)
+        except Exception as e:
+            logger.error(f"❌ Error consultando las FAQ: {e}")
+            return None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if match_type == "lexical":
+                self.lexical_hits += 1
+            else:
+                self.semantic_hits += 1
+
+        logger.info(f"⚡ Respuesta desde FAQ {entry['id']} ({match_type}, {score:.2f})")
+
+        return self._build_response(entry, match_type, score)
+
+    def _match(self, query: str, category: Optional[str]) -> tuple[Optional[Dict], str, float]:
+        entries = self._entries
+        if not entries:
+            return None, "", 0.0
+
+        # 1. Coincidencia léxica exacta
+        faq_id = self._by_key.get(normalize_question(query))
+        if faq_id and self._applies(entries[faq_id], category):
+            return entries[faq_id], "lexical", 1.0
+
+        # 2. Coincidencia semántica
+        results = self._get_collection().query(
+            query_texts=[query],
+            n_results=min(3, len(entries))
+        )
+
+        folded_query = fold_accents(query)
+
+        for faq_id, distance in zip(results["ids"][0], results["distances"][0]):
+            similarity = 1 - distance
+            if similarity < settings.FAQ_MIN_SIMILARITY:
+                break
+
+            entry = entries.get(faq_id)
+            if entry is None or not self._applies(entry, category):
+                continue
+
+            if self._keyword_coverage(entry, folded_query) >= settings.FAQ_MIN_KEYWORD_COVERAGE:
+                return entry, "semantic", similarity
+
+        return None, "", 0.0
+
+    @staticmethod
+    def _applies(entry: Dict, category: Optional[str]) -> bool:
+        return entry["category"] is None or entry["category"] == category
+
+    @staticmethod
+    def _keyword_coverage(entry: Dict, folded_query: str) -> float:
+        """Fracción de claves léxicas de la FAQ presentes en la consulta."""
+        patterns = entry["keyword_patterns"]
+        if not patterns:
+            return 1.0
+        return sum(1 for pattern in patterns if pattern.search(folded_query)) / len(patterns)
+
+    @staticmethod
+    def _build_response(entry: Dict, match_type: str, score: float) -> Dict:
+        sources = [
+            {
+                "source": source.get("source", "FAQ"),
+                "document_type": source.get("document_type") or "faq",
+                "relevance": round(score, 3),
+                "chunk_index": 0,
+                "excerpt": source.get("excerpt") or ""
+            }
+            for source in entry["sources"]
+        ]
+
+        return {
+            "content": entry["answer"],
+            "sources": sources,
+            "metadata": {
+                "model": None,
+                "tokens_total": 0,
+                "faq_id": entry["id"],
+                "faq_match": match_type,
+                "faq_score": round(score, 3),
+                "sources_count": len(sources),
+                "has_context": True
+            }
+        }
+
+    def _ensure_loaded(self) -> None:
+        """Recarga las FAQ si nunca se cargaron o si han caducado."""
+        if self._is_fresh():
+            return
+
+        with self._lock:
+            if self._is_fresh():
+                return
+            self._reload()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.refresh_seconds
+        )
+
+    def _reload(self) -> None:
+        db = SessionLocal()
+        try:
+            rows = FAQRepository(db).list_all()
+            entries = {
+                str(row.id): {
+                    "id": str(row.id),
+                    "question": row.question,
+                    "answer": row.answer,
+                    "sources": list(row.sources or []),
+                    "category": row.category,
+                    "keyword_patterns": [
+                        re.compile(r"\b" + re.escape(fold_accents(keyword)) + r"\b")
+                        for keyword in (row.keywords or [])
+                    ],
+                    "updated_at": row.updated_at.isoformat(),
+                }
+                for row in rows
+            }
+        finally:
+            db.close()
+
+        self._sync_embeddings(entries)
+
+        self._entries = entries
+        self._by_key = {normalize_question(entry["question"]): faq_id for faq_id, entry in entries.items()}
+        self._loaded_at = time.monotonic()
+
+        logger.info(f"📚 FAQ cargadas: {len(entries)}")
+
+    def _sync_embeddings(self, entries: Dict[str, Dict]) -> None:
+        """Alinea la colección de ChromaDB con las FAQ activas (solo lo que cambió)."""
+        collection = self._get_collection()
+
+        existing = collection.get(include=["metadatas"])
+        stored = {
+            faq_id: (metadata or {}).get("updated_at")
+            for faq_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+        removed = [faq_id for faq_id in stored if faq_id not in entries]
+        if removed:
+            collection.delete(ids=removed)
+
+        changed = [faq_id for faq_id, entry in entries.items() if stored.get(faq_id) != entry["updated_at"]]
+        if changed:
+            collection.upsert(
+                ids=changed,
+                documents=[entries[faq_id]["question"] for faq_id in changed],
+                metadatas=[{"updated_at": entries[faq_id]["updated_at"]} for faq_id in changed]
+            )
+            logger.info(f"✅ Indexadas {len(changed)} FAQ en ChromaDB")
+
+    def _get_collection(self):
+        if self._collection is None:
+            self._collection = get_vector_store().get_collection(
+                FAQ_COLLECTION,
+                metadata={"hnsw:space": "cosine"}
+            )
+        return self._collection
+
+    def get_stats(self) -> Dict:
+        """Retorna el número de FAQ cargadas y los aciertos por tipo."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lexical_hits": self.lexical_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+            }
+
+
+# Instancia global del índice de FAQ
+_faq_index = None
+
+def get_faq_index() -> FAQIndex:
+    """
+    Dependency para obtener el índice de FAQ.
+    Usa singleton pattern.
+    """
+    global _faq_index
+
+    if _faq_index is None:
+        _faq_index = FAQIndex(refresh_seconds=settings.FAQ_REFRESH_SECONDS)
+
+    return _faq_index
@@ -0,0 +1,211 @@
+"""
+Workers de la cola persistente de respuestas del agente.
+
+El endpoint de chat guarda el mensaje del usuario, encola un AgentJob y
+responde al momento. Los workers toman los trabajos de la BD, generan la
+respuesta (FAQ o RAG + LLM), la guardan y deciden el escalado. La respuesta
+llega al cliente por polling del historial o del estado del trabajo.
+
+Se ejecutan como proceso aparte (python -m worker) o, en desarrollo, como
+hilos dentro de la API (AGENT_WORKER_IN_PROCESS). Si un worker cae con un
+trabajo tomado, pasado AGENT_JOB_LOCK_TIMEOUT_SECONDS vuelve a la cola.
+"""
+from typing import List, Optional
+import os
+import socket
+import threading
+import time
+import logging
+
+from agent.rag_agent import get_rag_agent
+from agent.replies import generate_reply, load_conversation, save_agent_reply, save_agent_error
+from agent.resilience import backoff_delay
+from core.config import settings
+from db import SessionLocal
+from db.models import AgentJob
+from db.repository import JobRepository, MessageRepository, TicketRepository
+
+logger = logging.getLogger(__name__)
+
+# Espera entre reintentos de un trabajo fallido (backoff con jitter)
+JOB_RETRY_BASE_DELAY = 5.0
+JOB_RETRY_MAX_DELAY = 120.0
+
+
+def process_job(db, job: AgentJob) -> None:
+    """
+    Genera y guarda la respuesta del agente de un trabajo.
+    
+    Si la respuesta ya se guardó (el worker cayó antes de cerrar el trabajo)
+    no se vuelve a generar.
+    """
+    ticket_repo = TicketRepository(db)
+    message_repo = MessageRepository(db)
+    
+    if message_repo.get_reply_to(job.ticket_id, job.message_id):
+        logger.info(f"↩️ El mensaje {job.message_id} ya tiene respuesta")
+        return
+    
+    ticket = ticket_repo.get_by_id(job.ticket_id)
+    user_message = message_repo.get_by_id(job.message_id)
+    
+    if ticket is None or user_message is None:
+        raise LookupError("El ticket o el mensaje del trabajo ya no existe")
+    
+    category = ticket.category.value
+    
+    summary, conversation_history = load_conversation(
+        db, job.ticket_id, user_message.id, before=user_message.created_at
+    )
+    
+    agent = get_rag_agent()
+    agent_response = generate_reply(
+        agent,
+        user_query=user_message.content,
+        category=category,
+        conversation_history=conversation_history,
+        summary=summary,
+        user_id=str(job.user_id)
+    )
+    
+    save_agent_reply(
+        ticket_repo, message_repo, job.ticket_id, agent, agent_response,
+        user_id=str(job.user_id), category=category, reply_to=job.message_id
+    )
+    
+    if settings.SUMMARY_ENABLED:
+        from agent.summarizer import get_summarizer
+        
+        get_summarizer().update_if_needed(job.ticket_id)
+
+
+class AgentWorker:
+    """Grupo de hilos que consumen la cola de trabajos del agente."""
+    
+    def __init__(self, concurrency: int, poll_interval: float, name: Optional[str] = None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_requeue = 0.0
+    
+    def start(self) -> None:
+        """Arranca los hilos del worker."""
+        self._stop.clear()
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"agent-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        
+        logger.info(f"✅ Worker {self.name} iniciado ({self.concurrency} hilos)")
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Detiene el worker tras los trabajos en curso.
+        
+        Lo que quede a medias al vencer el plazo vuelve a la cola por el
+        bloqueo caducado.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        
+        logger.info(f"🛑 Worker {self.name} detenido")
+    
+    def wait(self) -> None:
+        """Bloquea hasta que se detenga el worker."""
+        while not self._stop.wait(1.0):
+            pass
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Error en el worker del agente: {e}")
+                worked = False
+            
+            if not worked:
+                self._stop.wait(self.poll_interval)
+    
+    def run_once(self) -> bool:
+        """
+        Procesa un trabajo de la cola.
+        
+        Returns:
+            True si había trabajo
+        """
+        db = SessionLocal()
+        
+        try:
+            job_repo = JobRepository(db)
+            self._requeue_stale(job_repo)
+            
+            job = job_repo.claim_next(self.name)
+            if job is None:
+                return False
+            
+            started = time.perf_counter()
+            
+            try:
+                process_job(db, job)
+            except Exception as e:
+                db.rollback()
+                self._handle_failure(db, job_repo, job, e)
+                return True
+            
+            job_repo.mark_done(job)
+            logger.info(f"✅ Trabajo {job.id} completado en {time.perf_counter() - started:.2f}s")
+            return True
+        
+        finally:
+            db.close()
+    
+    def _handle_failure(self, db, job_repo: JobRepository, job: AgentJob, error: Exception) -> None:
+        """Reintenta con espera o, agotados los intentos, escala el ticket."""
+        if job.attempts < settings.AGENT_JOB_MAX_ATTEMPTS:
+            retry_in = backoff_delay(job.attempts - 1, JOB_RETRY_BASE_DELAY, JOB_RETRY_MAX_DELAY)
+            logger.warning(f"⚠️ Trabajo {job.id} falló (intento {job.attempts}), reintento en {retry_in:.1f}s: {error}")
+            job_repo.mark_failed(job, str(error), retry_in=retry_in)
+            return
+        
+        logger.error(f"❌ Trabajo {job.id} falló definitivamente: {error}")
+        job_repo.mark_failed(job, str(error))
+        
+        try:
+            save_agent_error(TicketRepository(db), MessageRepository(db), job.ticket_id, error)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error escalando el ticket {job.ticket_id}: {e}")
+    
+    def _requeue_stale(self, job_repo: JobRepository) -> None:
+        """Reencola (como mucho una vez por intervalo) los trabajos de workers caídos."""
+        now = time.monotonic()
+        if now - self._last_requeue < settings.AGENT_JOB_LOCK_TIMEOUT_SECONDS / 4:
+            return
+        self._last_requeue = now
+        
+        count = job_repo.requeue_stale(settings.AGENT_JOB_LOCK_TIMEOUT_SECONDS)
+        if count:
+            logger.warning(f"♻️ Reencolados {count} trabajos abandonados")
+
+
+# Worker dentro del proceso de la API (desarrollo)
+_agent_worker = None
+
+def get_agent_worker() -> AgentWorker:
+    """
+    Dependency para obtener el worker de este proceso.
+    Usa singleton pattern.
+    """
+    global _agent_worker
+    
+    if _agent_worker is None:
+        _agent_worker = AgentWorker(
+            concurrency=settings.AGENT_WORKER_CONCURRENCY,
+            poll_interval=settings.AGENT_WORKER_POLL_SECONDS
+        )
+    
+    return _agent_worker
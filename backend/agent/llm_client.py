@@ -1,32 +1,70 @@
 """
-Cliente LLM para interactuar con OpenAI.
+Cliente LLM: resiliencia, coalescencia y proveedor configurable.
 """
-from openai import OpenAI
 from typing import List, Dict, Optional
+import hashlib
+import json
 import logging
 
 from core.config import settings
+from core.metrics import observe_stage
+from agent.providers import create_provider
+from agent.resilience import CircuitBreaker, call_with_retries
+from agent.scheduler import LLMScheduler
+from agent.single_flight import SingleFlight
+from agent.token_budget import count_message_tokens
 
 logger = logging.getLogger(__name__)
 
 
 class LLMClient:
-    """Cliente para interactuar con OpenAI API."""
+    """Cliente para interactuar con el proveedor LLM configurado."""
     
     def __init__(self):
-        """Inicializa el cliente de OpenAI."""
-        if not settings.OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY no está configurado en .env")
-        
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.model = "gpt-4o-mini"  # Modelo más económico y rápido
-        logger.info(f"✅ Cliente OpenAI inicializado con modelo: {self.model}")
+        """Inicializa el proveedor LLM (LLM_PROVIDER)."""
+        self.provider = create_provider()
+        self.model = self.provider.model
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=settings.LLM_CIRCUIT_RECOVERY_SECONDS
+        )
+        self._single_flight = SingleFlight() if settings.LLM_SINGLE_FLIGHT_ENABLED else None
+        self.scheduler = LLMScheduler(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            quantum=settings.LLM_SCHEDULER_QUANTUM,
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS
+        )
+        logger.info(f"✅ Cliente LLM inicializado. Proveedor: {self.provider.name}, modelo: {self.model}")
+    
+    def _request_key(self, messages: List[Dict[str, str]], **params) -> str:
+        """Hash de los mensajes finales y los parámetros de generación."""
+        payload = json.dumps(
+            {"model": self.model, "messages": messages, **params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _with_resilience(self, fn):
+        """Ejecuta una llamada al proveedor con timeout, reintentos y circuit breaker."""
+        return call_with_retries(
+            fn,
+            breaker=self.breaker,
+            is_retryable=self.provider.is_retryable,
+            max_retries=settings.LLM_MAX_RETRIES,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            deadline=settings.LLM_DEADLINE_SECONDS,
+            base_delay=settings.LLM_RETRY_BASE_DELAY,
+            max_delay=settings.LLM_RETRY_MAX_DELAY
+        )
     
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        user_id: Optional[str] = None,
+        priority: bool = False
     ) -> Dict:
         """
         Genera una respuesta del modelo.
@@ -35,44 +73,79 @@ class LLMClient:
             messages: Lista de mensajes [{"role": "user|assistant|system", "content": "..."}]
             temperature: Creatividad (0-2, default 0.7)
             max_tokens: Máximo de tokens en la respuesta
+            user_id: Usuario que origina la llamada (cola justa del planificador)
+            priority: Carril prioritario (llamadas de operadores)
         
         Returns:
             Diccionario con la respuesta y metadata
+        
+        Raises:
+            LLMUnavailableError: Si el proveedor no responde (circuito abierto,
+                reintentos o plazo agotados) o la cola del LLM está saturada
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            
-            content = response.choices[0].message.content
-            
-            metadata = {
-                "model": response.model,
-                "tokens_prompt": response.usage.prompt_tokens,
-                "tokens_completion": response.usage.completion_tokens,
-                "tokens_total": response.usage.total_tokens,
-                "finish_reason": response.choices[0].finish_reason
+        with observe_stage("llm_completion"):
+            return self._coalesced_chat_completion(messages, temperature, max_tokens, user_id, priority)
+    
+    def _coalesced_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        user_id: Optional[str],
+        priority: bool
+    ) -> Dict:
+        """Comparte la llamada con una petición idéntica en curso (single-flight)."""
+        if self._single_flight is None:
+            return self._chat_completion(messages, temperature, max_tokens, user_id, priority)
+        
+        # Solo la petición líder ocupa hueco en el planificador
+        key = self._request_key(messages, temperature=temperature, max_tokens=max_tokens)
+        result, shared = self._single_flight.do(
+            key,
+            lambda: self._chat_completion(messages, temperature, max_tokens, user_id, priority)
+        )
+        
+        if shared:
+            # Los tokens los pagó la petición líder
+            logger.info("🔗 Respuesta compartida con una petición idéntica en curso")
+            return {
+                "content": result["content"],
+                "metadata": {**result["metadata"], "coalesced": True}
             }
+        
+        return result
+    
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        user_id: Optional[str],
+        priority: bool
+    ) -> Dict:
+        """Llamada real al proveedor."""
+        try:
+            cost = count_message_tokens(messages) + max_tokens
+            with self.scheduler.slot(user_id, cost=cost, priority=priority):
+                response = self._with_resilience(
+                    lambda timeout: self.provider.complete(messages, temperature, max_tokens, timeout)
+                )
             
-            logger.info(f"✅ Respuesta generada. Tokens: {metadata['tokens_total']}")
+            logger.info(f"✅ Respuesta generada. Tokens: {response['metadata']['tokens_total']}")
             
-            return {
-                "content": content,
-                "metadata": metadata
-            }
+            return response
             
         except Exception as e:
-            logger.error(f"❌ Error llamando a OpenAI: {e}")
+            logger.error(f"❌ Error llamando al LLM ({self.provider.name}): {e}")
             raise
     
     def chat_completion_streaming(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        user_id: Optional[str] = None,
+        priority: bool = False
     ):
         """
         Genera una respuesta del modelo con streaming.
@@ -81,26 +154,65 @@ class LLMClient:
             messages: Lista de mensajes
             temperature: Creatividad
             max_tokens: Máximo de tokens
+            user_id: Usuario que origina la llamada (cola justa del planificador)
+            priority: Carril prioritario (llamadas de operadores)
         
         Yields:
             Chunks de texto conforme se generan
+        
+        Raises:
+            LLMUnavailableError: Si no se pudo abrir el stream
         """
+        if self._single_flight is None:
+            return self._chat_completion_streaming(messages, temperature, max_tokens, user_id, priority)
+        
+        key = self._request_key(
+            messages, temperature=temperature, max_tokens=max_tokens, stream=True
+        )
+        return self._single_flight.stream(
+            key,
+            lambda: self._chat_completion_streaming(messages, temperature, max_tokens, user_id, priority)
+        )
+    
+    def _chat_completion_streaming(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        user_id: Optional[str],
+        priority: bool
+    ):
+        """Llamada real al proveedor con streaming (el hueco se ocupa todo el stream)."""
         try:
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            cost = count_message_tokens(messages) + max_tokens
+            with self.scheduler.slot(user_id, cost=cost, priority=priority):
+                # Solo se reintenta la apertura del stream; un corte a mitad no
+                # se puede repetir sin duplicar el texto ya emitido
+                stream = self._with_resilience(
+                    lambda timeout: self.provider.stream(messages, temperature, max_tokens, timeout)
+                )
+                
+                try:
+                    with observe_stage("llm_stream"):
+                        yield from stream
+                except Exception as e:
+                    if self.provider.is_retryable(e):
+                        self.breaker.record_failure()
+                    raise
                     
         except Exception as e:
-            logger.error(f"❌ Error en streaming de OpenAI: {e}")
+            logger.error(f"❌ Error en streaming del LLM ({self.provider.name}): {e}")
             raise
+    
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas del cliente (coalescencia, circuit breaker, cola)."""
+        return {
+            "provider": self.provider.name,
+            "model": self.model,
+            "circuit_breaker": self.breaker.get_stats(),
+            "scheduler": self.scheduler.get_stats(),
+            "single_flight": self._single_flight.get_stats() if self._single_flight else None
+        }
 
 
 # Instancia global del cliente
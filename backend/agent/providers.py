@@ -0,0 +1,236 @@
+"""
+Proveedores LLM intercambiables.
+
+LLMClient delega la llamada real en un proveedor elegido por configuración
+(LLM_PROVIDER):
+
+- openai: API oficial de OpenAI
+- openai_compatible: cualquier API compatible con OpenAI en LLM_BASE_URL
+  (vLLM, Ollama, LiteLLM, fake_openai_server.py...)
+- fake: proveedor local determinista, sin red ni coste, con latencia y
+  velocidad de generación configurables (pruebas de carga, modo offline)
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List
+import hashlib
+import time
+import logging
+
+from openai import OpenAI, APIConnectionError, APITimeoutError, APIStatusError, RateLimitError
+
+from agent.token_budget import count_message_tokens, count_tokens
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProvider(ABC):
+    """Interfaz común de los proveedores LLM."""
+
+    name: str = "base"
+    model: str = ""
+
+    @abstractmethod
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: float
+    ) -> Dict:
+        """
+        Genera una respuesta completa.
+
+        Returns:
+            {"content": str, "metadata": {"model", "tokens_prompt",
+            "tokens_completion", "tokens_total", "finish_reason"}}
+        """
+
+    @abstractmethod
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: float
+    ) -> Iterator[str]:
+        """
+        Abre un stream de respuesta.
+
+        La conexión se establece al llamar (para poder reintentarla); el
+        iterador devuelto emite los fragmentos de texto.
+        """
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Indica si un error del proveedor es transitorio."""
+        return False
+
+
+class OpenAIProvider(LLMProvider):
+    """Proveedor sobre el SDK de OpenAI (API oficial o compatible)."""
+
+    def __init__(self, api_key: str, model: str, base_url: str = "", name: str = "openai"):
+        # Los reintentos los gestiona LLMClient (con jitter y circuit breaker)
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_retries=0
+        )
+        self.model = model
+        self.name = name
+
+    def complete(self, messages, temperature, max_tokens, timeout) -> Dict:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+
+        return {
+            "content": response.choices[0].message.content,
+            "metadata": {
+                "model": response.model,
+                "tokens_prompt": response.usage.prompt_tokens,
+                "tokens_completion": response.usage.completion_tokens,
+                "tokens_total": response.usage.total_tokens,
+                "finish_reason": response.choices[0].finish_reason
+            }
+        }
+
+    def stream(self, messages, temperature, max_tokens, timeout) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            timeout=timeout
+        )
+
+        def chunks():
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    yield chunk.choices[0].delta.content
+
+        return chunks()
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Timeouts, errores de conexión, 429 y 5xx se consideran transitorios."""
+        if isinstance(error, (APITimeoutError, APIConnectionError, RateLimitError)):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code >= 500
+        return False
+
+
+class FakeProvider(LLMProvider):
+    """
+    Proveedor local determinista.
+
+    La respuesta depende solo de los mensajes de entrada, así que peticiones
+    iguales producen el mismo texto y el mismo consumo de tokens. Simula la
+    latencia hasta el primer token y la velocidad de generación.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: int = 0, tokens_per_second: float = 0, model: str = "fake-llm"):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.model = model
+
+    def _answer(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """Construye la respuesta determinista a partir de la última consulta."""
+        query = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(
+            "\n".join(msg["content"] for msg in messages).encode("utf-8")
+        ).hexdigest()[:12]
+
+        answer = (
+            f"[Respuesta simulada {digest}] Según la documentación AESA disponible, "
+            f"esta es una respuesta de prueba generada sin LLM a la consulta: "
+            f"{query[-300:]}"
+        )
+
+        # Respetar max_tokens de forma aproximada
+        words = answer.split(" ")
+        return " ".join(words[:max_tokens])
+
+    def _sleep_for_tokens(self, tokens: int) -> None:
+        if self.tokens_per_second > 0:
+            time.sleep(tokens / self.tokens_per_second)
+
+    def complete(self, messages, temperature, max_tokens, timeout) -> Dict:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        content = self._answer(messages, max_tokens)
+        tokens_prompt = count_message_tokens(messages)
+        tokens_completion = count_tokens(content)
+        self._sleep_for_tokens(tokens_completion)
+
+        return {
+            "content": content,
+            "metadata": {
+                "model": self.model,
+                "tokens_prompt": tokens_prompt,
+                "tokens_completion": tokens_completion,
+                "tokens_total": tokens_prompt + tokens_completion,
+                "finish_reason": "stop"
+            }
+        }
+
+    def stream(self, messages, temperature, max_tokens, timeout) -> Iterator[str]:
+        content = self._answer(messages, max_tokens)
+
+        def chunks():
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+
+            for i, word in enumerate(content.split(" ")):
+                piece = word if i == 0 else f" {word}"
+                self._sleep_for_tokens(count_tokens(piece))
+                yield piece
+
+        return chunks()
+
+
+def create_provider() -> LLMProvider:
+    """
+    Crea el proveedor configurado en LLM_PROVIDER.
+
+    Raises:
+        ValueError: Si el proveedor no existe o le falta configuración
+    """
+    provider = settings.LLM_PROVIDER.lower()
+
+    if provider == "openai":
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY no está configurado en .env")
+        return OpenAIProvider(
+            api_key=settings.OPENAI_API_KEY,
+            model=settings.LLM_MODEL,
+            base_url=settings.LLM_BASE_URL
+        )
+
+    if provider == "openai_compatible":
+        if not settings.LLM_BASE_URL:
+            raise ValueError("LLM_BASE_URL no está configurado en .env")
+        # Muchos servidores compatibles no validan la clave, pero el SDK exige una
+        return OpenAIProvider(
+            api_key=settings.OPENAI_API_KEY or "not-needed",
+            model=settings.LLM_MODEL,
+            base_url=settings.LLM_BASE_URL,
+            name="openai_compatible"
+        )
+
+    if provider == "fake":
+        return FakeProvider(
+            latency_ms=settings.FAKE_LLM_LATENCY_MS,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND
+        )
+
+    raise ValueError(f"LLM_PROVIDER desconocido: {settings.LLM_PROVIDER}")
@@ -1,10 +1,15 @@
 """
 Agente RAG que combina búsqueda en documentos con LLM.
 """
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
+import time
 import logging
 
+from agent.escalation import EscalationClassifier
 from agent.llm_client import get_llm_client
+from agent.resilience import LLMUnavailableError
+from agent.token_budget import count_message_tokens, count_tokens, fit_history_to_budget
+from core.config import settings
 from rag import get_vector_store
 
 logger = logging.getLogger(__name__)
@@ -29,6 +34,9 @@ INSTRUCCIONES IMPORTANTES:
 
 Recuerda: La seguridad aérea es prioritaria, así que es mejor ser conservador en las respuestas que arriesgarse a dar información incorrecta."""
 
+# Longitud de los extractos que se muestran en modo degradado
+EXCERPT_LENGTH = 400
+
 
 class RAGAgent:
     """Agente que combina RAG con LLM para responder consultas."""
@@ -37,6 +45,7 @@ class RAGAgent:
         """Inicializa el agente RAG."""
         self.llm = get_llm_client()
         self.vector_store = get_vector_store()
+        self.escalation = EscalationClassifier()
         logger.info("✅ Agente RAG inicializado")
     
     def search_relevant_context(
@@ -93,7 +102,8 @@ class RAGAgent:
                 "source": meta.get('source', 'Desconocida'),
                 "document_type": meta.get('document_type', 'unknown'),
                 "relevance": relevance,
-                "chunk_index": meta.get('chunk_index', 0)
+                "chunk_index": meta.get('chunk_index', 0),
+                "excerpt": doc[:EXCERPT_LENGTH]
             })
         
         context = "\n".join(context_parts)
@@ -102,45 +112,25 @@ class RAGAgent:
         
         return context, sources
     
-    def generate_response(
+    def build_messages(
         self,
         user_query: str,
+        context: str,
         conversation_history: Optional[List[Dict]] = None,
-        document_type: Optional[str] = None
-    ) -> Dict:
+        summary: Optional[str] = None
+    ) -> List[Dict[str, str]]:
         """
-        Genera una respuesta usando RAG + LLM.
+        Construye la lista de mensajes que se envía al LLM.
         
         Args:
             user_query: Pregunta del usuario
+            context: Contexto combinado de los documentos
             conversation_history: Historial previo de la conversación
-            document_type: Filtrar búsqueda por tipo de documento
+            summary: Resumen de la parte antigua de la conversación (opcional)
         
         Returns:
-            Diccionario con content, metadata y sources
+            Lista de mensajes [{"role": ..., "content": ...}]
         """
-        logger.info(f"💬 Generando respuesta para: '{user_query[:100]}...'")
-        
-        # 1. Buscar contexto relevante
-        context, sources = self.search_relevant_context(
-            query=user_query,
-            n_results=5,
-            document_type=document_type
-        )
-        
-        # 2. Construir mensajes para el LLM
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
-        
-        # Añadir historial de conversación si existe
-        if conversation_history:
-            for msg in conversation_history[-10:]:  # Últimos 10 mensajes
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        
         # Añadir contexto y consulta actual
         if context:
             user_message = f"""CONTEXTO DE DOCUMENTOS AESA:
@@ -158,14 +148,78 @@ Responde basándote en el contexto proporcionado."""
 
 NOTA: No se encontró información específica en los documentos. Responde indicando que no tienes esa información disponible y sugiere consultar con AESA directamente."""
         
-        messages.append({"role": "user", "content": user_message})
+        system = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if summary:
+            system.append({
+                "role": "system",
+                "content": f"RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{summary}"
+            })
+        query = {"role": "user", "content": user_message}
+        
+        # El historial ocupa lo que queda del presupuesto tras el contexto
+        history = []
+        if conversation_history:
+            history_budget = settings.LLM_PROMPT_TOKEN_BUDGET - count_message_tokens([*system, query])
+            history = [
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in fit_history_to_budget(conversation_history, history_budget)
+            ]
+        
+        messages = [*system, *history, query]
+        
+        return messages
+    
+    def generate_response(
+        self,
+        user_query: str,
+        conversation_history: Optional[List[Dict]] = None,
+        document_type: Optional[str] = None,
+        summary: Optional[str] = None,
+        user_id: Optional[str] = None,
+        priority: bool = False
+    ) -> Dict:
+        """
+        Genera una respuesta usando RAG + LLM.
+        
+        Args:
+            user_query: Pregunta del usuario
+            conversation_history: Historial previo de la conversación
+            document_type: Filtrar búsqueda por tipo de documento
+            summary: Resumen de la parte antigua de la conversación (opcional)
+            user_id: Usuario que origina la consulta (cola justa del LLM)
+            priority: Carril prioritario del LLM (llamadas de operadores)
+        
+        Returns:
+            Diccionario con content, metadata y sources
+        """
+        logger.info(f"💬 Generando respuesta para: '{user_query[:100]}...'")
+        
+        # 1. Buscar contexto relevante (o escalar sin llamar al LLM)
+        escalation, context, sources = self._retrieve_or_escalate(user_query, document_type)
+        if escalation:
+            return escalation
+        
+        # 2. Construir mensajes para el LLM
+        messages = self.build_messages(user_query, context, conversation_history, summary)
         
         # 3. Generar respuesta con el LLM
-        llm_response = self.llm.chat_completion(
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1000
-        )
+        started = time.perf_counter()
+        try:
+            llm_response = self.llm.chat_completion(
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                user_id=user_id,
+                priority=priority
+            )
+        except LLMUnavailableError as e:
+            logger.warning(f"⚠️ LLM no disponible, respuesta degradada: {e}")
+            return self.degraded_response(sources)
+        
+        if not llm_response["metadata"].get("coalesced"):
+            self.escalation.observe_generation(
+                llm_response["metadata"]["tokens_total"], time.perf_counter() - started
+            )
         
         # 4. Construir respuesta completa
         response = {
@@ -182,6 +236,198 @@ NOTA: No se encontró información específica en los documentos. Responde indic
         
         return response
     
+    def generate_response_stream(
+        self,
+        user_query: str,
+        conversation_history: Optional[List[Dict]] = None,
+        document_type: Optional[str] = None,
+        summary: Optional[str] = None,
+        user_id: Optional[str] = None,
+        priority: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Genera una respuesta usando RAG + LLM emitiendo los tokens según llegan.
+        
+        Args:
+            user_query: Pregunta del usuario
+            conversation_history: Historial previo de la conversación
+            document_type: Filtrar búsqueda por tipo de documento
+            summary: Resumen de la parte antigua de la conversación (opcional)
+            user_id: Usuario que origina la consulta (cola justa del LLM)
+            priority: Carril prioritario del LLM (llamadas de operadores)
+        
+        Yields:
+            {"type": "token", "content": "..."} por cada fragmento generado y,
+            al final, {"type": "done", "response": {...}} con el mismo formato
+            que devuelve generate_response
+        """
+        logger.info(f"💬 Generando respuesta (streaming) para: '{user_query[:100]}...'")
+        
+        escalation, context, sources = self._retrieve_or_escalate(user_query, document_type)
+        if escalation:
+            yield {"type": "token", "content": escalation["content"]}
+            yield {"type": "done", "response": escalation}
+            return
+        
+        messages = self.build_messages(user_query, context, conversation_history, summary)
+        
+        chunks = []
+        started = time.perf_counter()
+        try:
+            for chunk in self.llm.chat_completion_streaming(
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                user_id=user_id,
+                priority=priority
+            ):
+                chunks.append(chunk)
+                yield {"type": "token", "content": chunk}
+        except LLMUnavailableError as e:
+            if chunks:
+                raise
+            logger.warning(f"⚠️ LLM no disponible, respuesta degradada: {e}")
+            response = self.degraded_response(sources)
+            yield {"type": "token", "content": response["content"]}
+            yield {"type": "done", "response": response}
+            return
+        
+        # El streaming no devuelve el consumo de tokens: se estima
+        content = "".join(chunks)
+        tokens_prompt = count_message_tokens(messages)
+        tokens_completion = count_tokens(content)
+        response = {
+            "content": content,
+            "sources": sources,
+            "metadata": {
+                "model": self.llm.model,
+                "tokens_prompt": tokens_prompt,
+                "tokens_completion": tokens_completion,
+                "tokens_total": tokens_prompt + tokens_completion,
+                "tokens_estimated": True,
+                "streamed": True,
+                "sources_count": len(sources),
+                "has_context": bool(context)
+            }
+        }
+        
+        self.escalation.observe_generation(
+            response["metadata"]["tokens_total"], time.perf_counter() - started
+        )
+        
+        logger.info(f"✅ Respuesta (streaming) generada. Fragmentos: {len(chunks)}")
+        
+        yield {"type": "done", "response": response}
+    
+    def _retrieve_or_escalate(
+        self,
+        user_query: str,
+        document_type: Optional[str]
+    ) -> tuple[Optional[Dict], str, List[Dict]]:
+        """
+        Busca el contexto salvo que el escalado sea seguro sin llamar al LLM.
+        
+        Primero se mira la consulta (términos legales: ni se busca) y después
+        las puntuaciones de la búsqueda (sin fuentes relevantes).
+        
+        Returns:
+            Tupla de (respuesta_de_escalado o None, contexto, fuentes)
+        """
+        reason = self.escalation.check_query(user_query)
+        if reason:
+            self.escalation.observe_fast_path(reason, skipped_retrieval=True)
+            return self.escalation_response(reason, []), "", []
+        
+        started = time.perf_counter()
+        context, sources = self.search_relevant_context(
+            query=user_query,
+            n_results=5,
+            document_type=document_type
+        )
+        self.escalation.observe_retrieval(time.perf_counter() - started)
+        
+        reason = self.escalation.check_retrieval(sources)
+        if reason:
+            logger.info(f"⚡ Escalado previo al LLM: {reason}")
+            self.escalation.observe_fast_path(reason)
+            return self.escalation_response(reason, sources), context, sources
+        
+        return None, context, sources
+    
+    def escalation_response(self, reason: str, sources: List[Dict]) -> Dict:
+        """
+        Respuesta inmediata cuando la consulta se escala sin generar.
+        
+        Args:
+            reason: Razón del escalado
+            sources: Fuentes recuperadas (si se llegó a buscar)
+        
+        Returns:
+            Diccionario con el mismo formato que generate_response
+        """
+        return {
+            "content": (
+                "🔔 Tu consulta necesita la revisión de un operador humano. "
+                "Te responderá en este mismo ticket lo antes posible."
+            ),
+            "sources": sources,
+            "metadata": {
+                "model": None,
+                "tokens_total": 0,
+                "escalation_reason": reason,
+                "fast_path": True,
+                "sources_count": len(sources),
+                "has_context": bool(sources)
+            }
+        }
+    
+    def degraded_response(self, sources: List[Dict]) -> Dict:
+        """
+        Respuesta sin generación cuando el LLM no está disponible.
+        
+        Devuelve los extractos de los documentos recuperados para que el
+        usuario tenga algo útil sin esperar a un operador.
+        
+        Args:
+            sources: Fuentes recuperadas (con su extracto)
+        
+        Returns:
+            Diccionario con el mismo formato que generate_response
+        """
+        if sources:
+            excerpts = "\n\n".join(
+                f"📄 {source['source']} (relevancia {source['relevance']:.0%}):\n{source.get('excerpt', '')}"
+                for source in sources
+            )
+            content = (
+                "⚠️ El asistente no puede generar una respuesta en este momento. "
+                "Estos son los fragmentos de la documentación AESA más relacionados "
+                f"con tu pregunta:\n\n{excerpts}"
+            )
+        else:
+            content = (
+                "⚠️ El asistente no puede generar una respuesta en este momento "
+                "y no se han encontrado fragmentos relacionados en la documentación."
+            )
+        
+        return {
+            "content": content,
+            "sources": sources,
+            "metadata": {
+                "model": None,
+                "tokens_total": 0,
+                "degraded": True,
+                "sources_count": len(sources),
+                "has_context": bool(sources)
+            }
+        }
+    
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas del agente (escalados sin LLM y ahorro estimado)."""
+        return {
+            "escalation_fast_path": self.escalation.get_stats()
+        }
+    
     def should_escalate(self, response: Dict) -> tuple[bool, str]:
         """
         Determina si la consulta debe escalarse a un humano.
@@ -192,23 +438,28 @@ NOTA: No se encontró información específica en los documentos. Responde indic
         Returns:
             Tupla de (should_escalate, reason)
         """
-        content = response["content"].lower()
-        sources_count = response["metadata"]["sources_count"]
+        metadata = response["metadata"]
+        
+        # Respuesta aprobada de una FAQ curada
+        if metadata.get("faq_id"):
+            return False, ""
+        
+        # Escalado decidido antes de generar (vía rápida)
+        if metadata.get("escalation_reason"):
+            return True, metadata["escalation_reason"]
         
         # Reglas de escalado
-        if sources_count == 0:
+        if metadata["sources_count"] == 0:
             return True, "No se encontró información relevante en la documentación"
         
-        if "no encuentro" in content or "no tengo información" in content:
-            return True, "El agente no pudo encontrar información específica"
-        
-        if "consulta con aesa" in content or "contacta con" in content:
-            return True, "La consulta requiere verificación oficial"
+        # En modo degradado ya se dieron los extractos: una caída del proveedor
+        # no debe inundar de escalados a los operadores
+        if metadata.get("degraded"):
+            return False, ""
         
-        # Palabras clave que indican casos complejos
-        complex_keywords = ["legal", "demanda", "accidente", "sanción", "multa"]
-        if any(keyword in content for keyword in complex_keywords):
-            return True, "Consulta de naturaleza legal o compleja"
+        reason = self.escalation.check_answer(response["content"])
+        if reason:
+            return True, reason
         
         return False, ""
 
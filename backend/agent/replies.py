@@ -0,0 +1,167 @@
+"""
+Generación y persistencia de las respuestas del agente a un mensaje.
+
+Lo comparten los endpoints de chat (respuesta en streaming) y los workers de
+la cola de trabajos (respuesta asíncrona).
+"""
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+from agent.faq import get_faq_index
+from agent.usage_ledger import get_usage_ledger
+from core.config import settings
+from core.metrics import observe_stage
+from db.models import Message
+from db.repository import TicketRepository, MessageRepository, TicketSummaryRepository, FAQRepository
+
+
+# Tipo de documento a buscar según la categoría del ticket
+DOC_TYPE_BY_CATEGORY = {
+    "licensing": "pdf_aesa_a2",  # Por defecto A2
+    "technical": None  # Buscar en todos
+}
+
+
+def load_conversation(
+    db: Session,
+    ticket_id: UUID,
+    exclude_message_id: UUID,
+    before: Optional[datetime] = None
+) -> tuple[Optional[str], list[dict]]:
+    """
+    Carga el resumen acumulado del ticket y los turnos posteriores a él.
+    
+    Args:
+        db: Sesión de BD
+        ticket_id: ID del ticket
+        exclude_message_id: Mensaje a excluir (la consulta actual)
+        before: Ignorar mensajes posteriores (respuestas en diferido)
+    
+    Returns:
+        Tupla de (resumen o None, historial reciente)
+    """
+    with observe_stage("history_fetch"):
+        summary = TicketSummaryRepository(db).get_by_ticket(ticket_id)
+        
+        conversation_history = MessageRepository(db).get_conversation_history(
+            ticket_id,
+            limit=settings.HISTORY_FETCH_LIMIT,
+            exclude_message_id=exclude_message_id,
+            after=summary.summarized_until if summary else None,
+            before=before
+        )
+    
+    return (summary.content if summary else None), conversation_history
+
+
+def generate_reply(
+    agent,
+    user_query: str,
+    category: str,
+    conversation_history: list[dict],
+    summary: Optional[str],
+    user_id: str
+) -> dict:
+    """
+    Responde con una FAQ curada si coincide y, si no, con el agente RAG.
+    
+    Returns:
+        Respuesta con el formato de RAGAgent.generate_response
+    """
+    with observe_stage("faq_lookup"):
+        faq_response = get_faq_index().answer(user_query, category)
+    if faq_response is not None:
+        return faq_response
+    
+    return agent.generate_response(
+        user_query=user_query,
+        conversation_history=conversation_history,
+        document_type=DOC_TYPE_BY_CATEGORY.get(category),
+        summary=summary,
+        user_id=user_id
+    )
+
+
+def save_agent_reply(
+    ticket_repo: TicketRepository,
+    message_repo: MessageRepository,
+    ticket_id: UUID,
+    agent,
+    agent_response: dict,
+    user_id: str,
+    category: str,
+    operation: str = "chat",
+    reply_to: Optional[UUID] = None
+) -> tuple[Message, bool, str]:
+    """
+    Persiste la respuesta del agente, registra su consumo de tokens y escala
+    el ticket si procede.
+    
+    Args:
+        reply_to: Mensaje del usuario al que responde (evita duplicados al reintentar)
+    
+    Returns:
+        Tupla de (mensaje_del_asistente, escalado, razón)
+    """
+    metadata = {
+        "sources": agent_response["sources"],
+        "tokens_used": agent_response["metadata"]["tokens_total"],
+        "model": agent_response["metadata"]["model"],
+        "degraded": agent_response["metadata"].get("degraded", False),
+        "faq_id": agent_response["metadata"].get("faq_id")
+    }
+    
+    if reply_to:
+        metadata["reply_to"] = str(reply_to)
+    
+    # Crear mensaje del asistente
+    with observe_stage("db_write"):
+        assistant_message = message_repo.create_assistant_message(
+            ticket_id=ticket_id,
+            content=agent_response["content"],
+            metadata=metadata
+        )
+    
+    if agent_response["metadata"].get("faq_id"):
+        FAQRepository(message_repo.db).increment_hits(agent_response["metadata"]["faq_id"])
+    
+    get_usage_ledger().record(
+        agent_response["metadata"],
+        operation=operation,
+        user_id=user_id,
+        ticket_id=ticket_id,
+        category=category
+    )
+    
+    # Verificar si debe escalarse
+    with observe_stage("escalation"):
+        should_escalate, escalate_reason = agent.should_escalate(agent_response)
+        
+        if should_escalate:
+            # Marcar ticket como escalado
+            ticket_repo.escalate(ticket_id)
+            
+            # Crear mensaje del sistema
+            message_repo.create_system_message(
+                ticket_id=ticket_id,
+                content=f"🔔 Este ticket ha sido escalado a un operador humano. Razón: {escalate_reason}"
+            )
+    
+    return assistant_message, should_escalate, escalate_reason
+
+
+def save_agent_error(
+    ticket_repo: TicketRepository,
+    message_repo: MessageRepository,
+    ticket_id: UUID,
+    error: Exception
+) -> None:
+    """Registra el fallo del agente en el chat y escala el ticket."""
+    message_repo.create_system_message(
+        ticket_id=ticket_id,
+        content=f"⚠️ Error al generar respuesta automática: {str(error)}"
+    )
+    
+    ticket_repo.escalate(ticket_id)
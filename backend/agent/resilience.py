@@ -0,0 +1,172 @@
+"""
+Políticas de resiliencia para las llamadas al LLM: reintentos con jitter,
+plazo máximo por llamada y circuit breaker.
+"""
+from typing import Callable, Dict, Optional, TypeVar
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(Exception):
+    """El proveedor LLM no está disponible (circuito abierto o reintentos agotados)."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico de tres estados.
+
+    - closed: las llamadas pasan; los fallos consecutivos se cuentan
+    - open: se falla inmediatamente hasta que pasa recovery_timeout
+    - half_open: se deja pasar una llamada de prueba; si va bien se cierra
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Estado actual (pasa a half_open si ya venció el tiempo de recuperación)."""
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Indica si se puede intentar una llamada ahora."""
+        with self._lock:
+            self._refresh_state()
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Registra una llamada correcta: cierra el circuito."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("✅ Circuit breaker del LLM cerrado")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Libera la llamada de prueba sin contarla como acierto ni como fallo."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Registra un fallo: abre el circuito al llegar al umbral o si falla la prueba."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"⚠️ Circuit breaker del LLM abierto tras {self._failures} fallos")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict:
+        """Retorna el estado del circuito."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "rejected": self.rejected,
+        }
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Retardo con 'full jitter': aleatorio entre 0 y base * 2^attempt (acotado)."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(
+    fn: Callable[[float], T],
+    breaker: CircuitBreaker,
+    is_retryable: Callable[[Exception], bool],
+    max_retries: int,
+    timeout: float,
+    deadline: float,
+    base_delay: float,
+    max_delay: float,
+) -> T:
+    """
+    Ejecuta fn con reintentos acotados, backoff con jitter, plazo total y circuit breaker.
+
+    Args:
+        fn: Llamada a ejecutar; recibe el timeout (segundos) para ese intento
+        breaker: Circuit breaker compartido del proveedor
+        is_retryable: Decide si un error es transitorio (timeouts, 429, 5xx)
+        max_retries: Reintentos tras el primer intento
+        timeout: Timeout máximo por intento
+        deadline: Plazo total para todos los intentos
+        base_delay: Retardo base del backoff
+        max_delay: Retardo máximo del backoff
+
+    Raises:
+        LLMUnavailableError: Si el circuito está abierto o se agotan intentos/plazo
+        Exception: Los errores no transitorios se propagan tal cual
+    """
+    started = time.monotonic()
+    last_error: Optional[Exception] = None
+
+    for attempt in range(max_retries + 1):
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+
+        if not breaker.allow_request():
+            raise LLMUnavailableError("Circuito abierto: el proveedor LLM no está disponible")
+
+        try:
+            result = fn(min(timeout, remaining))
+        except Exception as e:
+            if not is_retryable(e):
+                # Error del cliente (400, 401...): no dice nada de la salud del
+                # proveedor, ni cierra el circuito ni suma fallo
+                breaker.release_probe()
+                raise
+
+            breaker.record_failure()
+            last_error = e
+            logger.warning(f"⚠️ Fallo transitorio del LLM (intento {attempt + 1}/{max_retries + 1}): {e}")
+
+            if attempt < max_retries:
+                delay = backoff_delay(attempt, base_delay, max_delay)
+                if time.monotonic() - started + delay >= deadline:
+                    break
+                time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+    raise LLMUnavailableError(f"El proveedor LLM no respondió a tiempo: {last_error}") from last_error
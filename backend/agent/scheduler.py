@@ -0,0 +1,234 @@
+"""
+Planificador de admisión de llamadas al LLM.
+
+Limita las llamadas simultáneas al proveedor (LLM_MAX_CONCURRENCY) y, cuando
+hay cola, reparte los huecos de forma justa entre usuarios con Deficit Round
+Robin: cada usuario con peticiones pendientes recibe un cuanto de tokens por
+turno, así una ráfaga de un mismo usuario (o escuela) no acapara el proveedor.
+Las llamadas prioritarias (disparadas por operadores) van por un carril propio
+que se atiende antes que la cola de usuarios.
+
+Las llamadas al LLM son síncronas y se ejecutan en el threadpool, por eso las
+esperas usan primitivas de threading. El límite es por proceso (worker).
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional
+import threading
+import time
+import logging
+
+from agent.resilience import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Peticiones sin usuario (tareas en segundo plano, resúmenes...)
+BACKGROUND_USER = "__background__"
+
+WAIT_TIME_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+QUEUE_DEPTH_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200]
+
+
+class Histogram:
+    """Histograma acumulativo mínimo (mismo formato que Prometheus)."""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # El último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict:
+        """Retorna los buckets acumulados, la suma y el total."""
+        cumulative = {}
+        running = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class _Waiter:
+    """Petición en cola esperando un hueco."""
+
+    __slots__ = ("user", "cost", "enqueued_at", "event")
+
+    def __init__(self, user: str, cost: int):
+        self.user = user
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+
+
+class LLMScheduler:
+    """Límite global de concurrencia con cola justa por usuario (DRR) y carril prioritario."""
+
+    def __init__(self, max_concurrency: int, quantum: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.quantum = quantum
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._priority: Deque[_Waiter] = deque()
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._rotation: Deque[str] = deque()
+        self._deficit: Dict[str, int] = {}
+        self._turn_started = False
+
+        self.admitted = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+        self.wait_time = Histogram(WAIT_TIME_BUCKETS)
+        self.priority_wait_time = Histogram(WAIT_TIME_BUCKETS)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+
+    @property
+    def queued(self) -> int:
+        """Peticiones esperando hueco."""
+        return len(self._priority) + sum(len(q) for q in self._queues.values())
+
+    @contextmanager
+    def slot(self, user_id: Optional[str] = None, cost: int = 1, priority: bool = False) -> Iterator[None]:
+        """
+        Reserva un hueco de llamada al LLM durante el bloque.
+
+        Args:
+            user_id: Usuario que origina la llamada (cola justa por usuario)
+            cost: Coste estimado en tokens (prompt + max_tokens)
+            priority: Carril prioritario (llamadas de operadores)
+
+        Raises:
+            LLMUnavailableError: Si no se obtiene hueco en LLM_QUEUE_TIMEOUT_SECONDS
+        """
+        self._acquire(user_id or BACKGROUND_USER, cost, priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, user: str, cost: int, priority: bool) -> None:
+        with self._lock:
+            depth = self.queued
+            self.queue_depth.observe(depth)
+
+            if self._active < self.max_concurrency and depth == 0:
+                self._active += 1
+                self.admitted += 1
+                (self.priority_wait_time if priority else self.wait_time).observe(0.0)
+                return
+
+            waiter = _Waiter(user, cost)
+            if priority:
+                self._priority.append(waiter)
+            else:
+                if user not in self._queues:
+                    self._queues[user] = deque()
+                    self._rotation.append(user)
+                    self._deficit[user] = 0
+                self._queues[user].append(waiter)
+
+            self.max_queue_depth = max(self.max_queue_depth, depth + 1)
+
+        if waiter.event.wait(self.queue_timeout):
+            waited = time.monotonic() - waiter.enqueued_at
+            with self._lock:
+                (self.priority_wait_time if priority else self.wait_time).observe(waited)
+            return
+
+        with self._lock:
+            # Puede haberse concedido justo al vencer el plazo
+            if waiter.event.is_set():
+                (self.priority_wait_time if priority else self.wait_time).observe(
+                    time.monotonic() - waiter.enqueued_at
+                )
+                return
+            self._remove(waiter, priority)
+            self.timeouts += 1
+
+        logger.warning(f"⚠️ Sin hueco para llamar al LLM tras {self.queue_timeout}s (usuario {user})")
+        raise LLMUnavailableError("Cola del LLM saturada")
+
+    def _remove(self, waiter: _Waiter, priority: bool) -> None:
+        """Saca de la cola una petición que dejó de esperar."""
+        if priority:
+            self._priority.remove(waiter)
+            return
+
+        queue = self._queues[waiter.user]
+        queue.remove(waiter)
+        if not queue:
+            self._drop_user(waiter.user)
+
+    def _drop_user(self, user: str) -> None:
+        if self._rotation and self._rotation[0] == user:
+            self._turn_started = False
+        del self._queues[user]
+        del self._deficit[user]
+        self._rotation.remove(user)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+            while self._active < self.max_concurrency:
+                waiter = self._next_waiter()
+                if waiter is None:
+                    break
+                self._active += 1
+                self.admitted += 1
+                waiter.event.set()
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Elige la siguiente petición: carril prioritario y después Deficit Round Robin."""
+        if self._priority:
+            return self._priority.popleft()
+
+        while self._rotation:
+            user = self._rotation[0]
+
+            # Al empezar el turno de un usuario se le suma un cuanto
+            if not self._turn_started:
+                self._deficit[user] += self.quantum
+                self._turn_started = True
+
+            queue = self._queues[user]
+            if self._deficit[user] >= queue[0].cost:
+                waiter = queue.popleft()
+                self._deficit[user] -= waiter.cost
+                if not queue:
+                    self._drop_user(user)
+                return waiter
+
+            # No le alcanza: pasa al final y el déficit se conserva
+            self._rotation.rotate(-1)
+            self._turn_started = False
+
+        return None
+
+    def get_stats(self) -> Dict:
+        """Retorna ocupación, profundidad de cola e histogramas de espera."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "queued": self.queued,
+                "queued_priority": len(self._priority),
+                "queued_users": len(self._queues),
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "timeouts": self.timeouts,
+                "wait_time_seconds": self.wait_time.snapshot(),
+                "priority_wait_time_seconds": self.priority_wait_time.snapshot(),
+                "queue_depth": self.queue_depth.snapshot(),
+            }
@@ -0,0 +1,223 @@
+"""
+Single-flight: coalescencia de peticiones idénticas concurrentes.
+
+Si varias peticiones con la misma clave llegan mientras una ya está en curso,
+solo la primera (líder) ejecuta la llamada y el resto espera y comparte su
+resultado. No es una caché: en cuanto la llamada termina, la siguiente
+petición con esa clave vuelve a ejecutarse.
+
+El ámbito es el proceso (cada worker de uvicorn tiene su propio registro).
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin para next() sobre el stream real
+_END = object()
+
+
+class _Call:
+    """Llamada en curso compartida por el líder y sus seguidores."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamCall:
+    """Stream en curso: los fragmentos se acumulan para que los seguidores los repitan."""
+    
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.followers = 0  # Seguidores que aún están leyendo
+
+
+class SingleFlight:
+    """Registro de llamadas en curso indexadas por clave."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stream_hits = 0
+        self.stream_misses = 0
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta fn() o se une a la ejecución en curso con la misma clave.
+        
+        Args:
+            key: Clave que identifica peticiones equivalentes
+            fn: Función a ejecutar si no hay ninguna en curso
+        
+        Returns:
+            Tupla de (resultado, compartido). compartido es True si el
+            resultado proviene de la llamada de otra petición.
+        
+        Raises:
+            La misma excepción que lanzó la llamada del líder
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.hits += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.misses += 1
+                leader = True
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+    
+    def stream(self, key: str, fn: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+        """
+        Itera un stream compartiendo los fragmentos entre peticiones idénticas.
+        
+        Los seguidores que llegan tarde reciben primero los fragmentos ya
+        emitidos y después los nuevos según los produce el líder.
+        
+        Args:
+            key: Clave que identifica peticiones equivalentes
+            fn: Función que devuelve el iterable de fragmentos
+        
+        Yields:
+            Fragmentos del stream
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            if call is not None:
+                self.stream_hits += 1
+                with call.cond:
+                    call.followers += 1
+                leader = False
+            else:
+                call = _StreamCall()
+                self._streams[key] = call
+                self.stream_misses += 1
+                leader = True
+        
+        if leader:
+            return self._lead_stream(key, call, fn)
+        return self._follow_stream(call)
+    
+    def _lead_stream(self, key: str, call: _StreamCall, fn: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+        """Consume el stream real publicando cada fragmento para los seguidores."""
+        iterator = None
+        try:
+            iterator = iter(fn())
+            for chunk in iterator:
+                with call.cond:
+                    call.chunks.append(chunk)
+                    call.cond.notify_all()
+                yield chunk
+        except GeneratorExit:
+            # El cliente del líder se desconectó: se sigue consumiendo el stream
+            # solo mientras quede algún seguidor leyendo
+            if iterator is not None:
+                try:
+                    while self._has_followers(key, call):
+                        chunk = next(iterator, _END)
+                        if chunk is _END:
+                            break
+                        with call.cond:
+                            call.chunks.append(chunk)
+                            call.cond.notify_all()
+                except Exception as e:
+                    call.error = e
+                finally:
+                    # Libera la llamada al LLM (y su hueco en el scheduler) si se abandona
+                    close = getattr(iterator, "close", None)
+                    if close is not None:
+                        close()
+            raise
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            with call.cond:
+                call.finished = True
+                call.cond.notify_all()
+    
+    def _has_followers(self, key: str, call: _StreamCall) -> bool:
+        """
+        Comprueba si algún seguidor sigue leyendo el stream.
+        
+        Si no queda ninguno, retira la clave en el mismo paso (bajo el lock del
+        registro), así nadie se une a un stream que se va a abandonar.
+        """
+        with self._lock:
+            with call.cond:
+                if call.followers:
+                    return True
+            self._streams.pop(key, None)
+            return False
+    
+    def _follow_stream(self, call: _StreamCall) -> Iterator[Any]:
+        """Repite los fragmentos publicados por el líder."""
+        index = 0
+        try:
+            while True:
+                with call.cond:
+                    while index >= len(call.chunks) and not call.finished:
+                        call.cond.wait()
+                    pending = call.chunks[index:]
+                    finished = call.finished
+                
+                for chunk in pending:
+                    yield chunk
+                index += len(pending)
+                
+                if finished and index >= len(call.chunks):
+                    if call.error is not None:
+                        raise call.error
+                    return
+        finally:
+            # Terminado o desconectado: el líder deja de consumir por este seguidor
+            with call.cond:
+                call.followers -= 1
+    
+    def get_stats(self) -> Dict:
+        """Retorna contadores de coalescencia."""
+        with self._lock:
+            in_flight = len(self._calls)
+            streams_in_flight = len(self._streams)
+        
+        requests = self.hits + self.misses
+        stream_requests = self.stream_hits + self.stream_misses
+        
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "in_flight": in_flight,
+            "stream_hits": self.stream_hits,
+            "stream_misses": self.stream_misses,
+            "stream_hit_ratio": self.stream_hits / stream_requests if stream_requests else 0.0,
+            "streams_in_flight": streams_in_flight,
+        }
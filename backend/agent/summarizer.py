@@ -0,0 +1,138 @@
+"""
+Resúmenes acumulados de conversación por ticket.
+
+Cuando un ticket acumula demasiados mensajes sin resumir, la parte antigua se
+condensa (junto con el resumen previo) en un único texto guardado en
+ticket_summaries. El agente envía ese resumen + los turnos recientes en lugar
+del historial completo, y el resumen se calcula una vez, no en cada petición.
+"""
+from typing import Optional
+from uuid import UUID
+import threading
+import logging
+
+from agent.llm_client import get_llm_client
+from agent.usage_ledger import get_usage_ledger
+from core.config import settings
+from db import SessionLocal
+from db.repository import MessageRepository, TicketRepository, TicketSummaryRepository
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_PROMPT = """Eres un asistente que resume conversaciones de soporte sobre normativa AESA de drones.
+
+Actualiza el resumen de la conversación incorporando los nuevos mensajes. El resumen debe:
+- Conservar los datos concretos del usuario (categoría, dron, ubicación, fechas, trámites)
+- Recoger las preguntas planteadas y las respuestas o normas ya indicadas
+- Señalar lo que sigue pendiente o sin resolver
+- Ser breve (máximo 200 palabras) y estar en español"""
+
+
+class ConversationSummarizer:
+    """Mantiene el resumen acumulado de la conversación de cada ticket."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_progress: set[UUID] = set()
+
+    def update_if_needed(self, ticket_id: UUID) -> None:
+        """
+        Actualiza el resumen del ticket si el historial sin resumir supera el umbral.
+
+        Pensado para ejecutarse en segundo plano (BackgroundTasks): abre su propia
+        sesión de BD y nunca propaga errores.
+        """
+        with self._lock:
+            if ticket_id in self._in_progress:
+                return
+            self._in_progress.add(ticket_id)
+
+        db = SessionLocal()
+
+        try:
+            self._update(db, ticket_id)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error actualizando el resumen del ticket {ticket_id}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._in_progress.discard(ticket_id)
+
+    def _update(self, db, ticket_id: UUID) -> None:
+        """Pliega los mensajes antiguos sin resumir en el resumen del ticket."""
+        summary_repo = TicketSummaryRepository(db)
+        message_repo = MessageRepository(db)
+
+        summary = summary_repo.get_by_ticket(ticket_id)
+        after = summary.summarized_until if summary else None
+
+        pending = message_repo.list_conversation_messages(ticket_id, after=after)
+
+        if len(pending) <= settings.SUMMARY_TRIGGER_MESSAGES:
+            return
+
+        # Los turnos más recientes se siguen enviando tal cual
+        to_fold = pending[:-settings.SUMMARY_KEEP_RECENT] if settings.SUMMARY_KEEP_RECENT else pending
+
+        response = self._summarize(summary.content if summary else None, to_fold)
+        content = response["content"].strip()
+
+        ticket = TicketRepository(db).get_by_id(ticket_id)
+        get_usage_ledger().record(
+            response["metadata"],
+            operation="summary",
+            user_id=ticket.user_id if ticket else None,
+            ticket_id=ticket_id,
+            category=ticket.category.value if ticket else None
+        )
+
+        summary_repo.upsert(
+            ticket_id=ticket_id,
+            content=content,
+            summarized_until=to_fold[-1].created_at,
+            summarized_message_count=(summary.summarized_message_count if summary else 0) + len(to_fold)
+        )
+
+        logger.info(f"📝 Resumen del ticket {ticket_id} actualizado (+{len(to_fold)} mensajes)")
+
+    def _summarize(self, previous_summary: Optional[str], messages) -> dict:
+        """Pide al LLM el nuevo resumen a partir del anterior y los mensajes."""
+        transcript = "\n".join(
+            f"{'Usuario' if msg.role.value == 'user' else 'Asistente'}: {msg.content}"
+            for msg in messages
+        )
+
+        user_message = f"""RESUMEN ANTERIOR:
+{previous_summary or "(sin resumen previo)"}
+
+NUEVOS MENSAJES:
+{transcript}
+
+Escribe el resumen actualizado."""
+
+        return get_llm_client().chat_completion(
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.2,
+            max_tokens=400
+        )
+
+
+# Instancia global del resumidor
+_summarizer = None
+
+def get_summarizer() -> ConversationSummarizer:
+    """
+    Dependency para obtener el resumidor de conversaciones.
+    Usa singleton pattern.
+    """
+    global _summarizer
+
+    if _summarizer is None:
+        _summarizer = ConversationSummarizer()
+
+    return _summarizer
@@ -0,0 +1,73 @@
+"""
+Conteo aproximado de tokens y empaquetado del historial en un presupuesto.
+"""
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken no instalado o sin acceso a la tabla BPE
+    _encoding = None
+
+# Tokens extra que añade la API por cada mensaje (rol, separadores)
+TOKENS_PER_MESSAGE = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cuenta los tokens de un texto.
+
+    Usa tiktoken si está disponible; si no, estima ~4 caracteres por token.
+    """
+    if not text:
+        return 0
+
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Cuenta los tokens de una lista de mensajes en formato chat."""
+    return sum(count_tokens(msg["content"]) + TOKENS_PER_MESSAGE for msg in messages)
+
+
+def fit_history_to_budget(history: List[Dict], budget: int) -> List[Dict]:
+    """
+    Selecciona los turnos más recientes del historial que caben en el presupuesto.
+
+    Los mensajes se añaden del más reciente al más antiguo y se detiene en el
+    primero que no cabe, así nunca se pierde contexto reciente por incluir
+    uno antiguo. El resultado mantiene el orden cronológico.
+
+    Args:
+        history: Historial en orden cronológico [{"role": ..., "content": ...}]
+        budget: Tokens disponibles para el historial
+
+    Returns:
+        Sufijo del historial que cabe en el presupuesto
+    """
+    if budget <= 0 or not history:
+        return []
+
+    used = 0
+    start = len(history)
+
+    for i in range(len(history) - 1, -1, -1):
+        cost = count_tokens(history[i]["content"]) + TOKENS_PER_MESSAGE
+        if used + cost > budget:
+            break
+        used += cost
+        start = i
+
+    if start > 0:
+        logger.info(
+            f"✂️ Historial recortado: {len(history) - start}/{len(history)} mensajes "
+            f"({used} tokens de {budget})"
+        )
+
+    return history[start:]
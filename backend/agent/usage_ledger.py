@@ -0,0 +1,152 @@
+"""
+Registro de consumo de tokens del LLM con escritura por lotes.
+
+Cada llamada al LLM se acumula en memoria y se escribe en la BD en lotes
+(cada USAGE_LEDGER_BATCH_SIZE registros o USAGE_LEDGER_FLUSH_SECONDS), junto
+con la actualización incremental de los agregados diarios.
+"""
+from typing import Dict, List, Optional
+from datetime import datetime
+import threading
+import uuid
+import logging
+
+from core.config import settings
+from core.metrics import record_tokens
+from db import SessionLocal
+from db.repository.usage_repository import UsageRepository
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLedger:
+    """Búfer de registros de consumo que se vuelca a la BD por lotes."""
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self,
+        metadata: Dict,
+        operation: str,
+        user_id=None,
+        ticket_id=None,
+        category: Optional[str] = None
+    ) -> None:
+        """
+        Añade al búfer el consumo de una respuesta del LLM.
+
+        Args:
+            metadata: Metadata devuelta por LLMClient / RAGAgent
+            operation: Tipo de llamada (chat, chat_stream, summary...)
+            user_id: Usuario al que se imputa el consumo
+            ticket_id: Ticket al que se imputa el consumo
+            category: Categoría del ticket
+        """
+        # Respuestas degradadas o de la vía rápida: no hubo llamada al LLM
+        if not metadata.get("model"):
+            return
+
+        record_tokens(metadata)
+
+        # Las peticiones coalescidas no pagaron tokens (los pagó la líder)
+        coalesced = metadata.get("coalesced", False)
+
+        self._append({
+            "id": uuid.uuid4(),
+            "user_id": uuid.UUID(str(user_id)) if user_id else None,
+            "ticket_id": uuid.UUID(str(ticket_id)) if ticket_id else None,
+            "category": category or "none",
+            "model": metadata["model"],
+            "operation": operation,
+            "tokens_prompt": 0 if coalesced else int(metadata.get("tokens_prompt") or 0),
+            "tokens_completion": 0 if coalesced else int(metadata.get("tokens_completion") or 0),
+            "tokens_total": 0 if coalesced else int(metadata.get("tokens_total") or 0),
+            "created_at": datetime.utcnow(),
+        })
+
+    def _append(self, record: Dict) -> None:
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+
+        self._ensure_flusher()
+
+        if full:
+            self.flush()
+
+    def _ensure_flusher(self) -> None:
+        """Arranca el hilo que vuelca el búfer periódicamente."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Escribe en la BD los registros pendientes.
+
+        Returns:
+            Número de registros escritos
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+
+            if not batch:
+                return 0
+
+            db = SessionLocal()
+            try:
+                UsageRepository(db).record_batch(batch)
+                logger.info(f"🧾 Registrado el consumo de {len(batch)} llamadas al LLM")
+                return len(batch)
+            except Exception as e:
+                logger.error(f"❌ Error escribiendo el registro de consumo: {e}")
+                # Reencolar para el siguiente intento sin crecer sin límite
+                with self._lock:
+                    self._buffer = (batch + self._buffer)[-self.batch_size * 10:]
+                return 0
+            finally:
+                db.close()
+
+    def close(self) -> None:
+        """Detiene el hilo de volcado y escribe lo pendiente."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+
+# Instancia global del registro
+_usage_ledger = None
+
+def get_usage_ledger() -> UsageLedger:
+    """
+    Dependency para obtener el registro de consumo.
+    Usa singleton pattern.
+    """
+    global _usage_ledger
+
+    if _usage_ledger is None:
+        _usage_ledger = UsageLedger(
+            batch_size=settings.USAGE_LEDGER_BATCH_SIZE,
+            flush_interval=settings.USAGE_LEDGER_FLUSH_SECONDS
+        )
+
+    return _usage_ledger
@@ -18,8 +18,16 @@ from db.base import Base
 from db.models import (
     User,
     Ticket,
+    TicketStatusCounter,
     Message,
     Document,
+    TicketSummary,
+    LLMUsage,
+    LLMUsageDaily,
+    FAQEntry,
+    AgentJob,
+    RateLimitBucket,
+    RefreshToken,
 )
 
 # this is the Alembic Config object
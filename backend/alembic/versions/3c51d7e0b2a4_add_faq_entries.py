@@ -0,0 +1,39 @@
+"""Add faq_entries for the curated FAQ fast-path
+
+Revision ID: 3c51d7e0b2a4
+Revises: 88a8a3a52d9d
+Create Date: 2026-10-19 12:02:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3c51d7e0b2a4'
+down_revision = '88a8a3a52d9d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('faq_entries',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('keywords', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('sources', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_by', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('faq_entries')
@@ -0,0 +1,33 @@
+"""Add ticket_summaries table
+
+Revision ID: 69e6ec9bee65
+Revises: 6f3fd0fd825a
+Create Date: 2026-10-19 10:02:17.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '69e6ec9bee65'
+down_revision = '6f3fd0fd825a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ticket_summaries',
+    sa.Column('ticket_id', sa.UUID(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('summarized_until', sa.DateTime(), nullable=False),
+    sa.Column('summarized_message_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ),
+    sa.PrimaryKeyConstraint('ticket_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ticket_summaries')
@@ -0,0 +1,24 @@
+"""Composite index on messages (ticket_id, created_at)
+
+Revision ID: 6f3fd0fd825a
+Revises: a90243579bf5
+Create Date: 2026-10-19 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f3fd0fd825a'
+down_revision = 'a90243579bf5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_ticket_id_created_at', 'messages', ['ticket_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_ticket_id_created_at', table_name='messages')
@@ -0,0 +1,63 @@
+"""Add llm_usage ledger and llm_usage_daily rollups
+
+Revision ID: 88a8a3a52d9d
+Revises: 69e6ec9bee65
+Create Date: 2026-10-19 11:26:03.912774
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '88a8a3a52d9d'
+down_revision = '69e6ec9bee65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('llm_usage',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('ticket_id', sa.UUID(), nullable=True),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('operation', sa.String(length=50), nullable=False),
+    sa.Column('tokens_prompt', sa.Integer(), nullable=False),
+    sa.Column('tokens_completion', sa.Integer(), nullable=False),
+    sa.Column('tokens_total', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_usage_created_at'), 'llm_usage', ['created_at'], unique=False)
+    op.create_index(op.f('ix_llm_usage_ticket_id'), 'llm_usage', ['ticket_id'], unique=False)
+    op.create_index(op.f('ix_llm_usage_user_id'), 'llm_usage', ['user_id'], unique=False)
+    op.create_table('llm_usage_daily',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.Column('tokens_prompt', sa.Integer(), nullable=False),
+    sa.Column('tokens_completion', sa.Integer(), nullable=False),
+    sa.Column('tokens_total', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'user_id', 'category', 'model', name='uq_llm_usage_daily_key')
+    )
+    op.create_index(op.f('ix_llm_usage_daily_day'), 'llm_usage_daily', ['day'], unique=False)
+    op.create_index('ix_llm_usage_daily_user_id_day', 'llm_usage_daily', ['user_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_usage_daily_user_id_day', table_name='llm_usage_daily')
+    op.drop_index(op.f('ix_llm_usage_daily_day'), table_name='llm_usage_daily')
+    op.drop_table('llm_usage_daily')
+    op.drop_index(op.f('ix_llm_usage_user_id'), table_name='llm_usage')
+    op.drop_index(op.f('ix_llm_usage_ticket_id'), table_name='llm_usage')
+    op.drop_index(op.f('ix_llm_usage_created_at'), table_name='llm_usage')
+    op.drop_table('llm_usage')
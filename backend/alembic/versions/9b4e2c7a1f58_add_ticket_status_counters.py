@@ -0,0 +1,38 @@
+"""Add ticket_status_counters for O(1) operator stats
+
+Revision ID: 9b4e2c7a1f58
+Revises: 5d8b3f1a9c47
+Create Date: 2026-10-19 19:05:41.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e2c7a1f58'
+down_revision = '5d8b3f1a9c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ticket_status_counters',
+    sa.Column('status', postgresql.ENUM('OPEN', 'IN_PROGRESS', 'ESCALATED', 'CLOSED', name='ticketstatus', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('status')
+    )
+    
+    # Una fila por estado con el recuento actual (también los estados sin tickets)
+    op.execute("""
+        INSERT INTO ticket_status_counters (status, count)
+        SELECT s.status, COUNT(t.id)
+        FROM unnest(enum_range(NULL::ticketstatus)) AS s(status)
+        LEFT JOIN tickets t ON t.status = s.status
+        GROUP BY s.status
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('ticket_status_counters')
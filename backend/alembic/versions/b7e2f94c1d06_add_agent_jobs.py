@@ -0,0 +1,48 @@
+"""Add agent_jobs persistent queue
+
+Revision ID: b7e2f94c1d06
+Revises: 3c51d7e0b2a4
+Create Date: 2026-10-19 12:40:17.503921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2f94c1d06'
+down_revision = '3c51d7e0b2a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('agent_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('ticket_id', sa.UUID(), nullable=False),
+    sa.Column('message_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'DONE', 'FAILED', name='jobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ),
+    sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('message_id')
+    )
+    op.create_index('ix_agent_jobs_status_run_after', 'agent_jobs', ['status', 'run_after'], unique=False)
+    op.create_index(op.f('ix_agent_jobs_ticket_id'), 'agent_jobs', ['ticket_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_agent_jobs_ticket_id'), table_name='agent_jobs')
+    op.drop_index('ix_agent_jobs_status_run_after', table_name='agent_jobs')
+    op.drop_table('agent_jobs')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,32 @@
+"""Add denormalized message_count to tickets
+
+Revision ID: c3f8a61d2e90
+Revises: 9b4e2c7a1f58
+Create Date: 2026-10-19 19:41:12.507316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a61d2e90'
+down_revision = '9b4e2c7a1f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tickets', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    
+    # Rellenar con los mensajes existentes
+    op.execute("""
+        UPDATE tickets
+        SET message_count = counts.total
+        FROM (SELECT ticket_id, COUNT(*) AS total FROM messages GROUP BY ticket_id) AS counts
+        WHERE tickets.id = counts.ticket_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('tickets', 'message_count')
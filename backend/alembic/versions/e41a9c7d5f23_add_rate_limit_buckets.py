@@ -0,0 +1,32 @@
+"""Add rate_limit_buckets shared rate limiting state
+
+Revision ID: e41a9c7d5f23
+Revises: b7e2f94c1d06
+Create Date: 2026-10-19 16:05:42.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41a9c7d5f23'
+down_revision = 'b7e2f94c1d06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=200), nullable=False),
+    sa.Column('tat', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    prefixes=['UNLOGGED']
+    )
+    op.create_index(op.f('ix_rate_limit_buckets_tat'), 'rate_limit_buckets', ['tat'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rate_limit_buckets_tat'), table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
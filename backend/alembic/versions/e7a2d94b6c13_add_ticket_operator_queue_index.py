@@ -0,0 +1,29 @@
+"""Composite index for the operator queue on tickets
+
+Revision ID: e7a2d94b6c13
+Revises: c3f8a61d2e90
+Create Date: 2026-10-19 20:17:36.904482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2d94b6c13'
+down_revision = 'c3f8a61d2e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_tickets_operator_queue',
+        'tickets',
+        ['status', sa.text('priority DESC'), sa.text('coalesce(escalated_at, created_at)'), 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tickets_operator_queue', table_name='tickets')
@@ -2,19 +2,21 @@
 Endpoints de autenticación: registro, login, perfil.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from db import get_db
-from db.repository import UserRepository
-from schemas import UserCreate, UserLogin, UserResponse, Token
+from db import get_async_db
+from db.repository import AsyncUserRepository, AsyncRefreshTokenRepository
+from schemas import UserCreate, UserLogin, UserResponse, Token, RefreshRequest
+from core.auth_cache import get_principal
+from core.config import settings
 from core.security import create_access_token, get_current_user_id
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Registra un nuevo usuario.
     
@@ -22,10 +24,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     - **password**: Contraseña (mínimo 8 caracteres)
     - **full_name**: Nombre completo (opcional)
     """
-    repo = UserRepository(db)
+    repo = AsyncUserRepository(db)
     
     # Verificar si el email ya existe
-    existing_user = repo.get_by_email(user_data.email)
+    existing_user = await repo.get_by_email(user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,7 +35,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Crear usuario
-    user = repo.create(
+    user = await repo.create(
         email=user_data.email,
         password=user_data.password,
         full_name=user_data.full_name
@@ -49,17 +51,20 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
-    Inicia sesión y retorna un token JWT.
+    Inicia sesión y retorna un token JWT y un refresh token.
     
     - **email**: Email del usuario
     - **password**: Contraseña
+    
+    Cuando caduque el access token, `POST /api/auth/refresh` con el refresh
+    token da uno nuevo sin volver a pedir la contraseña.
     """
-    repo = UserRepository(db)
+    repo = AsyncUserRepository(db)
     
     # Autenticar usuario
-    user = repo.authenticate(credentials.email, credentials.password)
+    user = await repo.authenticate(credentials.email, credentials.password)
     
     if not user:
         raise HTTPException(
@@ -68,28 +73,75 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Crear token JWT
-    access_token = create_access_token(data={"sub": str(user.id)})
+    # Crear token JWT y abrir la sesión (refresh token)
+    refresh_token = await AsyncRefreshTokenRepository(db).issue(user.id)
+    
+    return _token_response(str(user.id), refresh_token)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Renueva el access token con un refresh token, sin contraseña.
+    
+    El refresh token se rota: la respuesta trae uno nuevo y el usado deja de
+    valer. Reutilizar un refresh token ya canjeado cierra la sesión entera.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido o caducado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    repo = AsyncRefreshTokenRepository(db)
+    rotated = await repo.rotate(data.refresh_token)
     
+    if not rotated:
+        raise invalid
+    
+    refresh_token, user_id = rotated
+    
+    # Un usuario desactivado no puede renovar su sesión
+    principal = await get_principal(db, str(user_id))
+    if not principal or not principal.is_active:
+        await repo.revoke(refresh_token)
+        raise invalid
+    
+    return _token_response(str(user_id), refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(data: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cierra la sesión: revoca el refresh token y los que se emitieron a partir
+    del mismo login. El access token vigente caduca por sí solo.
+    """
+    await AsyncRefreshTokenRepository(db).revoke(data.refresh_token)
+
+
+def _token_response(user_id: str, refresh_token: str) -> dict:
+    """Access token nuevo junto al refresh token de la sesión."""
     return {
-        "access_token": access_token,
-        "token_type": "bearer"
+        "access_token": create_access_token(data={"sub": user_id}),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     }
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene el perfil del usuario autenticado.
     
     Requiere: Token JWT en el header Authorization
     """
-    repo = UserRepository(db)
+    repo = AsyncUserRepository(db)
     
-    user = repo.get_by_id(UUID(user_id))
+    user = await repo.get_by_id(UUID(user_id))
     
     if not user:
         raise HTTPException(
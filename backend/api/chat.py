@@ -1,42 +1,56 @@
 """
 Endpoints para chat (mensajes dentro de tickets).
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from uuid import UUID
+import asyncio
+import json
+import logging
 
-from db import get_db
-from db.repository import TicketRepository, MessageRepository
+from db import get_async_db, SessionLocal, AsyncSessionLocal
+from db.repository import (
+    TicketRepository,
+    MessageRepository,
+    AsyncTicketRepository,
+    AsyncMessageRepository,
+    AsyncJobRepository,
+)
 from db.models import MessageRole
-from schemas import MessageCreate, MessageResponse, ChatHistoryResponse
-from core.security import get_current_user_id
+from schemas import MessageCreate, MessageResponse, ChatHistoryResponse, AgentJobResponse
+from core.auth_cache import get_principal
+from core.config import settings
+from core.etag import compute_etag, is_not_modified, not_modified_response, set_etag
+from core.metrics import observe_stage
+from core.pagination import decode_cursor, encode_cursor
+from core.responses import FastJSONResponse
+from core.security import decode_access_token, get_current_user_id
+from agent.faq import get_faq_index
+from agent.replies import (
+    DOC_TYPE_BY_CATEGORY,
+    generate_reply,
+    load_conversation,
+    save_agent_reply,
+    save_agent_error,
+)
+from realtime import get_message_broker, serialize_message
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/{ticket_id}/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def send_message(
-    ticket_id: UUID,
-    message_data: MessageCreate,
-    user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
-):
+async def _get_writable_ticket(ticket_repo: AsyncTicketRepository, ticket_id: UUID, user_id: str):
     """
-    Envía un mensaje del usuario en un ticket y recibe respuesta automática del agente.
+    Obtiene un ticket en el que el usuario puede escribir.
     
-    - **ticket_id**: ID del ticket
-    - **content**: Contenido del mensaje
-    
-    El agente buscará información en los PDFs de AESA y generará una respuesta automática.
+    Raises:
+        HTTPException: Si no existe, no pertenece al usuario o está cerrado
     """
-    from agent import get_rag_agent
-    from db.models import TicketStatus
-    
-    ticket_repo = TicketRepository(db)
-    message_repo = MessageRepository(db)
-    
-    # Verificar que el ticket existe y pertenece al usuario
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -57,125 +71,551 @@ async def send_message(
             detail="No puedes enviar mensajes en un ticket cerrado"
         )
     
+    return ticket
+
+
+async def _get_readable_ticket(db: AsyncSession, ticket_id: UUID, user_id: str):
+    """
+    Obtiene un ticket cuyo chat puede ver el usuario (su dueño o un admin).
+    
+    Raises:
+        HTTPException: Si no existe o el usuario no tiene permiso
+    """
+    ticket = await AsyncTicketRepository(db).get_by_id(ticket_id)
+    
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket no encontrado"
+        )
+    
+    if str(ticket.user_id) != user_id:
+        principal = await get_principal(db, user_id)
+        
+        if not principal or not principal.is_active or not principal.is_admin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para ver este chat"
+            )
+    
+    return ticket
+
+
+def _schedule_summary_update(background_tasks: BackgroundTasks, ticket_id: UUID) -> None:
+    """Programa la actualización del resumen del ticket tras la respuesta."""
+    if not settings.SUMMARY_ENABLED:
+        return
+    
+    from agent.summarizer import get_summarizer
+    
+    background_tasks.add_task(get_summarizer().update_if_needed, ticket_id)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Formatea un evento Server-Sent Events."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@router.post("/{ticket_id}/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
+async def send_message(
+    ticket_id: UUID,
+    message_data: MessageCreate,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Envía un mensaje del usuario en un ticket; el agente responde en diferido.
+    
+    - **ticket_id**: ID del ticket
+    - **content**: Contenido del mensaje
+    
+    Se guarda el mensaje, se encola la respuesta del agente y se responde al
+    momento. El `meta_data.agent_job_id` del mensaje devuelto permite consultar
+    el estado en `GET /{ticket_id}/jobs/{job_id}`; la respuesta aparece en el
+    historial cuando el trabajo termina. Si la consulta coincide con una FAQ
+    curada se responde con el texto aprobado; si no, el agente busca en los
+    PDFs de AESA y genera la respuesta.
+    """
+    ticket_repo = AsyncTicketRepository(db)
+    message_repo = AsyncMessageRepository(db)
+    
+    # Verificar que el ticket existe, pertenece al usuario y está abierto
+    ticket = await _get_writable_ticket(ticket_repo, ticket_id, user_id)
+    
+    if settings.AGENT_ASYNC_REPLIES:
+        # Mensaje y trabajo en una sola transacción: si algo falla no queda un
+        # mensaje sin respuesta encolada (y reintentar no lo duplica)
+        with observe_stage("db_write"):
+            user_message = await message_repo.add(ticket_id, MessageRole.USER, message_data.content)
+            # agent_jobs.message_id apunta a messages sin relationship y sin
+            # autoflush: el mensaje tiene que insertarse antes que el trabajo
+            await db.flush()
+            job = AsyncJobRepository(db).add(
+                ticket_id=ticket_id,
+                message_id=user_message.id,
+                user_id=ticket.user_id
+            )
+            
+            user_message.meta_data = {"agent_job_id": str(job.id)}
+            await db.commit()
+        
+        return user_message
+    
     # Crear mensaje del usuario
-    user_message = message_repo.create_user_message(
-        ticket_id=ticket_id,
-        content=message_data.content
-    )
+    with observe_stage("db_write"):
+        user_message = await message_repo.create_user_message(
+            ticket_id=ticket_id,
+            content=message_data.content
+        )
     
-    # Obtener historial de conversación
-    conversation_history = message_repo.get_conversation_history(ticket_id, limit=10)
+    return await _reply_inline(db, ticket, user_message, user_id, background_tasks)
+
+
+async def _reply_inline(db: AsyncSession, ticket, user_message, user_id: str, background_tasks: BackgroundTasks):
+    """Genera la respuesta del agente dentro de la petición (AGENT_ASYNC_REPLIES=False)."""
+    from agent import get_rag_agent
+    
+    # Obtener resumen + turnos recientes de la conversación. Los helpers que
+    # comparte con los workers son síncronos: run_sync los ejecuta sobre la
+    # conexión asíncrona sin bloquear el event loop.
+    summary, conversation_history = await db.run_sync(load_conversation, ticket.id, user_message.id)
     
-    # Generar respuesta del agente
     try:
         agent = get_rag_agent()
         
-        # Determinar tipo de documento según categoría del ticket
-        doc_type_map = {
-            "licensing": "pdf_aesa_a2",  # Por defecto A2
-            "technical": None  # Buscar en todos
-        }
-        doc_type = doc_type_map.get(ticket.category.value)
-        
-        # Generar respuesta
-        agent_response = agent.generate_response(
-            user_query=message_data.content,
+        # Generar respuesta en el threadpool: el cliente LLM es síncrono y así
+        # no bloquea el event loop (y las peticiones idénticas pueden coalescer)
+        agent_response = await run_in_threadpool(
+            generate_reply,
+            agent,
+            user_query=user_message.content,
+            category=ticket.category.value,
             conversation_history=conversation_history,
-            document_type=doc_type
-        )
-        
-        # Crear mensaje del asistente
-        assistant_message = message_repo.create_assistant_message(
-            ticket_id=ticket_id,
-            content=agent_response["content"],
-            metadata={
-                "sources": agent_response["sources"],
-                "tokens_used": agent_response["metadata"]["tokens_total"],
-                "model": agent_response["metadata"]["model"]
-            }
+            summary=summary,
+            user_id=user_id
         )
         
-        # Verificar si debe escalarse
-        should_escalate, escalate_reason = agent.should_escalate(agent_response)
-        
-        if should_escalate:
-            # Marcar ticket como escalado
-            ticket_repo.escalate(ticket_id)
-            
-            # Crear mensaje del sistema
-            message_repo.create_system_message(
-                ticket_id=ticket_id,
-                content=f"🔔 Este ticket ha sido escalado a un operador humano. Razón: {escalate_reason}"
+        await db.run_sync(
+            lambda sync_db: save_agent_reply(
+                TicketRepository(sync_db), MessageRepository(sync_db), ticket.id, agent, agent_response,
+                user_id=user_id, category=ticket.category.value, reply_to=user_message.id
             )
-        
-        # Retornar el mensaje del usuario (el del asistente se verá en el historial)
-        return user_message
+        )
+        _schedule_summary_update(background_tasks, ticket.id)
         
     except Exception as e:
-        # Si falla el agente, crear mensaje de error
-        message_repo.create_system_message(
+        # Si falla el agente, crear mensaje de error y escalar el ticket
+        error = e
+        await db.rollback()
+        await db.run_sync(
+            lambda sync_db: save_agent_error(TicketRepository(sync_db), MessageRepository(sync_db), ticket.id, error)
+        )
+    
+    # Retornar el mensaje del usuario (el del asistente se verá en el historial)
+    return user_message
+
+
+@router.get("/{ticket_id}/jobs/{job_id}", response_model=AgentJobResponse)
+async def get_agent_job(
+    ticket_id: UUID,
+    job_id: UUID,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Estado de la respuesta en diferido de un mensaje.
+    
+    Cuando `status` es `done`, `reply` contiene el mensaje del asistente.
+    """
+    ticket = await AsyncTicketRepository(db).get_by_id(ticket_id)
+    job = await AsyncJobRepository(db).get_by_id(job_id)
+    
+    if not ticket or not job or job.ticket_id != ticket_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trabajo no encontrado"
+        )
+    
+    if str(ticket.user_id) != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para ver este ticket"
+        )
+    
+    reply = await AsyncMessageRepository(db).get_reply_to(job.ticket_id, job.message_id)
+    
+    return AgentJobResponse(
+        id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        reply=MessageResponse.model_validate(reply) if reply else None
+    )
+
+
+@router.post("/{ticket_id}/messages/stream")
+async def send_message_stream(
+    ticket_id: UUID,
+    message_data: MessageCreate,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Variante de envío de mensaje que devuelve la respuesta del agente en streaming (SSE).
+    
+    - **ticket_id**: ID del ticket
+    - **content**: Contenido del mensaje
+    
+    Eventos emitidos (`text/event-stream`):
+    - `user_message`: mensaje del usuario ya guardado
+    - `token`: fragmento de texto de la respuesta según se genera
+    - `done`: mensaje del asistente guardado, fuentes y decisión de escalado
+    - `error`: el agente falló; el ticket se ha escalado
+    """
+    ticket_repo = AsyncTicketRepository(db)
+    message_repo = AsyncMessageRepository(db)
+    
+    ticket = await _get_writable_ticket(ticket_repo, ticket_id, user_id)
+    
+    with observe_stage("db_write"):
+        user_message = await message_repo.create_user_message(
             ticket_id=ticket_id,
-            content=f"⚠️ Error al generar respuesta automática: {str(e)}"
+            content=message_data.content
         )
+    
+    summary, conversation_history = await db.run_sync(load_conversation, ticket_id, user_message.id)
+    category = ticket.category.value
+    document_type = DOC_TYPE_BY_CATEGORY.get(category)
+    user_message_data = MessageResponse.model_validate(user_message).model_dump(mode="json")
+    
+    def event_stream():
+        # Generador síncrono: Starlette lo itera en el threadpool, así el
+        # cliente síncrono de OpenAI no bloquea el event loop. La sesión de la
+        # petición ya se ha cerrado cuando se consume, así que usamos una propia.
+        from agent import get_rag_agent
         
-        # Escalar el ticket
-        ticket_repo.escalate(ticket_id)
+        yield _sse_event("user_message", user_message_data)
         
-        return user_message
+        stream_db = SessionLocal()
+        stream_ticket_repo = TicketRepository(stream_db)
+        stream_message_repo = MessageRepository(stream_db)
+        
+        try:
+            agent = get_rag_agent()
+            with observe_stage("faq_lookup"):
+                agent_response = get_faq_index().answer(message_data.content, category)
+            
+            if agent_response is not None:
+                # FAQ curada: el texto aprobado va en un único fragmento
+                yield _sse_event("token", {"content": agent_response["content"]})
+            else:
+                for event in agent.generate_response_stream(
+                    user_query=message_data.content,
+                    conversation_history=conversation_history,
+                    document_type=document_type,
+                    summary=summary,
+                    user_id=user_id
+                ):
+                    if event["type"] == "token":
+                        yield _sse_event("token", {"content": event["content"]})
+                    else:
+                        agent_response = event["response"]
+            
+            # Persistir el mensaje del asistente una vez completado el stream
+            assistant_message, escalated, reason = save_agent_reply(
+                stream_ticket_repo, stream_message_repo, ticket_id, agent, agent_response,
+                user_id=user_id, category=category, operation="chat_stream",
+                reply_to=user_message_data["id"]
+            )
+            
+            yield _sse_event("done", {
+                "message": MessageResponse.model_validate(assistant_message).model_dump(mode="json"),
+                "sources": agent_response["sources"],
+                "escalated": escalated,
+                "escalation_reason": reason or None
+            })
+            
+        except Exception as e:
+            logger.error(f"❌ Error en streaming del agente: {e}")
+            stream_db.rollback()
+            save_agent_error(stream_ticket_repo, stream_message_repo, ticket_id, e)
+            yield _sse_event("error", {"detail": str(e), "escalated": True})
+            
+        finally:
+            stream_db.close()
+    
+    # Las tareas en segundo plano se ejecutan cuando termina el stream
+    _schedule_summary_update(background_tasks, ticket_id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        background=background_tasks,
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Evitar buffering en nginx
+        }
+    )
 
 
 @router.get("/{ticket_id}/messages", response_model=ChatHistoryResponse)
 async def get_chat_history(
     ticket_id: UUID,
+    request: Request,
+    limit: int = Query(1000, ge=1, le=1000, description="Mensajes por página"),
+    before: Optional[str] = Query(None, description="Cursor: mensajes anteriores a esta posición"),
+    after: Optional[str] = Query(None, description="Cursor: solo los mensajes nuevos desde esta posición"),
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Obtiene el historial completo de mensajes de un ticket.
+    Obtiene el historial de mensajes de un ticket, paginado por cursor.
     
     - **ticket_id**: ID del ticket
+    - **limit**: Mensajes por página (default: 1000)
+    - **before**: `before_cursor` de una respuesta previa para cargar mensajes anteriores
+    - **after**: `after_cursor` de una respuesta previa para pedir solo lo nuevo
     
-    Retorna todos los mensajes ordenados cronológicamente.
+    Sin cursores retorna los `limit` mensajes más recientes en orden
+    cronológico y el total. Con `after` el coste depende solo de los mensajes
+    nuevos; para recibirlos sin preguntar usar `GET /{ticket_id}/events` o
+    `/{ticket_id}/ws`. Devuelve `ETag`; con `If-None-Match` responde 304 si
+    no hay cambios.
     """
-    ticket_repo = TicketRepository(db)
-    message_repo = MessageRepository(db)
-    
-    # Verificar que el ticket existe
-    ticket = ticket_repo.get_by_id(ticket_id)
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usa before o after, no ambos"
+        )
     
-    if not ticket:
+    try:
+        before_position = decode_cursor(before) if before else None
+        after_position = decode_cursor(after) if after else None
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ticket no encontrado"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     
+    message_repo = AsyncMessageRepository(db)
+    
     # Verificar permisos: el dueño del ticket O un admin puede ver el chat
-    from db.models import User
-    user = db.query(User).filter(User.id == user_id).first()
+    await _get_readable_ticket(db, ticket_id, user_id)
     
-    if str(ticket.user_id) != user_id and (not user or not user.is_admin):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para ver este chat"
-        )
+    # Versión del historial (nº de mensajes y último mensaje)
+    version = await message_repo.get_version(ticket_id)
+    etag = compute_etag("messages", ticket_id, limit, before, after, *version)
+    
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     
     # Obtener mensajes
-    messages = message_repo.list_by_ticket(ticket_id)
-    total = message_repo.count_by_ticket(ticket_id)
+    messages, has_more = await message_repo.list_page(
+        ticket_id, limit, before=before_position, after=after_position
+    )
+    
+    # El total (contador del ticket, ya leído para el ETag) solo en la carga inicial
+    total = version[0] if before is None and after is None else None
     
-    return ChatHistoryResponse(
+    history = ChatHistoryResponse(
         ticket_id=ticket_id,
         messages=messages,
-        total_messages=total
+        total_messages=total,
+        has_more=has_more,
+        before_cursor=encode_cursor(messages[0].created_at, messages[0].id) if messages else before,
+        after_cursor=encode_cursor(messages[-1].created_at, messages[-1].id) if messages else after
+    )
+    
+    # Validado una vez desde el ORM y serializado directamente a JSON
+    response = FastJSONResponse(history)
+    set_etag(response, etag)
+    
+    return response
+
+
+async def _missed_messages(db: AsyncSession, ticket_id: UUID, after: Optional[UUID]) -> list[dict]:
+    """Mensajes posteriores a `after` (el último que recibió el cliente)."""
+    if after is None:
+        return []
+    
+    message_repo = AsyncMessageRepository(db)
+    last_seen = await message_repo.get_by_id(after)
+    
+    if last_seen is None or last_seen.ticket_id != ticket_id:
+        return []
+    
+    messages, _ = await message_repo.list_page(ticket_id, 1000, after=(last_seen.created_at, last_seen.id))
+    return [serialize_message(message) for message in messages]
+
+
+def _parse_message_id(value: Optional[str]) -> Optional[UUID]:
+    try:
+        return UUID(value) if value else None
+    except ValueError:
+        return None
+
+
+@router.get("/{ticket_id}/events")
+async def subscribe_ticket_events(
+    ticket_id: UUID,
+    request: Request,
+    after: Optional[UUID] = Query(None, description="Último mensaje recibido (reenvía los posteriores)"),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Suscripción (SSE) a los mensajes nuevos de un ticket.
+    
+    - **ticket_id**: ID del ticket
+    - **after**: ID del último mensaje que tiene el cliente; también se acepta
+      la cabecera `Last-Event-ID` que envía EventSource al reconectar
+    
+    Eventos emitidos (`text/event-stream`):
+    - `message`: mensaje nuevo (mismo formato que el historial); el `id` del
+      evento es el del mensaje
+    - `resync`: el cliente se ha quedado atrás; debe reconectar con `after`
+    
+    Cada `REALTIME_HEARTBEAT_SECONDS` se envía un comentario keep-alive.
+    """
+    await _get_readable_ticket(db, ticket_id, user_id)
+    
+    after = after or _parse_message_id(request.headers.get("last-event-id"))
+    
+    # Suscribirse antes de leer lo pendiente: así no se pierde nada entre medias
+    broker = get_message_broker()
+    queue = broker.subscribe(ticket_id)
+    
+    try:
+        missed = await _missed_messages(db, ticket_id, after)
+    except Exception:
+        broker.unsubscribe(ticket_id, queue)
+        raise
+    
+    def message_event(message: dict) -> str:
+        return f"id: {message['id']}\n" + _sse_event("message", message)
+    
+    async def event_stream():
+        try:
+            sent = set()
+            for message in missed:
+                sent.add(message["id"])
+                yield message_event(message)
+            
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.REALTIME_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                
+                if message is None:
+                    yield _sse_event("resync", {"detail": "Demasiados eventos pendientes, reconecta con after"})
+                    break
+                
+                if message["id"] not in sent:
+                    yield message_event(message)
+        finally:
+            broker.unsubscribe(ticket_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Evitar buffering en nginx
+        }
     )
 
 
+@router.websocket("/{ticket_id}/ws")
+async def ticket_events_websocket(
+    websocket: WebSocket,
+    ticket_id: UUID,
+    token: str = Query(..., description="Token JWT (los navegadores no envían cabeceras en WebSocket)"),
+    after: Optional[UUID] = Query(None, description="Último mensaje recibido (reenvía los posteriores)")
+):
+    """
+    Suscripción (WebSocket) a los mensajes nuevos de un ticket.
+    
+    Mensajes enviados al cliente (JSON):
+    - `{"type": "message", "message": {...}}`: mensaje nuevo
+    - `{"type": "ping"}`: keep-alive
+    - `{"type": "resync"}`: el cliente se ha quedado atrás; debe reconectar con `after`
+    """
+    try:
+        user_id = decode_access_token(token).get("sub")
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+        
+        async with AsyncSessionLocal() as db:
+            await _get_readable_ticket(db, ticket_id, user_id)
+            
+            broker = get_message_broker()
+            queue = broker.subscribe(ticket_id)
+            
+            try:
+                missed = await _missed_messages(db, ticket_id, after)
+            except Exception:
+                broker.unsubscribe(ticket_id, queue)
+                raise
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    async def forward():
+        sent = set()
+        for message in missed:
+            sent.add(message["id"])
+            await websocket.send_json({"type": "message", "message": message})
+        
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=settings.REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping"})
+                continue
+            
+            if message is None:
+                await websocket.send_json({"type": "resync"})
+                return
+            
+            if message["id"] not in sent:
+                await websocket.send_json({"type": "message", "message": message})
+    
+    async def drain():
+        # El cliente no envía nada; solo se lee para detectar la desconexión
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+    
+    await websocket.accept()
+    
+    forward_task = asyncio.create_task(forward())
+    drain_task = asyncio.create_task(drain())
+    try:
+        done, pending = await asyncio.wait([forward_task, drain_task], return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+    finally:
+        broker.unsubscribe(ticket_id, queue)
+    
+    if forward_task in done and forward_task.exception() is None:
+        # resync: cerrar para que el cliente reconecte
+        await websocket.close()
+
+
 @router.get("/{ticket_id}/conversation", response_model=dict)
 async def get_conversation_for_agent(
     ticket_id: UUID,
     limit: int = 20,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene el historial de conversación en formato para el agente.
@@ -186,11 +626,10 @@ async def get_conversation_for_agent(
     Retorna mensajes en formato: [{"role": "user|assistant", "content": "..."}]
     Útil para enviar al agente LLM.
     """
-    ticket_repo = TicketRepository(db)
-    message_repo = MessageRepository(db)
+    ticket_repo = AsyncTicketRepository(db)
     
     # Verificar que el ticket existe y pertenece al usuario
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -205,7 +644,9 @@ async def get_conversation_for_agent(
         )
     
     # Obtener conversación en formato para el agente
-    conversation = message_repo.get_conversation_history(ticket_id, limit=limit)
+    conversation = await db.run_sync(
+        lambda sync_db: MessageRepository(sync_db).get_conversation_history(ticket_id, limit=limit)
+    )
     
     return {
         "ticket_id": str(ticket_id),
@@ -1,31 +1,36 @@
 """
 Endpoints para operadores/administradores del helpdesk.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
+from datetime import date, datetime, timedelta
 
-from db import get_db
-from db.repository import TicketRepository, MessageRepository
-from db.models import TicketStatus
-from schemas.ticket import TicketResponse, TicketListResponse
+from db import get_async_db
+from db.repository import AsyncTicketRepository, AsyncMessageRepository, UsageRepository, FAQRepository
+from db.models import TicketStatus, TicketPriority
+from schemas.ticket import TicketResponse, TicketListResponse, OperatorQueueTicket, OperatorQueueResponse
 from schemas.message import MessageCreate, MessageResponse
+from schemas.faq import FAQCreate, FAQUpdate, FAQResponse
+from core.auth_cache import get_principal
+from core.config import settings
+from core.etag import compute_etag, is_not_modified, not_modified_response, set_etag
+from core.pagination import decode_queue_cursor, encode_queue_cursor
+from core.responses import FastJSONResponse
 from core.security import get_current_user_id
 
 router = APIRouter(prefix="/api/operator", tags=["operator"])
 
 
-def get_current_admin_user(
+async def get_current_admin_user(
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Dependency para verificar que el usuario es admin."""
-    from db.models import User
+    """Dependency para verificar que el usuario es admin (con la cache de principals)."""
+    principal = await get_principal(db, user_id)
     
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if not user or not user.is_admin:
+    if not principal or not principal.is_active or not principal.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos de operador"
@@ -34,65 +39,158 @@ def get_current_admin_user(
     return user_id
 
 
+def _parse_status_filter(status_filter: Optional[str]) -> list[TicketStatus]:
+    """
+    Estados de un filtro separado por comas (escalated,in_progress).
+    
+    Sin filtro: escalados y en progreso.
+    
+    Raises:
+        HTTPException 400: Si algún estado no existe
+    """
+    if not status_filter:
+        return [TicketStatus.ESCALATED, TicketStatus.IN_PROGRESS]
+    
+    statuses = []
+    for value in status_filter.split(','):
+        try:
+            statuses.append(TicketStatus(value.strip().lower()))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Estado no válido: {value.strip()!r}. Valores posibles: {', '.join(s.value for s in TicketStatus)}"
+            )
+    
+    # Sin duplicados, en el orden pedido
+    return list(dict.fromkeys(statuses))
+
+
+def _sla_minutes(priority: TicketPriority) -> int:
+    """Minutos de espera permitidos para una prioridad."""
+    return {
+        TicketPriority.URGENT: settings.SLA_URGENT_MINUTES,
+        TicketPriority.HIGH: settings.SLA_HIGH_MINUTES,
+        TicketPriority.MEDIUM: settings.SLA_MEDIUM_MINUTES,
+        TicketPriority.LOW: settings.SLA_LOW_MINUTES,
+    }[priority]
+
+
 @router.get("/tickets", response_model=TicketListResponse)
 async def list_operator_tickets(
+    request: Request,
     status_filter: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
     user_id: str = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista todos los tickets para operadores.
     
     Por defecto muestra tickets escalados y en progreso.
     Los operadores pueden ver tickets de todos los usuarios.
+    Devuelve `ETag`; con `If-None-Match` responde 304 si nada ha cambiado.
     """
-    from db.models import Ticket
+    # Si no se especifica filtro, mostrar escalados y en progreso (400 si algún estado no existe)
+    statuses = _parse_status_filter(status_filter)
     
-    # Si no se especifica filtro, mostrar escalados y en progreso
-    if not status_filter:
-        query = db.query(Ticket).filter(
-            Ticket.status.in_([TicketStatus.ESCALATED, TicketStatus.IN_PROGRESS])
-        )
-    else:
-        # Parsear filtro de status (puede ser múltiple separado por comas)
-        statuses = [s.strip().upper() for s in status_filter.split(',')]
-        query = db.query(Ticket).filter(Ticket.status.in_(statuses))
+    ticket_repo = AsyncTicketRepository(db)
     
-    # Ordenar por más reciente primero
-    query = query.order_by(Ticket.created_at.desc())
+    # Versión del listado (una consulta agregada) antes de cargar nada
+    version = await ticket_repo.list_version_by_status(statuses)
+    etag = compute_etag("operator_tickets", ",".join(sorted(s.value for s in statuses)), page, page_size, *version)
     
-    # Contar total
-    total = query.count()
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     
-    # Paginación
+    # Más reciente primero (message_count es una columna: sin cargar mensajes)
     offset = (page - 1) * page_size
-    tickets = query.offset(offset).limit(page_size).all()
-    
-    # El message_count ya es una property del modelo Ticket
-    # No necesitamos calcularlo manualmente
+    tickets, total = await ticket_repo.list_by_status(
+        statuses,
+        skip=offset,
+        limit=page_size
+    )
     
-    return TicketListResponse(
+    # Validado una vez desde el ORM y serializado directamente a JSON
+    response = FastJSONResponse(TicketListResponse(
         tickets=tickets,
         total=total,
         page=page,
         page_size=page_size
-    )
+    ))
+    set_etag(response, etag)
+    
+    return response
+
+
+@router.get("/queue", response_model=OperatorQueueResponse)
+async def get_operator_queue(
+    status_filter: Optional[str] = Query(None, description="Estados separados por comas (default: escalated,in_progress)"),
+    limit: int = Query(20, ge=1, le=100, description="Tickets por página"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` de la página anterior"),
+    user_id: str = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Cola de trabajo del operador.
+    
+    Ordenada por prioridad (urgent primero) y, dentro de cada prioridad, por
+    tiempo de espera (desde el escalado, o desde la creación si no se
+    escaló), el más antiguo primero. Cada ticket indica cuándo vence su SLA
+    (SLA_*_MINUTES según la prioridad) y si ya lo ha superado.
+    
+    Paginación por cursor: el coste de una página no depende de cuántos
+    tickets hay delante. El total sale de los contadores por estado.
+    """
+    statuses = _parse_status_filter(status_filter)
+    
+    after = None
+    if cursor:
+        try:
+            priority, queued_at, ticket_id = decode_queue_cursor(cursor)
+            after = (TicketPriority(priority), queued_at, ticket_id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginación inválido"
+            ) from e
+    
+    ticket_repo = AsyncTicketRepository(db)
+    
+    tickets, has_more = await ticket_repo.list_queue(statuses, limit, after=after)
+    counters = await ticket_repo.get_status_counters()
+    
+    now = datetime.utcnow()
+    items = []
+    for ticket in tickets:
+        item = OperatorQueueTicket.model_validate(ticket)
+        item.sla_due_at = ticket.queued_at + timedelta(minutes=_sla_minutes(ticket.priority))
+        item.sla_breached = item.sla_due_at <= now
+        items.append(item)
+    
+    last = tickets[-1] if tickets else None
+    
+    # Validado una vez y serializado directamente a JSON
+    return FastJSONResponse(OperatorQueueResponse(
+        tickets=items,
+        total=sum(counters.get(s, 0) for s in statuses),
+        has_more=has_more,
+        next_cursor=encode_queue_cursor(last.priority.value, last.queued_at, last.id) if has_more else None
+    ))
 
 
 @router.get("/tickets/{ticket_id}", response_model=TicketResponse)
 async def get_operator_ticket(
     ticket_id: UUID,
     user_id: str = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene un ticket específico (cualquier usuario).
     Solo para operadores.
     """
-    ticket_repo = TicketRepository(db)
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket_repo = AsyncTicketRepository(db)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -107,15 +205,15 @@ async def get_operator_ticket(
 async def take_ticket(
     ticket_id: UUID,
     user_id: str = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     El operador toma un ticket escalado y lo marca como "en progreso".
     """
-    ticket_repo = TicketRepository(db)
-    message_repo = MessageRepository(db)
+    ticket_repo = AsyncTicketRepository(db)
+    message_repo = AsyncMessageRepository(db)
     
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -124,13 +222,13 @@ async def take_ticket(
         )
     
     # Cambiar status a IN_PROGRESS
-    updated_ticket = ticket_repo.update(
+    updated_ticket = await ticket_repo.update(
         ticket_id=ticket_id,
         status=TicketStatus.IN_PROGRESS
     )
     
     # Crear mensaje del sistema indicando que un operador lo tomó
-    message_repo.create_system_message(
+    await message_repo.create_system_message(
         ticket_id=ticket_id,
         content="👤 Un operador humano ha tomado esta consulta y te responderá pronto."
     )
@@ -143,16 +241,16 @@ async def operator_respond(
     ticket_id: UUID,
     message_data: MessageCreate,
     user_id: str = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     El operador envía una respuesta al usuario.
     Se guarda como mensaje del asistente pero con metadata indicando que es humano.
     """
-    ticket_repo = TicketRepository(db)
-    message_repo = MessageRepository(db)
+    ticket_repo = AsyncTicketRepository(db)
+    message_repo = AsyncMessageRepository(db)
     
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -161,7 +259,7 @@ async def operator_respond(
         )
     
     # Crear mensaje del asistente pero indicando que es respuesta humana
-    message = message_repo.create_assistant_message(
+    message = await message_repo.create_assistant_message(
         ticket_id=ticket_id,
         content=message_data.content,
         metadata={
@@ -176,30 +274,184 @@ async def operator_respond(
 @router.get("/stats")
 async def get_operator_stats(
     user_id: str = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Estadísticas para el dashboard del operador.
+    
+    Se leen de ticket_status_counters (una fila por estado), que los
+    repositorios mantienen al crear y cambiar de estado los tickets.
     """
-    from db.models import Ticket
+    counts = await AsyncTicketRepository(db).get_status_counters()
     
-    escalated_count = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.ESCALATED
-    ).count()
+    return {
+        "escalated": counts.get(TicketStatus.ESCALATED, 0),
+        "in_progress": counts.get(TicketStatus.IN_PROGRESS, 0),
+        "open": counts.get(TicketStatus.OPEN, 0),
+        "total": sum(counts.values())
+    }
+
+
+@router.get("/llm/stats")
+async def get_llm_stats(
+    user_id: str = Depends(get_current_admin_user)
+):
+    """
+    Estadísticas del cliente LLM y del agente de este worker.
     
-    in_progress_count = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.IN_PROGRESS
-    ).count()
+    Incluye los aciertos de coalescencia (single-flight), el estado del
+    circuit breaker, la cola del LLM y los escalados sin LLM con el ahorro
+    estimado de tokens y latencia.
+    """
+    from agent import get_llm_client, get_rag_agent
+    from agent.faq import get_faq_index
+    from core.auth_cache import get_principal_cache, get_token_cache
+    from core.rate_limit import get_rate_limit_store
+    from realtime import get_message_broker
     
-    open_count = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.OPEN
-    ).count()
+    return {
+        **get_llm_client().get_stats(),
+        **get_rag_agent().get_stats(),
+        "faq": get_faq_index().get_stats(),
+        "realtime": get_message_broker().get_stats(),
+        "rate_limit": get_rate_limit_store().get_stats(),
+        "auth_cache": {
+            "tokens": get_token_cache().get_stats(),
+            "principals": get_principal_cache().get_stats()
+        }
+    }
+
+
+@router.get("/usage")
+async def get_llm_usage(
+    group_by: str = Query("user", pattern="^(day|user|category|model)$", description="Agrupar por day, user, category o model"),
+    start: Optional[date] = Query(None, description="Primer día (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Último día (YYYY-MM-DD)"),
+    filter_user_id: Optional[UUID] = Query(None, alias="user_id", description="Filtrar por usuario"),
+    category: Optional[str] = Query(None, description="Filtrar por categoría de ticket"),
+    model: Optional[str] = Query(None, description="Filtrar por modelo"),
+    limit: int = Query(100, ge=1, le=1000),
+    user_id: str = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Consumo de tokens del LLM agregado (para control de costes).
     
-    total_count = db.query(Ticket).count()
+    Se calcula sobre los agregados diarios por usuario, categoría y modelo,
+    ordenado por tokens totales. Ej: `?group_by=user&start=2026-10-01` para
+    ver qué usuarios han consumido más este mes.
+    """
+    rows = await db.run_sync(
+        lambda sync_db: UsageRepository(sync_db).summarize(
+            group_by=group_by,
+            start=start,
+            end=end,
+            user_id=filter_user_id,
+            category=category,
+            model=model,
+            limit=limit
+        )
+    )
     
     return {
-        "escalated": escalated_count,
-        "in_progress": in_progress_count,
-        "open": open_count,
-        "total": total_count
-    }
\ No newline at end of file
+        "group_by": group_by,
+        "start": start,
+        "end": end,
+        "rows": rows
+    }
+
+
+@router.get("/faq", response_model=List[FAQResponse])
+async def list_faq(
+    include_inactive: bool = False,
+    user_id: str = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Lista las preguntas frecuentes curadas.
+    """
+    return await db.run_sync(
+        lambda sync_db: FAQRepository(sync_db).list_all(include_inactive=include_inactive)
+    )
+
+
+@router.post("/faq", response_model=FAQResponse, status_code=status.HTTP_201_CREATED)
+async def create_faq(
+    faq_data: FAQCreate,
+    user_id: str = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crea una pregunta frecuente con su respuesta aprobada.
+    
+    Las consultas que coincidan con confianza se responderán con este texto
+    y sus fuentes, sin llamar al LLM.
+    """
+    from agent.faq import get_faq_index
+    
+    entry = await db.run_sync(
+        lambda sync_db: FAQRepository(sync_db).create(
+            question=faq_data.question,
+            answer=faq_data.answer,
+            keywords=faq_data.keywords,
+            sources=[source.model_dump(exclude_none=True) for source in faq_data.sources],
+            category=faq_data.category.value if faq_data.category else None,
+            created_by=UUID(user_id)
+        )
+    )
+    
+    get_faq_index().invalidate()
+    
+    return entry
+
+
+@router.patch("/faq/{faq_id}", response_model=FAQResponse)
+async def update_faq(
+    faq_id: UUID,
+    faq_data: FAQUpdate,
+    user_id: str = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Actualiza una pregunta frecuente (o la desactiva con `is_active: false`).
+    """
+    from agent.faq import get_faq_index
+    
+    update_data = faq_data.model_dump(exclude_unset=True)
+    
+    if "sources" in update_data:
+        update_data["sources"] = [source.model_dump(exclude_none=True) for source in faq_data.sources or []]
+    if "category" in update_data:
+        update_data["category"] = faq_data.category.value if faq_data.category else None
+    
+    entry = await db.run_sync(lambda sync_db: FAQRepository(sync_db).update(faq_id, **update_data))
+    
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="FAQ no encontrada"
+        )
+    
+    get_faq_index().invalidate()
+    
+    return entry
+
+
+@router.delete("/faq/{faq_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_faq(
+    faq_id: UUID,
+    user_id: str = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Elimina una pregunta frecuente.
+    """
+    from agent.faq import get_faq_index
+    
+    if not await db.run_sync(lambda sync_db: FAQRepository(sync_db).delete(faq_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="FAQ no encontrada"
+        )
+    
+    get_faq_index().invalidate()
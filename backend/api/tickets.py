@@ -1,14 +1,16 @@
 """
 Endpoints para gestión de tickets.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from db import get_db
-from db.repository import TicketRepository, UserRepository
+from db import get_async_db
+from db.repository import AsyncTicketRepository
 from db.models import TicketStatus, TicketPriority
 from schemas import TicketCreate, TicketUpdate, TicketResponse, TicketListResponse
+from core.etag import compute_etag, is_not_modified, not_modified_response, set_etag
+from core.responses import FastJSONResponse
 from core.security import get_current_user_id
 
 router = APIRouter()
@@ -18,7 +20,7 @@ router = APIRouter()
 async def create_ticket(
     ticket_data: TicketCreate,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Crea un nuevo ticket para el usuario autenticado.
@@ -26,28 +28,25 @@ async def create_ticket(
     - **title**: Título del ticket (mínimo 3 caracteres)
     - **category**: Categoría del ticket (opcional)
     """
-    repo = TicketRepository(db)
+    repo = AsyncTicketRepository(db)
     
-    ticket = repo.create(
+    ticket = await repo.create(
         user_id=UUID(user_id),
         title=ticket_data.title,
         category=ticket_data.category
     )
     
-    # Añadir conteo de mensajes
-    response = TicketResponse.model_validate(ticket)
-    response.message_count = ticket.message_count
-    
-    return response
+    return TicketResponse.model_validate(ticket)
 
 
 @router.get("/", response_model=TicketListResponse)
 async def list_my_tickets(
+    request: Request,
     status_filter: TicketStatus = Query(None, description="Filtrar por estado"),
     page: int = Query(1, ge=1, description="Número de página"),
     page_size: int = Query(20, ge=1, le=100, description="Tamaño de página"),
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista los tickets del usuario autenticado.
@@ -55,67 +54,90 @@ async def list_my_tickets(
     - **status_filter**: Filtrar por estado (opcional)
     - **page**: Número de página (default: 1)
     - **page_size**: Registros por página (default: 20, max: 100)
+    
+    Devuelve `ETag`; con `If-None-Match` responde 304 si nada ha cambiado.
     """
-    repo = TicketRepository(db)
+    repo = AsyncTicketRepository(db)
+    
+    # Versión del listado (una consulta agregada) antes de cargar nada
+    version = await repo.list_version_by_user(UUID(user_id), status=status_filter)
+    etag = compute_etag("tickets", user_id, status_filter, page, page_size, *version)
+    
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     
     skip = (page - 1) * page_size
     
-    tickets = repo.list_by_user(
+    tickets = await repo.list_by_user(
         user_id=UUID(user_id),
         status=status_filter,
         skip=skip,
         limit=page_size
     )
     
-    total = repo.count_by_user(UUID(user_id), status=status_filter)
-    
-    # Añadir conteo de mensajes a cada ticket
-    tickets_response = []
-    for ticket in tickets:
-        ticket_data = TicketResponse.model_validate(ticket)
-        ticket_data.message_count = ticket.message_count
-        tickets_response.append(ticket_data)
+    total = await repo.count_by_user(UUID(user_id), status=status_filter)
     
-    return TicketListResponse(
-        tickets=tickets_response,
+    # Cada ticket se valida una vez desde el ORM (message_count es una columna,
+    # sin cargar mensajes) y la lista se serializa directamente a JSON
+    response = FastJSONResponse(TicketListResponse(
+        tickets=tickets,
         total=total,
         page=page,
         page_size=page_size
-    )
+    ))
+    set_etag(response, etag)
+    
+    return response
 
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: UUID,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene un ticket específico.
     
-    Solo el propietario del ticket puede verlo.
+    Solo el propietario del ticket puede verlo. Devuelve `ETag`; con
+    `If-None-Match` responde 304 si nada ha cambiado.
     """
-    repo = TicketRepository(db)
+    repo = AsyncTicketRepository(db)
     
-    ticket = repo.get_by_id(ticket_id)
+    # Propietario y versión en una consulta, sin cargar los mensajes
+    version = await repo.get_version(ticket_id)
     
-    if not ticket:
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Ticket no encontrado"
         )
     
     # Verificar que el usuario sea el propietario
-    if str(ticket.user_id) != user_id:
+    if str(version[0]) != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para ver este ticket"
         )
     
-    response = TicketResponse.model_validate(ticket)
-    response.message_count = ticket.message_count
+    etag = compute_etag("ticket", ticket_id, *version)
     
-    return response
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    set_etag(response, etag)
+    
+    ticket = await repo.get_by_id(ticket_id)
+    
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket no encontrado"
+        )
+    
+    return TicketResponse.model_validate(ticket)
 
 
 @router.patch("/{ticket_id}", response_model=TicketResponse)
@@ -123,7 +145,7 @@ async def update_ticket(
     ticket_id: UUID,
     ticket_update: TicketUpdate,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualiza un ticket.
@@ -131,10 +153,10 @@ async def update_ticket(
     Solo el propietario puede actualizar el ticket.
     Campos opcionales: title, status, priority, category
     """
-    ticket_repo = TicketRepository(db)
+    ticket_repo = AsyncTicketRepository(db)
     
     # Verificar que el ticket existe y pertenece al usuario
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -149,7 +171,7 @@ async def update_ticket(
         )
     
     # Actualizar ticket
-    updated_ticket = ticket_repo.update(
+    updated_ticket = await ticket_repo.update(
         ticket_id=ticket_id,
         title=ticket_update.title,
         status=ticket_update.status,
@@ -163,27 +185,24 @@ async def update_ticket(
             detail="Error al actualizar el ticket"
         )
     
-    response = TicketResponse.model_validate(updated_ticket)
-    response.message_count = updated_ticket.message_count
-    
-    return response
+    return TicketResponse.model_validate(updated_ticket)
 
 
 @router.post("/{ticket_id}/close", response_model=TicketResponse)
 async def close_ticket(
     ticket_id: UUID,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cierra un ticket.
     
     Marca el ticket como cerrado y registra la fecha de cierre.
     """
-    ticket_repo = TicketRepository(db)
+    ticket_repo = AsyncTicketRepository(db)
     
     # Verificar que el ticket existe y pertenece al usuario
-    ticket = ticket_repo.get_by_id(ticket_id)
+    ticket = await ticket_repo.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -198,7 +217,7 @@ async def close_ticket(
         )
     
     # Cerrar ticket
-    closed_ticket = ticket_repo.close(ticket_id)
+    closed_ticket = await ticket_repo.close(ticket_id)
     
     if not closed_ticket:
         raise HTTPException(
@@ -206,7 +225,4 @@ async def close_ticket(
             detail="Error al cerrar el ticket"
         )
     
-    response = TicketResponse.model_validate(closed_ticket)
-    response.message_count = closed_ticket.message_count
-    
-    return response
\ No newline at end of file
+    return TicketResponse.model_validate(closed_ticket)
\ No newline at end of file
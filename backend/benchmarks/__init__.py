@@ -0,0 +1,3 @@
+"""
+Scripts de benchmark (no forman parte de la aplicación).
+"""
@@ -0,0 +1,121 @@
+"""
+Benchmark: concurrencia de peticiones con consultas a BD bloqueantes vs asíncronas.
+
+Modo "engine" (por defecto): lanza N corrutinas concurrentes que hacen cada
+una una consulta lenta (SELECT pg_sleep) como haría un endpoint async:
+  - sync:  engine síncrono llamado desde la corrutina (bloquea el event loop,
+           las consultas se ejecutan de una en una)
+  - async: engine asíncrono (asyncpg), las consultas se solapan
+
+Modo "http": mide un endpoint real de la API en marcha con distintos niveles
+de concurrencia (p. ej. GET /api/tickets/).
+
+Uso:
+    python -m benchmarks.db_concurrency --requests 200 --concurrency 50 --query-ms 20
+    python -m benchmarks.db_concurrency --mode http --url http://localhost:8000/api/tickets/ \\
+        --token $TOKEN --requests 500 --concurrency 1,10,50,100
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Añadir el directorio backend al path para imports relativos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _report(label: str, latencies: list[float], elapsed: float) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<28} {len(latencies) / elapsed:>9.1f} req/s   "
+        f"p50 {p50 * 1000:>7.1f} ms   p95 {p95 * 1000:>7.1f} ms   total {elapsed:.2f}s"
+    )
+
+
+async def _run(n_requests: int, concurrency: int, request) -> tuple[list[float], float]:
+    """Ejecuta n_requests llamadas a request() con como mucho `concurrency` a la vez."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    return latencies, time.perf_counter() - started
+
+
+async def bench_engine(n_requests: int, concurrency: int, query_ms: int) -> None:
+    from sqlalchemy import text
+    from db.base import engine, async_engine
+
+    if engine.dialect.name != "postgresql":
+        print("⚠️ El modo engine necesita PostgreSQL (usa pg_sleep para simular una consulta lenta)")
+        return
+
+    query = text(f"SELECT pg_sleep({query_ms / 1000})")
+
+    async def blocking_request():
+        # Lo que hacía un endpoint async con el engine síncrono
+        with engine.connect() as conn:
+            conn.execute(query)
+
+    async def async_request():
+        async with async_engine.connect() as conn:
+            await conn.execute(query)
+
+    # Calentar los pools
+    await _run(concurrency, concurrency, async_request)
+    await _run(5, 5, blocking_request)
+
+    print(f"\n📊 {n_requests} peticiones, concurrencia {concurrency}, consulta de {query_ms} ms\n")
+    _report("engine síncrono (bloquea)", *await _run(n_requests, concurrency, blocking_request))
+    _report("engine asíncrono", *await _run(n_requests, concurrency, async_request))
+
+    await async_engine.dispose()
+
+
+async def bench_http(url: str, token: str, n_requests: int, levels: list[int]) -> None:
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=60) as client:
+        async def request():
+            response = await client.get(url)
+            response.raise_for_status()
+
+        print(f"\n📊 {n_requests} peticiones a {url}\n")
+        for concurrency in levels:
+            _report(f"concurrencia {concurrency}", *await _run(n_requests, concurrency, request))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["engine", "http"], default="engine")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", default="50", help="Uno o varios niveles separados por comas")
+    parser.add_argument("--query-ms", type=int, default=20, help="Duración de la consulta simulada (modo engine)")
+    parser.add_argument("--url", default="http://localhost:8000/api/tickets/")
+    parser.add_argument("--token", default="")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.mode == "engine":
+        for concurrency in levels:
+            asyncio.run(bench_engine(args.requests, concurrency, args.query_ms))
+    else:
+        asyncio.run(bench_http(args.url, args.token, args.requests, levels))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: logins concurrentes con bcrypt en el event loop vs en hilos.
+
+Modo "hash" (por defecto): N corrutinas verifican una contraseña a la vez que
+otra corrutina mide el retraso del event loop (lo que esperaría cualquier
+otra petición del mismo worker):
+  - inline:  verify_password dentro de la corrutina (bloquea el event loop)
+  - offload: verify_password_async (pool de hilos de PASSWORD_HASH_THREADS)
+para cada coste de bcrypt indicado.
+
+Modo "http": mide POST /api/auth/login de una API en marcha con distintos
+niveles de concurrencia.
+
+Uso:
+    python -m benchmarks.login --requests 64 --concurrency 16 --cost 10,12
+    python -m benchmarks.login --mode http --url http://localhost:8000/api/auth/login \\
+        --email test@test.com --password secret123 --requests 200 --concurrency 1,10,50
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Añadir el directorio backend al path para imports relativos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.db_concurrency import _report, _run
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> list[float]:
+    """Retrasos del event loop respecto a un tick de `interval` segundos."""
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    return lags
+
+
+async def bench_hash(n_requests: int, concurrency: int, cost: int) -> None:
+    from passlib.context import CryptContext
+
+    from core import security
+
+    # Contexto con el coste a medir (así el login no rehashea en cada llamada)
+    security.settings.PASSWORD_BCRYPT_ROUNDS = cost
+    security.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=cost)
+    security._hash_limiter = None  # Un limitador por event loop (asyncio.run)
+    hashed = security.pwd_context.hash("benchmark-password")
+
+    async def inline():
+        security.verify_password("benchmark-password", hashed)
+
+    async def offload():
+        await security.verify_password_async("benchmark-password", hashed)
+
+    print(f"\n📊 {n_requests} logins, concurrencia {concurrency}, bcrypt coste {cost}\n")
+
+    for label, request in (("inline (bloquea)", inline), ("hilos", offload)):
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_measure_loop_lag(stop))
+        latencies, elapsed = await _run(n_requests, concurrency, request)
+        stop.set()
+        lags = sorted(await lag_task) or [0.0]
+
+        _report(label, latencies, elapsed)
+        print(
+            f"{'':<28} retraso del event loop: p50 {statistics.median(lags) * 1000:>7.1f} ms   "
+            f"máx {lags[-1] * 1000:>7.1f} ms"
+        )
+
+
+async def bench_http(url: str, email: str, password: str, n_requests: int, levels: list[int]) -> None:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def request():
+            response = await client.post(url, json={"email": email, "password": password})
+            response.raise_for_status()
+
+        print(f"\n📊 {n_requests} logins contra {url}\n")
+        for concurrency in levels:
+            _report(f"concurrencia {concurrency}", *await _run(n_requests, concurrency, request))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["hash", "http"], default="hash")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", default="16", help="Uno o varios niveles separados por comas")
+    parser.add_argument("--cost", default="10,12", help="Costes de bcrypt a medir (modo hash)")
+    parser.add_argument("--url", default="http://localhost:8000/api/auth/login")
+    parser.add_argument("--email", default="test@test.com")
+    parser.add_argument("--password", default="secret123")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.mode == "hash":
+        for cost in [int(cost) for cost in args.cost.split(",")]:
+            for concurrency in levels:
+                asyncio.run(bench_hash(args.requests, concurrency, cost))
+    else:
+        asyncio.run(bench_http(args.url, args.email, args.password, args.requests, levels))
+
+
+if __name__ == "__main__":
+    main()
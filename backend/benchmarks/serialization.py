@@ -0,0 +1,139 @@
+"""
+Benchmark: serialización y compresión de historiales de chat largos.
+
+Genera un historial sintético (mensajes del asistente con fuentes y
+extractos, como los que guarda el agente) y compara:
+  - default: lo que hace FastAPI con response_model (validar el modelo
+    devuelto otra vez, jsonable_encoder y json.dumps)
+  - fast:    FastJSONResponse sobre el modelo ya construido (pydantic-core)
+y el tamaño/tiempo de la compresión gzip y brotli del cuerpo resultante.
+
+Uso:
+    python -m benchmarks.serialization --messages 200,1000,5000 --rounds 20
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+# Añadir el directorio backend al path para imports relativos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+EXCERPT = (
+    "Los pilotos de UAS en la subcategoría A2 deberán mantener una distancia "
+    "horizontal mínima de 30 metros con personas no participantes, que puede "
+    "reducirse a 5 metros con la función de baja velocidad activada. "
+)
+
+
+def build_history(n_messages: int):
+    """Historial sintético con la forma de los objetos ORM (atributos)."""
+    from db.models import MessageRole
+
+    ticket_id = uuid.uuid4()
+    started = datetime(2026, 1, 1, 9, 0, 0)
+    messages = []
+
+    for i in range(n_messages):
+        is_user = i % 2 == 0
+        created_at = started + timedelta(seconds=30 * i)
+        meta_data = {} if is_user else {
+            "sources": [
+                {
+                    "source": f"AESA_A2_guia_{j}.pdf",
+                    "document_type": "pdf_aesa_a2",
+                    "relevance": 0.83,
+                    "chunk_index": j,
+                    "excerpt": EXCERPT * 2,
+                }
+                for j in range(3)
+            ],
+            "tokens_used": 812,
+            "model": "gpt-4o-mini",
+            "degraded": False,
+            "faq_id": None,
+        }
+        messages.append(SimpleNamespace(
+            id=uuid.uuid4(),
+            ticket_id=ticket_id,
+            role=MessageRole.USER if is_user else MessageRole.ASSISTANT,
+            content=("¿Qué distancia debo mantener con personas en A2?" if is_user else EXCERPT * 3),
+            meta_data=meta_data,
+            created_at=created_at,
+            updated_at=created_at,
+        ))
+
+    return ticket_id, messages
+
+
+def _time(fn, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def bench(n_messages: int, rounds: int) -> None:
+    import gzip
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from core.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+    from core.responses import FastJSONResponse
+    from schemas import ChatHistoryResponse
+
+    ticket_id, messages = build_history(n_messages)
+
+    def build_model():
+        return ChatHistoryResponse(ticket_id=ticket_id, messages=messages, total_messages=len(messages))
+
+    def default_path():
+        # Endpoint que devuelve el modelo: FastAPI lo vuelca, lo valida contra
+        # el response_model, lo pasa por jsonable_encoder y json.dumps
+        model = build_model()
+        revalidated = ChatHistoryResponse.model_validate(model.model_dump())
+        return JSONResponse(jsonable_encoder(revalidated)).body
+
+    def fast_path():
+        return FastJSONResponse(build_model()).body
+
+    body = fast_path()
+    default_ms = _time(default_path, rounds) * 1000
+    fast_ms = _time(fast_path, rounds) * 1000
+
+    print(f"\n{n_messages} mensajes ({len(body) / 1024:.0f} KB sin comprimir)")
+    print(f"  {'default (FastAPI)':<22} {default_ms:>8.2f} ms")
+    print(f"  {'fast (pydantic-core)':<22} {fast_ms:>8.2f} ms   x{default_ms / fast_ms:.1f}")
+
+    gzip_body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    gzip_ms = _time(lambda: gzip.compress(body, compresslevel=GZIP_LEVEL), rounds) * 1000
+    print(f"  {'gzip -' + str(GZIP_LEVEL):<22} {gzip_ms:>8.2f} ms   {len(gzip_body) / 1024:>6.0f} KB ({len(gzip_body) / len(body):.0%})")
+
+    if brotli is None:
+        print("  brotli no instalado (pip install brotli)")
+        return
+
+    brotli_body = brotli.compress(body, quality=BROTLI_QUALITY)
+    brotli_ms = _time(lambda: brotli.compress(body, quality=BROTLI_QUALITY), rounds) * 1000
+    print(f"  {'brotli q' + str(BROTLI_QUALITY):<22} {brotli_ms:>8.2f} ms   {len(brotli_body) / 1024:>6.0f} KB ({len(brotli_body) / len(body):.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="200,1000,5000", help="Tamaños de historial separados por comas")
+    parser.add_argument("--rounds", type=int, default=20, help="Repeticiones por medida (se usa la mediana)")
+    args = parser.parse_args()
+
+    for n_messages in [int(n) for n in args.messages.split(",")]:
+        bench(n_messages, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
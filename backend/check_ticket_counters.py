@@ -0,0 +1,58 @@
+"""
+Comprueba ticket_status_counters contra un recuento real de la tabla tickets.
+
+Uso:
+    python check_ticket_counters.py            # informa (sale con 1 si no cuadra)
+    python check_ticket_counters.py --rebuild  # recalcula los contadores
+"""
+import argparse
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from db import SessionLocal
+from db.models import TicketStatus
+from db.repository import TicketRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Recalcula los contadores desde la tabla tickets")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        repo = TicketRepository(db)
+
+        if args.rebuild:
+            counts = repo.rebuild_status_counters()
+            print("✅ Contadores reconstruidos:")
+            for status, count in counts.items():
+                print(f"   {status.value:<12} {count}")
+            return
+
+        # Con escrituras en curso puede haber diferencias transitorias: repetir antes de reconstruir
+        counters = repo.get_status_counters()
+        counts = repo.count_by_status()
+
+        consistent = True
+        for status in TicketStatus:
+            stored, actual = counters.get(status), counts.get(status, 0)
+            mark = "✓" if stored == actual else "✗"
+            consistent = consistent and stored == actual
+            print(f"   {mark} {status.value:<12} contador {stored if stored is not None else '-':>8}   real {actual:>8}")
+
+        if consistent:
+            print("✅ Los contadores cuadran con la tabla tickets")
+        else:
+            print("❌ Contadores desincronizados: ejecuta con --rebuild")
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
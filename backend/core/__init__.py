@@ -7,6 +7,7 @@ from core.security import (
     get_password_hash,
     create_access_token,
     decode_access_token,
+    verify_access_token,
     get_current_user_id,
 )
 
@@ -16,5 +17,6 @@ __all__ = [
     "get_password_hash",
     "create_access_token",
     "decode_access_token",
+    "verify_access_token",
     "get_current_user_id",
 ]
\ No newline at end of file
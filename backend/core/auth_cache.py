@@ -0,0 +1,180 @@
+"""
+Caches de autenticación.
+
+- TokenCache: payload de los JWT ya verificados, por hash SHA-256 del token,
+  hasta su `exp`. Evita repetir la verificación de la firma en cada petición
+  (dependencias, rate limiting, WebSocket).
+- PrincipalCache: id de usuario → is_active / is_admin durante
+  AUTH_PRINCIPAL_CACHE_TTL_SECONDS. Las comprobaciones de operador no leen la
+  tabla users en cada petición.
+
+Los cambios de usuario (UserRepository.update / deactivate) invalidan la
+entrada al momento en el proceso que los hace; en el resto de workers el TTL
+corto acota cuánto tarda en verse el cambio.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+from uuid import UUID
+import hashlib
+import threading
+import time
+
+from core.config import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Lo que las comprobaciones de permisos necesitan saber de un usuario."""
+    user_id: str
+    is_active: bool
+    is_admin: bool
+
+
+class TokenCache:
+    """LRU acotada de payloads de JWT verificados, válidos hasta su expiración."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, payload: dict) -> None:
+        """Guarda el payload hasta su `exp` (los tokens sin exp no se cachean)."""
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+
+        key = self._key(token)
+
+        with self._lock:
+            self._entries[key] = (payload, float(expires_at))
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class PrincipalCache:
+    """Estado de los usuarios (activo / admin) con un TTL corto."""
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple[Principal, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[0]
+
+    def put(self, principal: Principal) -> None:
+        with self._lock:
+            self._entries[principal.user_id] = (principal, time.monotonic() + self.ttl)
+
+            # Limpieza oportunista: las entradas caducadas no se vuelven a leer
+            if len(self._entries) > 10000:
+                now = time.monotonic()
+                for user_id in [user_id for user_id, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                    del self._entries[user_id]
+
+    def invalidate(self, user_id) -> None:
+        """Olvida el usuario (tras actualizarlo o desactivarlo)."""
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+async def get_principal(db, user_id: str) -> Optional[Principal]:
+    """
+    Principal del usuario desde la cache o, si no está, desde la BD.
+
+    Args:
+        db: Sesión asíncrona de BD
+        user_id: ID del usuario (sub del JWT)
+
+    Returns:
+        Principal, o None si el usuario no existe
+    """
+    from db.models import User
+
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, UUID(user_id))
+    if user is None:
+        return None
+
+    principal = Principal(user_id=user_id, is_active=user.is_active, is_admin=user.is_admin)
+    cache.put(principal)
+
+    return principal
+
+
+# Instancias globales de las caches
+_token_cache = None
+_principal_cache = None
+
+def get_token_cache() -> TokenCache:
+    """
+    Dependency para obtener la cache de tokens verificados.
+    Usa singleton pattern.
+    """
+    global _token_cache
+
+    if _token_cache is None:
+        _token_cache = TokenCache(max_size=settings.AUTH_TOKEN_CACHE_SIZE)
+
+    return _token_cache
+
+
+def get_principal_cache() -> PrincipalCache:
+    """
+    Dependency para obtener la cache de principals.
+    Usa singleton pattern.
+    """
+    global _principal_cache
+
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache(ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+
+    return _principal_cache
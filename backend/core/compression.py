@@ -0,0 +1,128 @@
+"""
+Compresión negociada (brotli / gzip) de las respuestas JSON.
+
+Los historiales largos (mensajes con fuentes y extractos) y los listados
+pesan decenas o cientos de KB y comprimen muy bien. El middleware comprime
+las respuestas JSON completas por encima de RESPONSE_COMPRESSION_MIN_BYTES
+con la codificación que acepte el cliente (brotli si está instalado y se
+acepta, si no gzip).
+
+A diferencia de GZipMiddleware de Starlette, no toca las respuestas en
+streaming (SSE del chat y de las suscripciones): comprimirlas retrasaría los
+eventos hasta llenar el buffer del compresor.
+"""
+from typing import Optional
+import gzip
+
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se usa gzip
+    brotli = None
+
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # Calidades bajas: casi la ratio de gzip -9 a la velocidad de gzip -1
+
+# Por encima de este tamaño se comprime en un hilo para no bloquear el event loop
+THREAD_COMPRESSION_BYTES = 256 * 1024
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Elige "br" o "gzip" según la cabecera Accept-Encoding (respeta q=0)."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Comprime el cuerpo con la codificación elegida."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI que comprime las respuestas JSON no streaming."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el cuerpo: hay que cambiar las cabeceras
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            eligible = (
+                not message.get("more_body", False)
+                and start_message["status"] == 200
+                and len(body) >= self.minimum_size
+                and headers.get("content-type", "").startswith("application/json")
+                and "content-encoding" not in headers
+            )
+
+            if not eligible:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_COMPRESSION_BYTES:
+                body = await to_thread.run_sync(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -2,7 +2,7 @@
 Configuración centralizada de la aplicación usando Pydantic Settings.
 Lee variables de entorno desde .env automáticamente.
 """
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
@@ -23,6 +23,14 @@ class Settings(BaseSettings):
         default="sqlite:///./helpdesk.db",
         description="URL de conexión a la base de datos"
     )
+    DB_POOL_SIZE: int = Field(
+        default=10,
+        description="Conexiones del pool asíncrono de la API"
+    )
+    DB_MAX_OVERFLOW: int = Field(
+        default=20,
+        description="Conexiones extra del pool asíncrono en picos de carga"
+    )
     
     # OpenAI API
     OPENAI_API_KEY: str = Field(
@@ -30,6 +38,158 @@ class Settings(BaseSettings):
         description="API Key de OpenAI para el agente"
     )
     
+    # LLM
+    LLM_PROVIDER: str = Field(
+        default="openai",
+        description="Proveedor LLM (openai, openai_compatible, fake)"
+    )
+    LLM_MODEL: str = Field(
+        default="gpt-4o-mini",
+        description="Modelo a usar con el proveedor LLM"
+    )
+    LLM_BASE_URL: str = Field(
+        default="",
+        description="URL base de una API compatible con OpenAI (obligatoria con openai_compatible)"
+    )
+    FAKE_LLM_LATENCY_MS: int = Field(
+        default=200,
+        description="Latencia hasta el primer token del proveedor fake"
+    )
+    FAKE_LLM_TOKENS_PER_SECOND: float = Field(
+        default=50.0,
+        description="Velocidad de generación del proveedor fake (0 = instantáneo)"
+    )
+    LLM_TIMEOUT_SECONDS: float = Field(
+        default=20.0,
+        description="Timeout de cada intento de llamada al LLM"
+    )
+    LLM_DEADLINE_SECONDS: float = Field(
+        default=45.0,
+        description="Plazo total de una llamada al LLM incluyendo reintentos"
+    )
+    LLM_MAX_RETRIES: int = Field(
+        default=2,
+        description="Reintentos ante errores transitorios (timeouts, 429, 5xx)"
+    )
+    LLM_RETRY_BASE_DELAY: float = Field(
+        default=0.5,
+        description="Retardo base (segundos) del backoff exponencial con jitter"
+    )
+    LLM_RETRY_MAX_DELAY: float = Field(
+        default=4.0,
+        description="Retardo máximo (segundos) entre reintentos"
+    )
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = Field(
+        default=5,
+        description="Fallos consecutivos que abren el circuit breaker del LLM"
+    )
+    LLM_CIRCUIT_RECOVERY_SECONDS: float = Field(
+        default=30.0,
+        description="Segundos con el circuito abierto antes de probar de nuevo"
+    )
+    LLM_SINGLE_FLIGHT_ENABLED: bool = Field(
+        default=True,
+        description="Compartir una misma llamada al LLM entre peticiones idénticas concurrentes"
+    )
+    LLM_MAX_CONCURRENCY: int = Field(
+        default=8,
+        description="Llamadas simultáneas al LLM por worker"
+    )
+    LLM_SCHEDULER_QUANTUM: int = Field(
+        default=2000,
+        description="Tokens que recibe cada usuario por turno en la cola justa (DRR)"
+    )
+    LLM_QUEUE_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        description="Espera máxima en la cola del LLM antes de responder en modo degradado"
+    )
+    LLM_PROMPT_TOKEN_BUDGET: int = Field(
+        default=6000,
+        description="Tokens máximos del prompt (system + historial + contexto + consulta)"
+    )
+    HISTORY_FETCH_LIMIT: int = Field(
+        default=50,
+        description="Mensajes recientes que se leen de la BD antes de aplicar el presupuesto"
+    )
+    SUMMARY_ENABLED: bool = Field(
+        default=True,
+        description="Mantener un resumen acumulado de las conversaciones largas"
+    )
+    SUMMARY_TRIGGER_MESSAGES: int = Field(
+        default=20,
+        description="Mensajes sin resumir a partir de los cuales se actualiza el resumen"
+    )
+    SUMMARY_KEEP_RECENT: int = Field(
+        default=8,
+        description="Turnos recientes que se dejan fuera del resumen y se envían tal cual"
+    )
+    ESCALATION_MIN_RELEVANCE: Optional[float] = Field(
+        default=None,
+        description="Relevancia mínima del mejor fragmento; por debajo se escala sin llamar al LLM (vacío = desactivado)"
+    )
+    FAQ_ENABLED: bool = Field(
+        default=True,
+        description="Responder con las FAQ curadas (sin LLM) cuando la consulta coincide con confianza"
+    )
+    FAQ_MIN_SIMILARITY: float = Field(
+        default=0.88,
+        description="Similitud coseno mínima entre la consulta y la pregunta de la FAQ"
+    )
+    FAQ_MIN_KEYWORD_COVERAGE: float = Field(
+        default=0.5,
+        description="Fracción mínima de claves léxicas de la FAQ presentes en la consulta"
+    )
+    FAQ_REFRESH_SECONDS: float = Field(
+        default=60.0,
+        description="Cada cuánto recarga cada worker las FAQ desde la BD"
+    )
+    AGENT_ASYNC_REPLIES: bool = Field(
+        default=True,
+        description="Encolar la respuesta del agente (POST /messages responde al momento)"
+    )
+    AGENT_WORKER_IN_PROCESS: bool = Field(
+        default=True,
+        description="Arrancar workers de la cola dentro de la API (desactivar si se usa python -m worker)"
+    )
+    AGENT_WORKER_CONCURRENCY: int = Field(
+        default=4,
+        description="Hilos por worker procesando trabajos del agente"
+    )
+    AGENT_WORKER_POLL_SECONDS: float = Field(
+        default=1.0,
+        description="Espera entre consultas a la cola cuando está vacía"
+    )
+    AGENT_JOB_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Intentos por trabajo antes de escalar el ticket"
+    )
+    AGENT_JOB_LOCK_TIMEOUT_SECONDS: float = Field(
+        default=300.0,
+        description="Tras este tiempo un trabajo en ejecución se da por abandonado y vuelve a la cola"
+    )
+    USAGE_LEDGER_BATCH_SIZE: int = Field(
+        default=50,
+        description="Registros de consumo de tokens que se acumulan antes de escribirlos"
+    )
+    USAGE_LEDGER_FLUSH_SECONDS: float = Field(
+        default=10.0,
+        description="Intervalo máximo (segundos) entre escrituras del registro de consumo"
+    )
+    
+    # Realtime
+    REALTIME_BACKEND: str = Field(
+        default="memory",
+        description="Difusión de mensajes nuevos (memory = un proceso, postgres = LISTEN/NOTIFY entre procesos)"
+    )
+    REALTIME_QUEUE_SIZE: int = Field(
+        default=100,
+        description="Eventos pendientes por suscriptor antes de cortar a un cliente lento"
+    )
+    REALTIME_HEARTBEAT_SECONDS: float = Field(
+        default=15.0,
+        description="Intervalo de los keep-alive en las suscripciones SSE/WebSocket"
+    )
+    
     # Security
     SECRET_KEY: str = Field(
         default="default-secret-key-change-in-production",
@@ -39,10 +199,30 @@ class Settings(BaseSettings):
         default="HS256",
         description="Algoritmo para JWT"
     )
+    AUTH_TOKEN_CACHE_SIZE: int = Field(
+        default=10000,
+        description="Tokens JWT verificados que se recuerdan (hasta su expiración)"
+    )
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = Field(
+        default=30.0,
+        description="Segundos que se recuerda si un usuario está activo / es admin"
+    )
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(
         default=30,
         description="Minutos de expiración del token de acceso"
     )
+    REFRESH_TOKEN_EXPIRE_DAYS: int = Field(
+        default=14,
+        description="Días de validez de un refresh token (cada uso emite uno nuevo)"
+    )
+    PASSWORD_BCRYPT_ROUNDS: int = Field(
+        default=12,
+        description="Coste de bcrypt (log2 de iteraciones); al cambiarlo se rehashea en el login"
+    )
+    PASSWORD_HASH_THREADS: int = Field(
+        default=4,
+        description="Hashes bcrypt simultáneos por worker (fuera del event loop)"
+    )
     
     # CORS
     ALLOWED_ORIGINS: List[str] = Field(
@@ -63,6 +243,18 @@ class Settings(BaseSettings):
        default=str(_backend_dir / "chroma_data"),  # <-- ESTO
        description="Directorio para persistir ChromaDB"
    )
+    VECTOR_INDEX_SHARED: bool = Field(
+        default=True,
+        description="Buscar en el snapshot mmap compartido entre workers en lugar de cargar el índice en cada uno"
+    )
+    VECTOR_INDEX_DIR: str = Field(
+        default="",
+        description="Directorio del snapshot compartido (vacío = <CHROMA_PERSIST_DIRECTORY>/shared_index)"
+    )
+    VECTOR_INDEX_CHECK_SECONDS: float = Field(
+        default=30.0,
+        description="Cada cuánto comprueba un worker si hay una versión nueva del snapshot"
+    )
     
     # Application
     ENVIRONMENT: str = Field(
@@ -78,11 +270,69 @@ class Settings(BaseSettings):
         description="Nombre del proyecto"
     )
     
+    # HTTP
+    RESPONSE_COMPRESSION_ENABLED: bool = Field(
+        default=True,
+        description="Comprimir (brotli/gzip) las respuestas JSON grandes"
+    )
+    RESPONSE_COMPRESSION_MIN_BYTES: int = Field(
+        default=1024,
+        description="Tamaño mínimo de una respuesta JSON para comprimirla"
+    )
+    
+    # Cola del operador (SLA desde el escalado, o la creación si no se escaló)
+    SLA_URGENT_MINUTES: int = Field(
+        default=60,
+        description="Minutos de espera máximos de un ticket urgente antes de marcarlo fuera de SLA"
+    )
+    SLA_HIGH_MINUTES: int = Field(
+        default=240,
+        description="Minutos de espera máximos de un ticket de prioridad alta"
+    )
+    SLA_MEDIUM_MINUTES: int = Field(
+        default=1440,
+        description="Minutos de espera máximos de un ticket de prioridad media"
+    )
+    SLA_LOW_MINUTES: int = Field(
+        default=4320,
+        description="Minutos de espera máximos de un ticket de prioridad baja"
+    )
+    
+    # Métricas
+    METRICS_ENABLED: bool = Field(
+        default=True,
+        description="Medir las peticiones y exponer GET /metrics (Prometheus)"
+    )
+    METRICS_WORKER_PORT: int = Field(
+        default=0,
+        description="Puerto del servidor de métricas del worker de la cola (0 = desactivado)"
+    )
+    
     # Rate Limiting
+    RATE_LIMIT_ENABLED: bool = Field(
+        default=True,
+        description="Aplicar los límites de peticiones (token buckets)"
+    )
     RATE_LIMIT_PER_MINUTE: int = Field(
         default=60,
         description="Límite de peticiones por minuto por usuario"
     )
+    RATE_LIMIT_IP_PER_MINUTE: int = Field(
+        default=120,
+        description="Límite de peticiones por minuto por IP (incluye las no autenticadas)"
+    )
+    RATE_LIMIT_LLM_PER_MINUTE: int = Field(
+        default=10,
+        description="Límite por minuto y usuario de los endpoints que llaman al LLM"
+    )
+    RATE_LIMIT_BACKEND: str = Field(
+        default="memory",
+        description="Almacén de los buckets (memory = por worker, postgres = compartido)"
+    )
+    RATE_LIMIT_SHARDS: int = Field(
+        default=16,
+        description="Shards (cada uno con su lock) del almacén en memoria"
+    )
     
     # Configuración de Pydantic Settings
     model_config = SettingsConfigDict(
@@ -97,6 +347,22 @@ class Settings(BaseSettings):
         """Verifica si estamos en producción."""
         return self.ENVIRONMENT.lower() == "production"
     
+    @property
+    def async_database_url(self) -> str:
+        """DATABASE_URL con el driver asíncrono (asyncpg / aiosqlite)."""
+        url = self.DATABASE_URL
+        
+        for prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("postgres://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if url.startswith(prefix):
+                return async_prefix + url[len(prefix):]
+        
+        return url
+    
     @property
     def cors_origins(self) -> List[str]:
         """Retorna la lista de orígenes permitidos para CORS."""
@@ -0,0 +1,53 @@
+"""
+ETags débiles y GET condicional (If-None-Match -> 304).
+
+Los listados e historiales se piden una y otra vez sin haber cambiado. Cada
+endpoint calcula el ETag a partir de marcadores de versión baratos (número
+de filas y última modificación, en una sola consulta agregada) y, si
+coincide con el If-None-Match del cliente, responde 304 sin ejecutar las
+consultas pesadas ni serializar con Pydantic.
+"""
+from typing import Optional
+import hashlib
+
+from fastapi import Request, Response
+
+
+# El navegador guarda la respuesta pero la revalida siempre con el ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(*parts) -> str:
+    """ETag débil a partir de los marcadores de versión y los parámetros de la consulta."""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def _opaque_tag(tag: str) -> str:
+    # Comparación débil (RFC 9110): se ignora el prefijo W/
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Indica si el If-None-Match de la petición coincide con el ETag actual."""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    current = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == current for tag in header.split(","))
+
+
+def not_modified_response(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Añade el ETag y la política de caché a una respuesta 200."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,245 @@
+"""
+Métricas Prometheus (GET /metrics).
+
+- http_request_duration_seconds{method,route,status}: latencia hasta el
+  inicio de la respuesta, por plantilla de ruta (/api/chat/{ticket_id}/...)
+- chat_stage_duration_seconds{stage}: etapas de la respuesta a un mensaje
+  (db_write, history_fetch, faq_lookup, vector_search, llm_completion,
+  llm_stream, escalation)
+- llm_tokens_total{model,kind}: tokens facturados (prompt / completion)
+- Contadores y gauges que se leen en el momento del scrape de los get_stats
+  ya existentes: aciertos de FAQ y de coalescencia, cola del LLM, circuit
+  breaker, suscriptores en tiempo real, rate limiting y ocupación de los
+  pools de conexiones.
+
+En el camino caliente solo se observa un histograma (un lock y una búsqueda
+binaria en los buckets); lo demás se calcula al hacer scrape.
+
+Con varios workers de uvicorn, PROMETHEUS_MULTIPROC_DIR activa el modo
+multiproceso de prometheus_client: histogramas y contadores se suman entre
+workers; los valores leídos en el scrape son los del worker que lo atiende.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+import logging
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+
+# Buckets pensados para el chat: consultas de ms y llamadas al LLM de segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP hasta el inicio de la respuesta",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+CHAT_STAGE_DURATION = Histogram(
+    "chat_stage_duration_seconds",
+    "Duración de cada etapa de la respuesta a un mensaje del chat",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens del LLM facturados",
+    ["model", "kind"]
+)
+
+# Rutas sin plantilla (404, estáticos): una sola serie para no disparar la cardinalidad
+UNMATCHED_ROUTE = "unmatched"
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Mide la duración del bloque en chat_stage_duration_seconds{stage}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHAT_STAGE_DURATION.labels(stage).observe(time.perf_counter() - started)
+
+
+def record_tokens(metadata: dict) -> None:
+    """Suma los tokens de una respuesta del LLM (metadata de LLMClient)."""
+    model = metadata.get("model")
+    if not model or metadata.get("coalesced"):
+        return
+
+    LLM_TOKENS.labels(model, "prompt").inc(int(metadata.get("tokens_prompt") or 0))
+    LLM_TOKENS.labels(model, "completion").inc(int(metadata.get("tokens_completion") or 0))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide la latencia por método, ruta y status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        responded = False
+
+        async def send_with_timing(message):
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                self._observe(scope, message["status"], started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # La app falló antes de responder: cuenta como 500
+            if not responded:
+                self._observe(scope, 500, started)
+
+    @staticmethod
+    def _observe(scope, status_code: int, started: float) -> None:
+        # FastAPI deja la ruta resuelta en el scope: se usa su plantilla, no el path
+        route = scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            scope["method"],
+            getattr(route, "path", UNMATCHED_ROUTE),
+            str(status_code)
+        ).observe(time.perf_counter() - started)
+
+
+class RuntimeCollector:
+    """Lee en cada scrape las estadísticas de cliente LLM, caches, pools y broker."""
+
+    def describe(self):
+        # Sin describe() el registro llamaría a collect() al registrarse
+        return []
+
+    def collect(self):
+        # Cada grupo por separado: si uno falla (p. ej. el cliente LLM mal
+        # configurado) el scrape sigue con el resto y con los histogramas
+        for collect_group in (
+            self._collect_llm,
+            self._collect_faq,
+            self._collect_auth,
+            self._collect_pools,
+            self._collect_realtime,
+            self._collect_rate_limit,
+        ):
+            try:
+                # list(): un fallo a mitad de grupo no deja métricas sueltas
+                yield from list(collect_group())
+            except Exception as e:
+                logger.warning(f"⚠️ Métricas de {collect_group.__name__} no disponibles: {e}")
+
+    @staticmethod
+    def _collect_llm():
+        from agent import get_llm_client
+
+        stats = get_llm_client().get_stats()
+
+        scheduler = stats["scheduler"]
+        yield GaugeMetricFamily("llm_scheduler_active", "Llamadas al LLM en curso", value=scheduler["active"])
+        yield GaugeMetricFamily("llm_scheduler_capacity", "Llamadas concurrentes permitidas al LLM", value=scheduler["max_concurrency"])
+        yield GaugeMetricFamily("llm_scheduler_queued", "Peticiones esperando hueco para el LLM", value=scheduler["queued"])
+        yield CounterMetricFamily("llm_scheduler_timeouts", "Peticiones rechazadas por espera en la cola del LLM", value=scheduler["timeouts"])
+
+        breaker = stats["circuit_breaker"]
+        state = GaugeMetricFamily("llm_circuit_state", "Estado del circuit breaker del LLM", labels=["state"])
+        for name in ("closed", "open", "half_open"):
+            state.add_metric([name], 1 if breaker["state"] == name else 0)
+        yield state
+        yield CounterMetricFamily("llm_circuit_rejected", "Llamadas rechazadas con el circuito abierto", value=breaker["rejected"])
+
+        single_flight = stats["single_flight"]
+        if single_flight:
+            requests = CounterMetricFamily("llm_single_flight_requests", "Peticiones al LLM coalescidas (hit) o líderes (miss)", labels=["result"])
+            requests.add_metric(["hit"], single_flight["hits"] + single_flight.get("stream_hits", 0))
+            requests.add_metric(["miss"], single_flight["misses"] + single_flight.get("stream_misses", 0))
+            yield requests
+
+    @staticmethod
+    def _collect_faq():
+        from agent.faq import get_faq_index
+
+        stats = get_faq_index().get_stats()
+
+        lookups = CounterMetricFamily("faq_lookups", "Consultas al índice de FAQ por resultado", labels=["result"])
+        lookups.add_metric(["lexical_hit"], stats["lexical_hits"])
+        lookups.add_metric(["semantic_hit"], stats["semantic_hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        yield lookups
+        yield GaugeMetricFamily("faq_entries", "FAQ activas cargadas en el índice", value=stats["entries"])
+
+    @staticmethod
+    def _collect_auth():
+        from core.auth_cache import get_principal_cache, get_token_cache
+
+        lookups = CounterMetricFamily("auth_cache_lookups", "Consultas a las caches de autenticación", labels=["cache", "result"])
+        for name, cache in (("token", get_token_cache()), ("principal", get_principal_cache())):
+            stats = cache.get_stats()
+            lookups.add_metric([name, "hit"], stats["hits"])
+            lookups.add_metric([name, "miss"], stats["misses"])
+        yield lookups
+
+    @staticmethod
+    def _collect_pools():
+        from db import async_engine, engine
+
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Conexiones del pool en uso", labels=["engine"])
+        size = GaugeMetricFamily("db_pool_size", "Tamaño base del pool de conexiones", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Conexiones abiertas por encima del tamaño base", labels=["engine"])
+
+        for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+            # SQLite usa pools sin tamaño (NullPool/StaticPool)
+            if not hasattr(pool, "checkedout"):
+                continue
+            checked_out.add_metric([name], pool.checkedout())
+            size.add_metric([name], pool.size())
+            overflow.add_metric([name], max(0, pool.overflow()))
+
+        yield checked_out
+        yield size
+        yield overflow
+
+    @staticmethod
+    def _collect_realtime():
+        from realtime import get_message_broker
+
+        stats = get_message_broker().get_stats()
+
+        yield GaugeMetricFamily("realtime_subscribers", "Clientes suscritos a mensajes nuevos", value=stats["subscribers"])
+
+    @staticmethod
+    def _collect_rate_limit():
+        from core.rate_limit import get_rate_limit_store
+
+        stats = get_rate_limit_store().get_stats()
+
+        yield CounterMetricFamily("rate_limit_rejected", "Peticiones rechazadas con 429", value=stats["rejected"])
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Cuerpo y content type de la respuesta de /metrics."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(RuntimeCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# El colector de estadísticas se registra una vez en el registro global
+REGISTRY.register(RuntimeCollector())
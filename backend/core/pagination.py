@@ -0,0 +1,68 @@
+"""
+Cursores opacos para paginación por keyset.
+
+Un cursor codifica la posición (created_at, id) del último elemento visto.
+La siguiente página se pide con `WHERE (created_at, id) > cursor` sobre un
+índice que empieza por esas columnas, así el coste depende del tamaño de la
+página y no de cuántos elementos quedan detrás (a diferencia de OFFSET).
+
+La cola del operador ordena además por prioridad: su cursor lleva delante la
+prioridad del último ticket (encode_queue_cursor).
+"""
+from datetime import datetime
+from uuid import UUID
+import base64
+
+
+def _encode(*parts: str) -> str:
+    raw = "|".join(parts)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str, n_parts: int) -> list[str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    parts = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", n_parts - 1)
+    if len(parts) != n_parts:
+        raise ValueError(cursor)
+    return parts
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    """Codifica la posición (created_at, id) como cursor opaco."""
+    return _encode(created_at.isoformat(), str(item_id))
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    Decodifica un cursor generado con encode_cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        created_at, item_id = _decode(cursor, 2)
+        return datetime.fromisoformat(created_at), UUID(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor de paginación inválido") from e
+
+
+def encode_queue_cursor(priority: str, queued_at: datetime, item_id: UUID) -> str:
+    """Codifica la posición (prioridad, queued_at, id) de la cola del operador."""
+    return _encode(priority, queued_at.isoformat(), str(item_id))
+
+
+def decode_queue_cursor(cursor: str) -> tuple[str, datetime, UUID]:
+    """
+    Decodifica un cursor generado con encode_queue_cursor.
+
+    Returns:
+        Tupla de (valor de la prioridad, queued_at, id)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        priority, queued_at, item_id = _decode(cursor, 3)
+        return priority, datetime.fromisoformat(queued_at), UUID(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor de paginación inválido") from e
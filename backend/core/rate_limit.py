@@ -0,0 +1,316 @@
+"""
+Rate limiting con token buckets (RATE_LIMIT_*).
+
+Cada petición HTTP consume un token de varios buckets:
+- ip:   todas las peticiones de una IP (incluye login y registro)
+- user: las peticiones autenticadas de un usuario (sub del JWT)
+- llm:  los endpoints que disparan una llamada al LLM, con un límite más
+        estricto por usuario (o por IP si no hay token)
+
+Un bucket admite ráfagas de hasta N peticiones y se recarga a N por minuto.
+Si alguno se agota se responde 429 con Retry-After (segundos hasta que haya
+token) sin llegar al endpoint, y se devuelven los tokens ya consumidos de los
+otros buckets: una petición rechazada no gasta cupo.
+
+La IP es la del cliente según uvicorn: detrás de un proxy inverso hay que
+arrancarlo con --proxy-headers y --forwarded-allow-ips (la IP del proxy) o
+todos los clientes compartirían el bucket de la IP del proxy.
+
+Almacenes (RATE_LIMIT_BACKEND):
+- memory: buckets en memoria repartidos en shards con su propio lock. Cada
+  worker de uvicorn aplica el límite por separado.
+- postgres: estado compartido en la tabla UNLOGGED rate_limit_buckets, un
+  UPSERT por bucket (forma GCRA del token bucket).
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import json
+import math
+import re
+import threading
+import time
+import logging
+
+from starlette.datastructures import Headers
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Endpoints que generan una respuesta del LLM (método, ruta)
+LLM_ROUTES = [
+    ("POST", re.compile(r"^/api/chat/[^/]+/messages(/stream)?/?$")),
+]
+
+# Rutas sin límite (health checks, métricas, documentación)
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+
+@dataclass(frozen=True)
+class Rate:
+    """Límite de un bucket: ráfaga de `per_minute` peticiones, recarga de `per_minute`/min."""
+    per_minute: int
+
+    @property
+    def capacity(self) -> float:
+        return float(self.per_minute)
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+class MemoryRateLimitStore:
+    """Token buckets en memoria, repartidos en shards para reducir la contención."""
+
+    def __init__(self, shards: int = 16):
+        self._shards: List[Tuple[threading.Lock, Dict[str, tuple]]] = [
+            (threading.Lock(), {}) for _ in range(shards)
+        ]
+        self._last_sweep = [time.monotonic()] * shards
+        self.rejected = 0
+
+    async def take(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        return self.take_nowait(key, rate)
+
+    def take_nowait(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        """
+        Consume un token del bucket.
+
+        Returns:
+            Tupla de (permitido, segundos hasta el siguiente token si no)
+        """
+        index = hash(key) % len(self._shards)
+        lock, buckets = self._shards[index]
+        now = time.monotonic()
+
+        with lock:
+            tokens, updated, _ = buckets.get(key, (rate.capacity, now, now))
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.refill_per_second)
+
+            if tokens >= 1:
+                tokens -= 1
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate.refill_per_second
+                self.rejected += 1
+
+            # Instante en que el bucket vuelve a estar lleno (se puede olvidar)
+            full_at = now + (rate.capacity - tokens) / rate.refill_per_second
+            buckets[key] = (tokens, now, full_at)
+
+            if now - self._last_sweep[index] > 60:
+                self._sweep(buckets, now)
+                self._last_sweep[index] = now
+
+        return allowed, retry_after
+
+    async def refund(self, key: str, rate: Rate) -> None:
+        self.refund_nowait(key, rate)
+
+    def refund_nowait(self, key: str, rate: Rate) -> None:
+        """Devuelve un token consumido (la petición se rechazó por otro bucket)."""
+        index = hash(key) % len(self._shards)
+        lock, buckets = self._shards[index]
+
+        with lock:
+            entry = buckets.get(key)
+            if entry is None:
+                return
+
+            tokens, updated, full_at = entry
+            refunded = min(rate.capacity, tokens + 1)
+            buckets[key] = (refunded, updated, full_at - (refunded - tokens) / rate.refill_per_second)
+
+    @staticmethod
+    def _sweep(buckets: Dict[str, tuple], now: float) -> None:
+        """Elimina los buckets inactivos que ya se han recargado por completo."""
+        for key in [key for key, (_, _, full_at) in buckets.items() if full_at <= now]:
+            del buckets[key]
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "buckets": sum(len(buckets) for _, buckets in self._shards),
+            "rejected": self.rejected,
+        }
+
+
+# GCRA: tat (theoretical arrival time) avanza `interval` por petición; se
+# permite si no se adelanta más de `burst` respecto a ahora. Si se deniega,
+# tat no cambia y `allowed` lo indica (ambos SET leen la fila anterior).
+_GCRA_UPSERT = """
+INSERT INTO rate_limit_buckets AS b (key, tat, allowed)
+VALUES (:key, now() + make_interval(secs => :interval), true)
+ON CONFLICT (key) DO UPDATE SET
+    tat = CASE
+        WHEN greatest(b.tat, now()) + make_interval(secs => :interval) <= now() + make_interval(secs => :burst)
+        THEN greatest(b.tat, now()) + make_interval(secs => :interval)
+        ELSE b.tat
+    END,
+    allowed = greatest(b.tat, now()) + make_interval(secs => :interval) <= now() + make_interval(secs => :burst)
+RETURNING allowed, EXTRACT(EPOCH FROM (tat + make_interval(secs => :interval) - now())) - :burst AS retry_after
+"""
+
+# Devolver un token: tat retrocede un intervalo (sin quedar en el pasado)
+_GCRA_REFUND = """
+UPDATE rate_limit_buckets
+SET tat = greatest(tat - make_interval(secs => :interval), now())
+WHERE key = :key
+"""
+
+_GCRA_SWEEP = "DELETE FROM rate_limit_buckets WHERE tat < now()"
+
+
+class PostgresRateLimitStore:
+    """Buckets compartidos entre workers en la tabla rate_limit_buckets."""
+
+    SWEEP_INTERVAL_SECONDS = 300
+
+    def __init__(self):
+        self._last_sweep = time.monotonic()
+        self.rejected = 0
+
+    async def take(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        from sqlalchemy import text
+        from db import async_engine
+
+        interval = 1.0 / rate.refill_per_second
+        burst = rate.capacity * interval
+
+        async with async_engine.begin() as connection:
+            result = await connection.execute(
+                text(_GCRA_UPSERT),
+                {"key": key, "interval": interval, "burst": burst}
+            )
+            allowed, retry_after = result.one()
+
+            if time.monotonic() - self._last_sweep > self.SWEEP_INTERVAL_SECONDS:
+                self._last_sweep = time.monotonic()
+                await connection.execute(text(_GCRA_SWEEP))
+
+        if not allowed:
+            self.rejected += 1
+
+        return bool(allowed), max(0.0, float(retry_after or 0.0))
+
+    async def refund(self, key: str, rate: Rate) -> None:
+        """Devuelve un token consumido (la petición se rechazó por otro bucket)."""
+        from sqlalchemy import text
+        from db import async_engine
+
+        async with async_engine.begin() as connection:
+            await connection.execute(
+                text(_GCRA_REFUND),
+                {"key": key, "interval": 1.0 / rate.refill_per_second}
+            )
+
+    def get_stats(self) -> Dict:
+        return {"backend": "postgres", "rejected": self.rejected}
+
+
+def _user_id_from_headers(headers: Headers) -> Optional[str]:
+    """sub del JWT de la cabecera Authorization (None si no hay o no es válido)."""
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    from core.security import verify_access_token
+
+    payload = verify_access_token(token)
+    return payload.get("sub") if payload else None
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica los token buckets por IP, usuario y LLM."""
+
+    def __init__(self, app, store=None):
+        self.app = app
+        self.store = store or get_rate_limit_store()
+        self.ip_rate = Rate(settings.RATE_LIMIT_IP_PER_MINUTE)
+        self.user_rate = Rate(settings.RATE_LIMIT_PER_MINUTE)
+        self.llm_rate = Rate(settings.RATE_LIMIT_LLM_PER_MINUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        user_id = _user_id_from_headers(headers)
+
+        buckets = [(f"ip:{client_ip}", self.ip_rate)]
+        if user_id:
+            buckets.append((f"user:{user_id}", self.user_rate))
+        if self._is_llm_route(scope["method"], scope["path"]):
+            buckets.append((f"llm:{user_id or client_ip}", self.llm_rate))
+
+        taken = []
+        for key, rate in buckets:
+            try:
+                allowed, retry_after = await self.store.take(key, rate)
+            except Exception as e:
+                # Sin almacén no se bloquea el servicio: se deja pasar
+                logger.error(f"❌ Error en el rate limiting ({key}): {e}")
+                break
+
+            if not allowed:
+                await self._refund(taken)
+                await self._reject(send, retry_after)
+                return
+
+            taken.append((key, rate))
+
+        await self.app(scope, receive, send)
+
+    async def _refund(self, taken: list) -> None:
+        """Devuelve los tokens de los buckets que sí admitían la petición rechazada."""
+        for key, rate in taken:
+            try:
+                await self.store.refund(key, rate)
+            except Exception as e:
+                logger.error(f"❌ Error al devolver el token de rate limiting ({key}): {e}")
+
+    @staticmethod
+    def _is_llm_route(method: str, path: str) -> bool:
+        return any(method == route_method and pattern.match(path) for route_method, pattern in LLM_ROUTES)
+
+    @staticmethod
+    async def _reject(send, retry_after: float) -> None:
+        body = json.dumps(
+            {"detail": "Demasiadas peticiones. Inténtalo de nuevo más tarde."},
+            ensure_ascii=False
+        ).encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Instancia global del almacén de buckets
+_rate_limit_store = None
+
+def get_rate_limit_store():
+    """
+    Dependency para obtener el almacén de rate limiting.
+    Usa singleton pattern.
+    """
+    global _rate_limit_store
+
+    if _rate_limit_store is None:
+        if settings.RATE_LIMIT_BACKEND == "postgres":
+            _rate_limit_store = PostgresRateLimitStore()
+        else:
+            _rate_limit_store = MemoryRateLimitStore(shards=settings.RATE_LIMIT_SHARDS)
+
+    return _rate_limit_store
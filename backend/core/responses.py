@@ -0,0 +1,21 @@
+"""
+Respuesta JSON rápida.
+
+FastAPI, por defecto, valida el valor devuelto contra el response_model,
+lo pasa a tipos JSON con jsonable_encoder y lo codifica con json.dumps.
+FastJSONResponse codifica con el serializador de pydantic-core (Rust), que
+ya está instalado con pydantic, y acepta directamente modelos Pydantic: los
+endpoints de historial y listados construyen el modelo una vez y lo
+devuelven envuelto en esta respuesta, de modo que se serializa una sola vez.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse codificada con pydantic-core (modelos, dicts, UUID, datetime...)."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
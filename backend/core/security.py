@@ -3,16 +3,26 @@ Utilidades de seguridad: JWT, hashing de contraseñas, autenticación.
 """
 from datetime import datetime, timedelta
 from typing import Optional
+from anyio import CapacityLimiter, to_thread
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from core.auth_cache import get_token_cache
 from core.config import settings
 
 
 # Contexto de hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
+
+# Hilos para bcrypt: acotados para que una avalancha de logins no ocupe todo
+# el threadpool (que también usan el LLM y los generadores de streaming)
+_hash_limiter: Optional[CapacityLimiter] = None
 
 # Esquema de seguridad HTTP Bearer
 security = HTTPBearer()
@@ -45,6 +55,69 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Indica si el hash usa un esquema obsoleto o un coste distinto de
+    PASSWORD_BCRYPT_ROUNDS.
+    
+    Args:
+        hashed_password: Hash de la contraseña ($2b$<coste>$...)
+        
+    Returns:
+        True si conviene volver a calcularlo
+    """
+    if pwd_context.needs_update(hashed_password):
+        return True
+    
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    
+    return rounds != settings.PASSWORD_BCRYPT_ROUNDS
+
+
+def _verify_and_rehash(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    
+    if password_needs_rehash(hashed_password):
+        return True, get_password_hash(plain_password)
+    
+    return True, None
+
+
+def _get_hash_limiter() -> CapacityLimiter:
+    global _hash_limiter
+    
+    if _hash_limiter is None:
+        _hash_limiter = CapacityLimiter(settings.PASSWORD_HASH_THREADS)
+    
+    return _hash_limiter
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash en el pool de hilos de hashing (no bloquea el event loop)."""
+    return await to_thread.run_sync(get_password_hash, password, limiter=_get_hash_limiter())
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña en el pool de hilos de hashing y, si es correcta y
+    el hash está desfasado, calcula el nuevo en el mismo hilo.
+    
+    Args:
+        plain_password: Contraseña en texto plano
+        hashed_password: Hash guardado
+        
+    Returns:
+        Tupla de (coincide, nuevo hash o None si no hay que cambiarlo)
+    """
+    return await to_thread.run_sync(
+        _verify_and_rehash, plain_password, hashed_password, limiter=_get_hash_limiter()
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Crea un token JWT de acceso.
@@ -75,6 +148,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_refresh_token() -> str:
+    """
+    Genera un refresh token opaco (aleatorio, no JWT: se valida contra la BD).
+    
+    Returns:
+        Token en claro para el cliente
+    """
+    import secrets
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash con el que se guarda y se busca un refresh token.
+    
+    SHA-256 basta (y permite buscar por igualdad): el token es aleatorio de
+    256 bits, no una contraseña que se pueda adivinar por diccionario.
+    """
+    import hashlib
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verify_access_token(token: str) -> Optional[dict]:
+    """
+    Verifica un token JWT, recordando los ya verificados hasta su expiración.
+    
+    Args:
+        token: Token JWT a verificar
+        
+    Returns:
+        Payload del token, o None si es inválido o ha expirado
+    """
+    cache = get_token_cache()
+    
+    payload = cache.get(token)
+    if payload is not None:
+        return payload
+    
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM]
+        )
+    except JWTError:
+        return None
+    
+    cache.put(token, payload)
+    return payload
+
+
 def decode_access_token(token: str) -> dict:
     """
     Decodifica y valida un token JWT.
@@ -94,15 +218,11 @@ def decode_access_token(token: str) -> dict:
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload
-    except JWTError:
+    payload = verify_access_token(token)
+    if payload is None:
         raise credentials_exception
+    
+    return payload
 
 
 async def get_current_user_id(
@@ -1,7 +1,7 @@
 """
 Módulo de base de datos.
 """
-from db.base import Base, engine, get_db, SessionLocal
+from db.base import Base, engine, get_db, SessionLocal, async_engine, get_async_db, AsyncSessionLocal
 
 
 __all__ = [
@@ -9,5 +9,8 @@ __all__ = [
     "engine",
     "get_db",
     "SessionLocal",
+    "async_engine",
+    "get_async_db",
+    "AsyncSessionLocal",
 
 ]
\ No newline at end of file
@@ -2,6 +2,7 @@
 Configuración base de SQLAlchemy.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -17,6 +18,25 @@ engine = create_engine(
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine asíncrono para los endpoints: las consultas no bloquean el event loop.
+# El engine síncrono queda para workers, tareas en segundo plano y scripts.
+_async_pool_args = (
+    {}
+    if settings.async_database_url.startswith("sqlite")
+    else {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+)
+
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    echo=settings.DEBUG,
+    **_async_pool_args
+)
+
+# expire_on_commit=False: tras el commit los objetos se siguen leyendo sin
+# recargas implícitas (en asyncio no hay lazy loading)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 # Base class para los modelos
 Base = declarative_base()
 
@@ -30,4 +50,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """
+    Dependency para obtener una sesión asíncrona de base de datos.
+    Se usa en los endpoints de FastAPI.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
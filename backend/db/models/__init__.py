@@ -3,7 +3,14 @@ Modelos de base de datos.
 """
 from db.models.user import User
 from db.models.ticket import Ticket, TicketStatus, TicketPriority, TicketCategory
+from db.models.ticket_counter import TicketStatusCounter
 from db.models.message import Message, MessageRole
+from db.models.ticket_summary import TicketSummary
+from db.models.llm_usage import LLMUsage, LLMUsageDaily
+from db.models.faq import FAQEntry
+from db.models.agent_job import AgentJob, JobStatus
+from db.models.rate_limit import RateLimitBucket
+from db.models.refresh_token import RefreshToken
 from db.models.document import Document, DocumentType
 
 __all__ = [
@@ -12,8 +19,17 @@ __all__ = [
     "TicketStatus",
     "TicketPriority",
     "TicketCategory",
+    "TicketStatusCounter",
     "Message",
     "MessageRole",
+    "TicketSummary",
+    "LLMUsage",
+    "LLMUsageDaily",
+    "FAQEntry",
+    "AgentJob",
+    "JobStatus",
+    "RateLimitBucket",
+    "RefreshToken",
     "Document",
     "DocumentType",
 ]
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Modelo de Trabajo del agente (cola persistente de respuestas).
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID
+import enum
+
+from db.base import Base
+
+
+class JobStatus(str, enum.Enum):
+    """Estados posibles de un trabajo."""
+    PENDING = "pending"    # En cola (o esperando reintento)
+    RUNNING = "running"    # Tomado por un worker
+    DONE = "done"          # Respuesta guardada
+    FAILED = "failed"      # Agotó los reintentos; el ticket se escaló
+
+
+class AgentJob(Base):
+    """
+    Respuesta del agente pendiente para un mensaje del usuario.
+    
+    El endpoint de chat guarda el mensaje y encola el trabajo; los workers
+    (python -m worker) los toman con SELECT ... FOR UPDATE SKIP LOCKED, así
+    sobreviven a reinicios y la latencia del LLM no bloquea la petición HTTP.
+    """
+    
+    __tablename__ = "agent_jobs"
+    __table_args__ = (
+        # Búsqueda del siguiente trabajo listo para ejecutarse
+        Index("ix_agent_jobs_status_run_after", "status", "run_after"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False, index=True)
+    message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id"), nullable=False, unique=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    
+    status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    
+    # No ejecutar antes de esta fecha (reintentos con espera)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Worker que lo tiene tomado y desde cuándo (para recuperar los abandonados)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<AgentJob(id={self.id}, status={self.status}, attempts={self.attempts})>"
@@ -0,0 +1,45 @@
+"""
+Modelo de Pregunta frecuente (FAQ) curada por los administradores.
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Boolean, Column, String, Text, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+from db.base import Base
+
+
+class FAQEntry(Base):
+    """
+    Respuesta aprobada a una pregunta frecuente.
+    
+    Cuando una consulta coincide con confianza (por texto o por embedding) se
+    responde con este texto sin pasar por el agente RAG ni el LLM.
+    """
+    
+    __tablename__ = "faq_entries"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    
+    # Claves léxicas: términos que deben aparecer en la consulta
+    keywords = Column(JSONB, default=list, nullable=False)
+    # Fuentes citadas: [{"source": "...", "document_type": "..."}]
+    sources = Column(JSONB, default=list, nullable=False)
+    
+    # Categoría de ticket a la que aplica (None = todas)
+    category = Column(String(50), nullable=True)
+    
+    is_active = Column(Boolean, default=True, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<FAQEntry(id={self.id}, question={self.question[:40]}, active={self.is_active})>"
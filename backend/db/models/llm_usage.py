@@ -0,0 +1,62 @@
+"""
+Modelos del registro de consumo de tokens del LLM.
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+
+from db.base import Base
+
+
+class LLMUsage(Base):
+    """Una llamada al LLM con su consumo de tokens (registro de detalle)."""
+    
+    __tablename__ = "llm_usage"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=True, index=True)
+    
+    category = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    operation = Column(String(50), nullable=False)  # chat, chat_stream, summary...
+    
+    tokens_prompt = Column(Integer, default=0, nullable=False)
+    tokens_completion = Column(Integer, default=0, nullable=False)
+    tokens_total = Column(Integer, default=0, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<LLMUsage(id={self.id}, model={self.model}, tokens={self.tokens_total})>"
+
+
+class LLMUsageDaily(Base):
+    """
+    Agregado diario de consumo por usuario, categoría de ticket y modelo.
+    
+    Se mantiene de forma incremental al escribir el registro de detalle, así
+    las consultas de coste son búsquedas por índice y no recorridos del JSON
+    de los mensajes.
+    """
+    
+    __tablename__ = "llm_usage_daily"
+    __table_args__ = (
+        UniqueConstraint("day", "user_id", "category", "model", name="uq_llm_usage_daily_key"),
+        Index("ix_llm_usage_daily_user_id_day", "user_id", "day"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    category = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    
+    requests = Column(Integer, default=0, nullable=False)
+    tokens_prompt = Column(Integer, default=0, nullable=False)
+    tokens_completion = Column(Integer, default=0, nullable=False)
+    tokens_total = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<LLMUsageDaily(day={self.day}, user_id={self.user_id}, tokens={self.tokens_total})>"
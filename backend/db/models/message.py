@@ -3,7 +3,7 @@ Modelo de Mensaje dentro de un ticket.
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -22,6 +22,10 @@ class Message(Base):
     """Modelo de mensaje dentro de un ticket."""
     
     __tablename__ = "messages"
+    __table_args__ = (
+        # Historial por ticket en orden cronológico (y los N más recientes)
+        Index("ix_messages_ticket_id_created_at", "ticket_id", "created_at"),
+    )
     
     # Campos principales
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -0,0 +1,27 @@
+"""
+Modelo de los buckets de rate limiting compartidos entre workers.
+"""
+from sqlalchemy import Column, String, Boolean, DateTime
+
+from db.base import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Estado de un bucket de rate limiting (RATE_LIMIT_BACKEND=postgres).
+    
+    Se guarda en forma GCRA: en lugar de (tokens, última recarga) solo el
+    instante teórico de la siguiente petición (tat), equivalente a un token
+    bucket y actualizable con un único UPSERT. La tabla es UNLOGGED: es un
+    estado efímero que no necesita WAL ni sobrevivir a una caída.
+    """
+    
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+    
+    key = Column(String(200), primary_key=True)
+    tat = Column(DateTime(timezone=True), nullable=False, index=True)
+    allowed = Column(Boolean, nullable=False, default=True)  # Resultado de la última petición
+    
+    def __repr__(self):
+        return f"<RateLimitBucket(key={self.key}, tat={self.tat})>"
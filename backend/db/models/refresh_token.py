@@ -0,0 +1,37 @@
+"""
+Modelo de Refresh Token (sesiones de larga duración).
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from db.base import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh token emitido en el login.
+    
+    Solo se guarda el hash SHA-256 del token. Cada uso lo rota: se revoca y
+    se emite otro de la misma familia (la sesión iniciada en un login). Si
+    llega un token ya revocado es que alguien ha reutilizado uno robado o
+    antiguo, y se revoca la familia entera.
+    """
+    
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by = Column(UUID(as_uuid=True), nullable=True)  # Token emitido al rotarlo
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<RefreshToken(id={self.id}, user_id={self.user_id}, revoked={self.revoked_at is not None})>"
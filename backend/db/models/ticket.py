@@ -3,7 +3,7 @@ Modelo de Ticket (conversación/incidencia).
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, func, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
@@ -49,6 +49,10 @@ class Ticket(Base):
     priority = Column(SQLEnum(TicketPriority), default=TicketPriority.MEDIUM, nullable=False, index=True)
     category = Column(SQLEnum(TicketCategory), default=TicketCategory.GENERAL, nullable=False, index=True)
     
+    # Denormalizado: lo incrementan los repositorios de mensajes al crear uno,
+    # así los listados no cargan los mensajes para contarlos
+    message_count = Column(Integer, default=0, nullable=False)
+    
     # Timestamps especiales
     escalated_at = Column(DateTime, nullable=True)
     closed_at = Column(DateTime, nullable=True)
@@ -60,6 +64,7 @@ class Ticket(Base):
     # Relaciones
     user = relationship("User", back_populates="tickets")
     messages = relationship("Message", back_populates="ticket", cascade="all, delete-orphan", order_by="Message.created_at")
+    summary = relationship("TicketSummary", back_populates="ticket", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Ticket(id={self.id}, status={self.status}, priority={self.priority})>"
@@ -70,6 +75,22 @@ class Ticket(Base):
         return self.status in [TicketStatus.OPEN, TicketStatus.IN_PROGRESS]
     
     @property
-    def message_count(self) -> int:
-        """Retorna el número de mensajes en el ticket."""
-        return len(self.messages) if self.messages else 0
\ No newline at end of file
+    def queued_at(self) -> datetime:
+        """Desde cuándo espera a un operador: el escalado o, si no lo hubo, la creación."""
+        return self.escalated_at or self.created_at
+
+
+def ticket_queued_at(ticket=Ticket):
+    """Expresión SQL de Ticket.queued_at (sobre el modelo o un alias)."""
+    return func.coalesce(ticket.escalated_at, ticket.created_at)
+
+
+# Cola del operador: por estado, prioridad (el enum de Postgres ordena por
+# declaración, así DESC pone urgent primero), antigüedad e id para desempatar
+Index(
+    "ix_tickets_operator_queue",
+    Ticket.status,
+    Ticket.priority.desc(),
+    ticket_queued_at(),
+    Ticket.id
+)
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Modelo de contadores de tickets por estado.
+"""
+from sqlalchemy import Column, Integer, Enum as SQLEnum
+
+from db.base import Base
+from db.models.ticket import TicketStatus
+
+
+class TicketStatusCounter(Base):
+    """
+    Número de tickets en cada estado (una fila por estado).
+    
+    Lo mantiene TicketRepository en la misma transacción que crea o cambia de
+    estado el ticket, así las estadísticas del operador leen cuatro filas y
+    no recorren la tabla tickets. check_ticket_counters.py lo compara con un
+    recuento real y lo reconstruye.
+    """
+    
+    __tablename__ = "ticket_status_counters"
+    
+    status = Column(SQLEnum(TicketStatus), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<TicketStatusCounter(status={self.status}, count={self.count})>"
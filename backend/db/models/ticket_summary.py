@@ -0,0 +1,38 @@
+"""
+Modelo de Resumen de conversación de un ticket.
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from db.base import Base
+
+
+class TicketSummary(Base):
+    """
+    Resumen acumulado de la parte antigua de la conversación de un ticket.
+    
+    Se actualiza en segundo plano cuando el historial sin resumir supera un
+    umbral; el agente envía este resumen + los turnos recientes.
+    """
+    
+    __tablename__ = "ticket_summaries"
+    
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), primary_key=True)
+    
+    content = Column(Text, nullable=False)
+    
+    # Último mensaje incluido en el resumen (los posteriores van sin resumir)
+    summarized_until = Column(DateTime, nullable=False)
+    summarized_message_count = Column(Integer, default=0, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Relaciones
+    ticket = relationship("Ticket", back_populates="summary")
+    
+    def __repr__(self):
+        return f"<TicketSummary(ticket_id={self.ticket_id}, messages={self.summarized_message_count})>"
@@ -1,12 +1,27 @@
 """
 Repositorios para acceso a datos.
 """
-from db.repository.user_repository import UserRepository
-from db.repository.ticket_repository import TicketRepository
-from db.repository.message_repository import MessageRepository
+from db.repository.user_repository import UserRepository, AsyncUserRepository
+from db.repository.ticket_repository import TicketRepository, AsyncTicketRepository
+from db.repository.message_repository import MessageRepository, AsyncMessageRepository
+from db.repository.ticket_summary_repository import TicketSummaryRepository
+from db.repository.usage_repository import UsageRepository
+from db.repository.faq_repository import FAQRepository
+from db.repository.job_repository import JobRepository, AsyncJobRepository
+from db.repository.refresh_token_repository import AsyncRefreshTokenRepository
 
 __all__ = [
     "UserRepository",
     "TicketRepository",
     "MessageRepository",
+    "TicketSummaryRepository",
+    "UsageRepository",
+    "FAQRepository",
+    "JobRepository",
+    # Sesión asíncrona (endpoints)
+    "AsyncUserRepository",
+    "AsyncTicketRepository",
+    "AsyncMessageRepository",
+    "AsyncJobRepository",
+    "AsyncRefreshTokenRepository",
 ]
\ No newline at end of file
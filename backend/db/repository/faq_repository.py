@@ -0,0 +1,116 @@
+"""
+Repositorio para operaciones de FAQEntry en la base de datos.
+"""
+from typing import Optional, List
+from uuid import UUID
+from sqlalchemy.orm import Session
+
+from db.models import FAQEntry
+
+
+class FAQRepository:
+    """Repositorio para gestionar las preguntas frecuentes."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_by_id(self, faq_id: UUID) -> Optional[FAQEntry]:
+        """Obtiene una FAQ por ID."""
+        return self.db.query(FAQEntry).filter(FAQEntry.id == faq_id).first()
+    
+    def list_all(self, include_inactive: bool = False) -> List[FAQEntry]:
+        """Lista las FAQ (por defecto solo las activas)."""
+        query = self.db.query(FAQEntry)
+        
+        if not include_inactive:
+            query = query.filter(FAQEntry.is_active == True)
+        
+        return query.order_by(FAQEntry.created_at.asc()).all()
+    
+    def create(
+        self,
+        question: str,
+        answer: str,
+        keywords: Optional[List[str]] = None,
+        sources: Optional[List[dict]] = None,
+        category: Optional[str] = None,
+        created_by: Optional[UUID] = None
+    ) -> FAQEntry:
+        """
+        Crea una nueva FAQ.
+        
+        Args:
+            question: Pregunta de referencia
+            answer: Respuesta aprobada
+            keywords: Claves léxicas que deben aparecer en la consulta
+            sources: Fuentes citadas en la respuesta
+            category: Categoría de ticket a la que aplica (None = todas)
+            created_by: Administrador que la crea
+        
+        Returns:
+            FAQEntry creada
+        """
+        entry = FAQEntry(
+            question=question,
+            answer=answer,
+            keywords=keywords or [],
+            sources=sources or [],
+            category=category,
+            created_by=created_by
+        )
+        
+        self.db.add(entry)
+        self.db.commit()
+        self.db.refresh(entry)
+        
+        return entry
+    
+    def update(self, faq_id: UUID, **kwargs) -> Optional[FAQEntry]:
+        """
+        Actualiza una FAQ.
+        
+        Args:
+            faq_id: ID de la FAQ
+            **kwargs: Campos a actualizar
+        
+        Returns:
+            FAQEntry actualizada o None si no existe
+        """
+        entry = self.get_by_id(faq_id)
+        
+        if not entry:
+            return None
+        
+        for key, value in kwargs.items():
+            if hasattr(entry, key):
+                setattr(entry, key, value)
+        
+        self.db.commit()
+        self.db.refresh(entry)
+        
+        return entry
+    
+    def delete(self, faq_id: UUID) -> bool:
+        """
+        Elimina una FAQ.
+        
+        Returns:
+            True si se eliminó, False si no existía
+        """
+        entry = self.get_by_id(faq_id)
+        
+        if not entry:
+            return False
+        
+        self.db.delete(entry)
+        self.db.commit()
+        
+        return True
+    
+    def increment_hits(self, faq_id: UUID) -> None:
+        """Suma un uso a la FAQ (UPDATE atómico, sin cargar la fila)."""
+        self.db.query(FAQEntry).filter(FAQEntry.id == faq_id).update(
+            {FAQEntry.hit_count: FAQEntry.hit_count + 1},
+            synchronize_session=False
+        )
+        self.db.commit()
@@ -0,0 +1,204 @@
+"""
+Repositorio para la cola persistente de trabajos del agente.
+"""
+from typing import Optional
+from uuid import UUID
+from datetime import datetime, timedelta
+import uuid
+from sqlalchemy import and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from db.models import AgentJob, JobStatus
+
+
+class JobRepository:
+    """Repositorio para encolar, tomar y cerrar trabajos del agente."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_by_id(self, job_id: UUID) -> Optional[AgentJob]:
+        """Obtiene un trabajo por ID."""
+        return self.db.query(AgentJob).filter(AgentJob.id == job_id).first()
+    
+    def enqueue(self, ticket_id: UUID, message_id: UUID, user_id: UUID) -> AgentJob:
+        """
+        Encola la respuesta del agente a un mensaje del usuario.
+        
+        Args:
+            ticket_id: ID del ticket
+            message_id: Mensaje del usuario al que hay que responder
+            user_id: Usuario dueño del ticket
+        
+        Returns:
+            AgentJob creado
+        """
+        job = AgentJob(
+            ticket_id=ticket_id,
+            message_id=message_id,
+            user_id=user_id
+        )
+        
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        
+        return job
+    
+    def claim_next(self, worker_id: str) -> Optional[AgentJob]:
+        """
+        Toma el siguiente trabajo listo y lo marca como en ejecución.
+        
+        Los trabajos de un mismo ticket se ejecutan de uno en uno y en orden:
+        se salta un trabajo si su ticket tiene otro en ejecución o uno anterior
+        pendiente. FOR UPDATE SKIP LOCKED permite varios workers sin que dos
+        tomen el mismo trabajo.
+        
+        Returns:
+            AgentJob tomado o None si no hay trabajo
+        """
+        now = datetime.utcnow()
+        other = aliased(AgentJob)
+        
+        blocked = (
+            self.db.query(other.id)
+            .filter(other.ticket_id == AgentJob.ticket_id)
+            .filter(other.id != AgentJob.id)
+            .filter(or_(
+                other.status == JobStatus.RUNNING,
+                and_(other.status == JobStatus.PENDING, other.created_at < AgentJob.created_at)
+            ))
+            .exists()
+        )
+        
+        job = (
+            self.db.query(AgentJob)
+            .filter(AgentJob.status == JobStatus.PENDING)
+            .filter(AgentJob.run_after <= now)
+            .filter(~blocked)
+            .order_by(AgentJob.run_after.asc())
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        
+        if job is None:
+            self.db.rollback()
+            return None
+        
+        job.status = JobStatus.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+        
+        self.db.commit()
+        self.db.refresh(job)
+        
+        return job
+    
+    def mark_done(self, job: AgentJob) -> None:
+        """Marca el trabajo como terminado."""
+        job.status = JobStatus.DONE
+        job.finished_at = datetime.utcnow()
+        job.locked_by = None
+        job.locked_at = None
+        self.db.commit()
+    
+    def mark_failed(self, job: AgentJob, error: str, retry_in: Optional[float] = None) -> None:
+        """
+        Registra un fallo del trabajo.
+        
+        Args:
+            job: Trabajo fallido
+            error: Descripción del error
+            retry_in: Segundos hasta el reintento (None = fallo definitivo)
+        """
+        job.last_error = error
+        job.locked_by = None
+        job.locked_at = None
+        
+        if retry_in is None:
+            job.status = JobStatus.FAILED
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = JobStatus.PENDING
+            job.run_after = datetime.utcnow() + timedelta(seconds=retry_in)
+        
+        self.db.commit()
+    
+    def requeue_stale(self, lock_timeout: float) -> int:
+        """
+        Devuelve a la cola los trabajos de workers caídos.
+        
+        Args:
+            lock_timeout: Segundos tras los que un trabajo en ejecución se da por abandonado
+        
+        Returns:
+            Número de trabajos reencolados
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=lock_timeout)
+        
+        count = (
+            self.db.query(AgentJob)
+            .filter(AgentJob.status == JobStatus.RUNNING)
+            .filter(AgentJob.locked_at < cutoff)
+            .update(
+                {
+                    AgentJob.status: JobStatus.PENDING,
+                    AgentJob.locked_by: None,
+                    AgentJob.locked_at: None,
+                    AgentJob.run_after: datetime.utcnow()
+                },
+                synchronize_session=False
+            )
+        )
+        
+        self.db.commit()
+        
+        return count
+    
+    def count_by_status(self) -> dict:
+        """Número de trabajos por estado (para monitorizar la cola)."""
+        rows = (
+            self.db.query(AgentJob.status, func.count(AgentJob.id))
+            .group_by(AgentJob.status)
+            .all()
+        )
+        
+        return {status.value: count for status, count in rows}
+
+
+class AsyncJobRepository:
+    """Encolado y consulta de trabajos desde los endpoints (sesión asíncrona)."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_id(self, job_id: UUID) -> Optional[AgentJob]:
+        """Obtiene un trabajo por ID."""
+        return await self.db.get(AgentJob, job_id)
+    
+    def add(self, ticket_id: UUID, message_id: UUID, user_id: UUID) -> AgentJob:
+        """
+        Añade el trabajo a la transacción en curso, sin hacer commit.
+        
+        Para encolarlo en la misma transacción que guarda el mensaje del
+        usuario. El id se asigna ya, antes del INSERT.
+        """
+        job = AgentJob(
+            id=uuid.uuid4(),
+            ticket_id=ticket_id,
+            message_id=message_id,
+            user_id=user_id
+        )
+        
+        self.db.add(job)
+        
+        return job
+    
+    async def enqueue(self, ticket_id: UUID, message_id: UUID, user_id: UUID) -> AgentJob:
+        """Encola la respuesta del agente a un mensaje del usuario."""
+        job = self.add(ticket_id, message_id, user_id)
+        await self.db.commit()
+        
+        return job
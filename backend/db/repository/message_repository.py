@@ -3,9 +3,27 @@ Repositorio para operaciones de Message en la base de datos.
 """
 from typing import Optional
 from uuid import UUID
+from datetime import datetime
+import uuid
+from sqlalchemy import select, func, literal, true, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from db.models import Message, MessageRole
+from db.models import Message, MessageRole, Ticket
+
+
+def _increment_message_count(ticket_id: UUID):
+    """
+    UPDATE de tickets.message_count para un mensaje nuevo.
+    
+    Se ejecuta en la transacción que inserta el mensaje. updated_at se deja
+    como estaba: añadir un mensaje no es modificar el ticket.
+    """
+    return (
+        update(Ticket)
+        .where(Ticket.id == ticket_id)
+        .values(message_count=Ticket.message_count + 1, updated_at=Ticket.updated_at)
+    )
 
 
 class MessageRepository:
@@ -41,10 +59,11 @@ class MessageRepository:
             ticket_id=ticket_id,
             role=role,
             content=content,
-            metadata=metadata or {}
+            meta_data=metadata or {}
         )
         
         self.db.add(message)
+        self.db.execute(_increment_message_count(ticket_id))
         self.db.commit()
         self.db.refresh(message)
         
@@ -90,21 +109,69 @@ class MessageRepository:
             .all()
         )
     
+    def get_reply_to(self, ticket_id: UUID, message_id: UUID) -> Optional[Message]:
+        """
+        Obtiene la respuesta del agente ya guardada para un mensaje del usuario.
+        
+        El filtro por ticket usa el índice (ticket_id, created_at): solo se
+        revisan los mensajes de ese ticket, no toda la tabla.
+        """
+        return (
+            self.db.query(Message)
+            .filter(Message.ticket_id == ticket_id)
+            .filter(Message.role == MessageRole.ASSISTANT)
+            .filter(Message.meta_data["reply_to"].astext == str(message_id))
+            .first()
+        )
+    
     def count_by_ticket(self, ticket_id: UUID) -> int:
         """Cuenta los mensajes de un ticket."""
         return self.db.query(Message).filter(Message.ticket_id == ticket_id).count()
     
+    def list_conversation_messages(
+        self,
+        ticket_id: UUID,
+        after: Optional[datetime] = None
+    ) -> list[Message]:
+        """
+        Lista los mensajes user/assistant de un ticket en orden cronológico.
+        
+        Args:
+            ticket_id: ID del ticket
+            after: Solo mensajes posteriores a esta fecha (opcional)
+        """
+        query = (
+            self.db.query(Message)
+            .filter(Message.ticket_id == ticket_id)
+            .filter(Message.role.in_([MessageRole.USER, MessageRole.ASSISTANT]))
+        )
+        
+        if after:
+            query = query.filter(Message.created_at > after)
+        
+        return query.order_by(Message.created_at.asc()).all()
+    
     def get_conversation_history(
         self,
         ticket_id: UUID,
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        exclude_message_id: Optional[UUID] = None,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None
     ) -> list[dict]:
         """
         Obtiene el historial de conversación en formato para el agente.
         
+        Con limit se leen los N mensajes más recientes en orden descendente
+        (usa el índice (ticket_id, created_at)) y se devuelven en orden
+        cronológico.
+        
         Args:
             ticket_id: ID del ticket
             limit: Limitar a los últimos N mensajes (opcional)
+            exclude_message_id: Mensaje a excluir (ej: la consulta actual)
+            after: Solo mensajes posteriores a esta fecha (ej: fin del resumen)
+            before: Solo mensajes anteriores a esta fecha (ej: la consulta que se responde)
         
         Returns:
             Lista de mensajes en formato {"role": "user|assistant", "content": "..."}
@@ -113,12 +180,202 @@ class MessageRepository:
             self.db.query(Message)
             .filter(Message.ticket_id == ticket_id)
             .filter(Message.role.in_([MessageRole.USER, MessageRole.ASSISTANT]))
-            .order_by(Message.created_at.asc())
         )
         
+        if exclude_message_id:
+            query = query.filter(Message.id != exclude_message_id)
+        
+        if after:
+            query = query.filter(Message.created_at > after)
+        
+        if before:
+            query = query.filter(Message.created_at < before)
+        
+        query = query.order_by(Message.created_at.desc())
+        
         if limit:
             query = query.limit(limit)
         
         messages = query.all()
+        messages.reverse()
+        
+        return [msg.to_dict() for msg in messages]
+
+
+class AsyncMessageRepository:
+    """Repositorio de mensajes sobre la sesión asíncrona (endpoints)."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_id(self, message_id: UUID) -> Optional[Message]:
+        """Obtiene un mensaje por su ID."""
+        return await self.db.get(Message, message_id)
+    
+    async def add(
+        self,
+        ticket_id: UUID,
+        role: MessageRole,
+        content: str,
+        metadata: Optional[dict] = None
+    ) -> Message:
+        """
+        Añade un mensaje a la transacción en curso, sin hacer commit.
+        
+        Para guardarlo junto con otras filas que dependen de él (el trabajo
+        del agente) en una sola transacción. El id se asigna ya, antes del
+        INSERT.
+        
+        Returns:
+            Message añadido
+        """
+        message = Message(
+            id=uuid.uuid4(),
+            ticket_id=ticket_id,
+            role=role,
+            content=content,
+            meta_data=metadata or {}
+        )
+        
+        self.db.add(message)
+        await self.db.execute(_increment_message_count(ticket_id))
+        
+        return message
+    
+    async def create(
+        self,
+        ticket_id: UUID,
+        role: MessageRole,
+        content: str,
+        metadata: Optional[dict] = None
+    ) -> Message:
+        """
+        Crea un nuevo mensaje.
+        
+        Returns:
+            Message creado
+        """
+        message = await self.add(ticket_id, role, content, metadata)
+        await self.db.commit()
+        
+        return message
+    
+    async def create_user_message(self, ticket_id: UUID, content: str) -> Message:
+        """Crea un mensaje del usuario."""
+        return await self.create(ticket_id, MessageRole.USER, content)
+    
+    async def create_assistant_message(
+        self,
+        ticket_id: UUID,
+        content: str,
+        metadata: Optional[dict] = None
+    ) -> Message:
+        """Crea un mensaje del asistente con metadata opcional."""
+        return await self.create(ticket_id, MessageRole.ASSISTANT, content, metadata)
+    
+    async def create_system_message(self, ticket_id: UUID, content: str) -> Message:
+        """Crea un mensaje del sistema."""
+        return await self.create(ticket_id, MessageRole.SYSTEM, content)
+    
+    async def list_by_ticket(
+        self,
+        ticket_id: UUID,
+        skip: int = 0,
+        limit: int = 1000
+    ) -> list[Message]:
+        """Lista los mensajes de un ticket ordenados cronológicamente."""
+        result = await self.db.execute(
+            select(Message)
+            .where(Message.ticket_id == ticket_id)
+            .order_by(Message.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+    
+    async def list_page(
+        self,
+        ticket_id: UUID,
+        limit: int,
+        before: Optional[tuple[datetime, UUID]] = None,
+        after: Optional[tuple[datetime, UUID]] = None
+    ) -> tuple[list[Message], bool]:
+        """
+        Página de mensajes por keyset sobre (created_at, id).
+        
+        Sin cursores devuelve los `limit` más recientes; con `before`, los
+        anteriores a esa posición; con `after`, los posteriores (solo lo nuevo).
+        Usa el índice (ticket_id, created_at), sin OFFSET.
+        
+        Returns:
+            Tupla de (mensajes en orden cronológico, hay_más_en_esa_dirección)
+        """
+        position = tuple_(Message.created_at, Message.id)
+        
+        def cursor(value: tuple[datetime, UUID]):
+            return tuple_(literal(value[0], Message.created_at.type), literal(value[1], Message.id.type))
+        
+        query = select(Message).where(Message.ticket_id == ticket_id)
+        
+        if after is not None:
+            query = query.where(position > cursor(after)).order_by(Message.created_at.asc(), Message.id.asc())
+        else:
+            if before is not None:
+                query = query.where(position < cursor(before))
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+        
+        # Un elemento de más indica si quedan mensajes sin necesidad de COUNT
+        result = await self.db.execute(query.limit(limit + 1))
+        messages = list(result.scalars().all())
         
-        return [msg.to_dict() for msg in messages]
\ No newline at end of file
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        
+        if after is None:
+            messages.reverse()
+        
+        return messages, has_more
+    
+    async def get_version(self, ticket_id: UUID) -> tuple:
+        """
+        Marcadores de versión del historial para su ETag.
+        
+        Se leen de la fila del ticket (contador desnormalizado) y del último
+        mensaje por el índice (ticket_id, created_at), sin recorrer el
+        historial. Los mensajes no se editan tras guardarse, así que basta
+        con detectar mensajes nuevos.
+        
+        Returns:
+            Tupla de (nº de mensajes, created_at e id del último mensaje)
+        """
+        last_message = (
+            select(Message.created_at, Message.id)
+            .where(Message.ticket_id == ticket_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(1)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(Ticket.message_count, last_message.c.created_at, last_message.c.id)
+            .outerjoin(last_message, true())
+            .where(Ticket.id == ticket_id)
+        )
+        row = result.first()
+        return tuple(row) if row else (0, None, None)
+    
+    async def count_by_ticket(self, ticket_id: UUID) -> int:
+        """Cuenta los mensajes de un ticket."""
+        return await self.db.scalar(
+            select(func.count(Message.id)).where(Message.ticket_id == ticket_id)
+        )
+    
+    async def get_reply_to(self, ticket_id: UUID, message_id: UUID) -> Optional[Message]:
+        """Obtiene la respuesta del agente a un mensaje del usuario (ver MessageRepository.get_reply_to)."""
+        result = await self.db.execute(
+            select(Message)
+            .where(Message.ticket_id == ticket_id)
+            .where(Message.role == MessageRole.ASSISTANT)
+            .where(Message.meta_data["reply_to"].astext == str(message_id))
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
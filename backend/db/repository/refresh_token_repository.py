@@ -0,0 +1,122 @@
+"""
+Repositorio de refresh tokens (rotación y revocación de sesiones).
+"""
+from typing import Optional
+from uuid import UUID
+from datetime import datetime, timedelta
+import uuid
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import RefreshToken
+from core.config import settings
+from core.security import create_refresh_token, hash_refresh_token
+
+
+class AsyncRefreshTokenRepository:
+    """Emite, rota y revoca refresh tokens (sesión asíncrona)."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def _new_token(self, user_id: UUID, family_id: UUID) -> tuple[str, RefreshToken]:
+        raw_token = create_refresh_token()
+        token = RefreshToken(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            token_hash=hash_refresh_token(raw_token),
+            family_id=family_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        self.db.add(token)
+        
+        return raw_token, token
+    
+    async def issue(self, user_id: UUID) -> str:
+        """
+        Emite el refresh token de una sesión nueva (login).
+        
+        Aprovecha para borrar los tokens caducados del usuario, así la tabla
+        crece con las sesiones activas y no con el tiempo.
+        
+        Returns:
+            Token en claro (solo se guarda su hash)
+        """
+        await self.db.execute(
+            delete(RefreshToken)
+            .where(RefreshToken.user_id == user_id)
+            .where(RefreshToken.expires_at < datetime.utcnow())
+        )
+        
+        raw_token, _ = self._new_token(user_id, family_id=uuid.uuid4())
+        await self.db.commit()
+        
+        return raw_token
+    
+    async def rotate(self, raw_token: str) -> Optional[tuple[str, UUID]]:
+        """
+        Canjea un refresh token por otro de la misma familia.
+        
+        Si el token ya estaba revocado (reutilización) se revoca toda la familia.
+        
+        Returns:
+            Tupla de (token nuevo en claro, user_id), o None si el token no es válido
+        """
+        now = datetime.utcnow()
+        
+        # FOR UPDATE: dos peticiones con el mismo token no pueden rotarlo a la vez
+        result = await self.db.execute(
+            select(RefreshToken)
+            .where(RefreshToken.token_hash == hash_refresh_token(raw_token))
+            .with_for_update()
+        )
+        token = result.scalar_one_or_none()
+        
+        if token is None:
+            return None
+        
+        if token.revoked_at is not None:
+            await self._revoke_family(token.family_id, now)
+            await self.db.commit()
+            return None
+        
+        if token.expires_at <= now:
+            await self.db.rollback()
+            return None
+        
+        new_raw_token, new_token = self._new_token(token.user_id, family_id=token.family_id)
+        token.revoked_at = now
+        token.replaced_by = new_token.id
+        
+        user_id = token.user_id
+        await self.db.commit()
+        
+        return new_raw_token, user_id
+    
+    async def revoke(self, raw_token: str) -> bool:
+        """
+        Cierra la sesión del token (revoca su familia).
+        
+        Returns:
+            True si el token existía
+        """
+        result = await self.db.execute(
+            select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(raw_token))
+        )
+        family_id = result.scalar_one_or_none()
+        
+        if family_id is None:
+            return False
+        
+        await self._revoke_family(family_id, datetime.utcnow())
+        await self.db.commit()
+        
+        return True
+    
+    async def _revoke_family(self, family_id: UUID, now: datetime) -> None:
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id)
+            .where(RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
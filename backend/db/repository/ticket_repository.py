@@ -3,10 +3,38 @@ Repositorio para operaciones de Ticket en la base de datos.
 """
 from typing import Optional
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, update, literal, or_, and_, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from datetime import datetime
 
-from db.models import Ticket, TicketStatus, TicketPriority, TicketCategory
+from db.models import Ticket, TicketStatus, TicketPriority, TicketCategory, TicketStatusCounter
+from db.models.ticket import ticket_queued_at
+
+
+def _status_counter_updates(deltas: dict) -> list:
+    """
+    UPDATEs de ticket_status_counters para unos incrementos por estado.
+    
+    Siempre en el mismo orden de estados: dos transacciones que mueven tickets
+    en sentidos opuestos (OPEN → ESCALATED y ESCALATED → OPEN) bloquean las
+    filas en el mismo orden y no se interbloquean.
+    """
+    return [
+        update(TicketStatusCounter)
+        .where(TicketStatusCounter.status == status)
+        .values(count=TicketStatusCounter.count + delta)
+        for status, delta in sorted(deltas.items(), key=lambda item: item[0].value)
+        if delta
+    ]
+
+
+def _status_change_deltas(old_status: TicketStatus, new_status: TicketStatus) -> dict:
+    """Incrementos de los contadores al pasar un ticket de un estado a otro."""
+    if old_status == new_status:
+        return {}
+    
+    return {old_status: -1, new_status: 1}
 
 
 class TicketRepository:
@@ -40,6 +68,10 @@ class TicketRepository:
         )
         
         self.db.add(ticket)
+        
+        for statement in _status_counter_updates({TicketStatus.OPEN: 1}):
+            self.db.execute(statement)
+        
         self.db.commit()
         self.db.refresh(ticket)
         
@@ -56,14 +88,26 @@ class TicketRepository:
         """
         Actualiza un ticket.
         
+        Los contadores por estado se actualizan en la misma transacción. El
+        ticket se lee con FOR UPDATE: dos cambios de estado simultáneos no
+        pueden partir los dos del mismo estado anterior.
+        
         Returns:
             Ticket actualizado o None si no existe.
         """
-        ticket = self.get_by_id(ticket_id)
+        ticket = (
+            self.db.query(Ticket)
+            .filter(Ticket.id == ticket_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
         
         if not ticket:
             return None
         
+        old_status = ticket.status
+        
         if title is not None:
             ticket.title = title
         
@@ -85,6 +129,9 @@ class TicketRepository:
             ticket.category = category
         
         try:
+            for statement in _status_counter_updates(_status_change_deltas(old_status, ticket.status)):
+                self.db.execute(statement)
+            
             self.db.commit()
             self.db.refresh(ticket)
             return ticket
@@ -176,4 +223,341 @@ class TicketRepository:
         if priority:
             query = query.filter(Ticket.priority == priority)
         
-        return query.count()
\ No newline at end of file
+        return query.count()
+    
+    def count_by_status(self) -> dict:
+        """Número de tickets por estado contados sobre la tabla tickets (GROUP BY)."""
+        rows = self.db.query(Ticket.status, func.count(Ticket.id)).group_by(Ticket.status).all()
+        return {status: count for status, count in rows}
+    
+    def get_status_counters(self) -> dict:
+        """Número de tickets por estado según ticket_status_counters."""
+        rows = self.db.query(TicketStatusCounter.status, TicketStatusCounter.count).all()
+        return {status: count for status, count in rows}
+    
+    def rebuild_status_counters(self) -> dict:
+        """
+        Recalcula ticket_status_counters a partir de la tabla tickets.
+        
+        Las filas de contadores se bloquean antes del recuento: las
+        transacciones que ya las habían actualizado terminan antes (y su
+        ticket entra en el recuento) y las demás esperan y aplican su
+        incremento después.
+        
+        Returns:
+            Número de tickets por estado (todos los estados)
+        """
+        counters = {
+            counter.status: counter
+            for counter in self.db.query(TicketStatusCounter).with_for_update().all()
+        }
+        counts = self.count_by_status()
+        
+        try:
+            for status in TicketStatus:
+                if status in counters:
+                    counters[status].count = counts.get(status, 0)
+                else:
+                    self.db.add(TicketStatusCounter(status=status, count=counts.get(status, 0)))
+            
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        return {status: counts.get(status, 0) for status in TicketStatus}
+
+
+class AsyncTicketRepository:
+    """
+    Repositorio de tickets sobre la sesión asíncrona (endpoints).
+    
+    En asyncio no hay lazy loading: nada de lo que se serializa de un ticket
+    necesita sus mensajes (message_count es una columna).
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_id(self, ticket_id: UUID, for_update: bool = False) -> Optional[Ticket]:
+        """Obtiene un ticket por su ID (for_update: bloquea la fila hasta el commit)."""
+        query = select(Ticket).where(Ticket.id == ticket_id)
+        
+        if for_update:
+            # populate_existing: recarga también si el ticket ya estaba en la sesión
+            query = query.with_for_update().execution_options(populate_existing=True)
+        
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+    
+    async def create(
+        self,
+        user_id: UUID,
+        title: str,
+        category: TicketCategory = TicketCategory.GENERAL
+    ) -> Ticket:
+        """
+        Crea un nuevo ticket.
+        
+        Returns:
+            Ticket creado
+        """
+        ticket = Ticket(
+            user_id=user_id,
+            title=title,
+            category=category,
+            status=TicketStatus.OPEN,
+            priority=TicketPriority.MEDIUM,
+            message_count=0,
+        )
+        
+        self.db.add(ticket)
+        
+        for statement in _status_counter_updates({TicketStatus.OPEN: 1}):
+            await self.db.execute(statement)
+        
+        await self.db.commit()
+        
+        return ticket
+    
+    async def update(
+        self,
+        ticket_id: UUID,
+        title: Optional[str] = None,
+        status: Optional[TicketStatus] = None,
+        priority: Optional[TicketPriority] = None,
+        category: Optional[TicketCategory] = None,
+    ) -> Optional[Ticket]:
+        """
+        Actualiza un ticket.
+        
+        Los contadores por estado se actualizan en la misma transacción (ver
+        TicketRepository.update).
+        
+        Returns:
+            Ticket actualizado o None si no existe.
+        """
+        ticket = await self.get_by_id(ticket_id, for_update=True)
+        
+        if not ticket:
+            return None
+        
+        old_status = ticket.status
+        
+        if title is not None:
+            ticket.title = title
+        
+        if status is not None:
+            ticket.status = status
+            
+            # Si se cierra, marcar fecha
+            if status == TicketStatus.CLOSED and not ticket.closed_at:
+                ticket.closed_at = datetime.utcnow()
+            
+            # Si se escala, marcar fecha
+            if status == TicketStatus.ESCALATED and not ticket.escalated_at:
+                ticket.escalated_at = datetime.utcnow()
+        
+        if priority is not None:
+            ticket.priority = priority
+        
+        if category is not None:
+            ticket.category = category
+        
+        try:
+            for statement in _status_counter_updates(_status_change_deltas(old_status, ticket.status)):
+                await self.db.execute(statement)
+            
+            await self.db.commit()
+            return ticket
+        except Exception:
+            await self.db.rollback()
+            return None
+    
+    async def escalate(self, ticket_id: UUID) -> Optional[Ticket]:
+        """Escala un ticket a humano."""
+        return await self.update(ticket_id, status=TicketStatus.ESCALATED)
+    
+    async def close(self, ticket_id: UUID) -> Optional[Ticket]:
+        """Cierra un ticket."""
+        return await self.update(ticket_id, status=TicketStatus.CLOSED)
+    
+    async def list_by_user(
+        self,
+        user_id: UUID,
+        status: Optional[TicketStatus] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> list[Ticket]:
+        """
+        Lista tickets de un usuario con filtros opcionales.
+        
+        Args:
+            user_id: ID del usuario
+            status: Filtrar por estado (opcional)
+            skip: Número de registros a saltar (paginación)
+            limit: Número máximo de registros a retornar
+        """
+        query = select(Ticket).where(Ticket.user_id == user_id)
+        
+        if status:
+            query = query.where(Ticket.status == status)
+        
+        query = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit)
+        
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+    
+    async def count_by_user(self, user_id: UUID, status: Optional[TicketStatus] = None) -> int:
+        """Cuenta tickets de un usuario con filtro opcional de estado."""
+        query = select(func.count(Ticket.id)).where(Ticket.user_id == user_id)
+        
+        if status:
+            query = query.where(Ticket.status == status)
+        
+        return await self.db.scalar(query)
+    
+    async def list_by_status(
+        self,
+        statuses: list,
+        skip: int = 0,
+        limit: int = 100
+    ) -> tuple[list[Ticket], int]:
+        """
+        Lista tickets de cualquier usuario por estado (para operadores).
+        
+        Returns:
+            Tupla de (tickets, total)
+        """
+        condition = Ticket.status.in_(statuses)
+        
+        total = await self.db.scalar(select(func.count(Ticket.id)).where(condition))
+        
+        result = await self.db.execute(
+            select(Ticket)
+            .where(condition)
+            .order_by(Ticket.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        
+        return list(result.scalars().all()), total
+    
+    async def list_queue(
+        self,
+        statuses: list,
+        limit: int,
+        after: Optional[tuple[TicketPriority, datetime, UUID]] = None
+    ) -> tuple[list[Ticket], bool]:
+        """
+        Página de la cola del operador por keyset.
+        
+        Orden: prioridad (urgent primero), antigüedad en la cola (queued_at:
+        escalado o creación, la más antigua primero) e id. Cada estado se lee
+        por separado del índice ix_tickets_operator_queue con su LIMIT y los
+        resultados se mezclan (UNION ALL), así ninguna consulta ordena ni
+        salta más filas que las de la página.
+        
+        Args:
+            statuses: Estados incluidos en la cola
+            limit: Tickets por página
+            after: Posición (prioridad, queued_at, id) del último ticket visto
+        
+        Returns:
+            Tupla de (tickets en orden de la cola, hay_más)
+        """
+        def ordering(ticket):
+            return (ticket.priority.desc(), ticket_queued_at(ticket).asc(), ticket.id.asc())
+        
+        def branch(status: TicketStatus):
+            query = select(Ticket).where(Ticket.status == status)
+            
+            if after is not None:
+                priority, queued_at, ticket_id = after
+                # Prioridad descendente y (queued_at, id) ascendente: no basta una
+                # comparación de tuplas
+                query = query.where(or_(
+                    Ticket.priority < priority,
+                    and_(
+                        Ticket.priority == priority,
+                        tuple_(ticket_queued_at(), Ticket.id)
+                        > tuple_(literal(queued_at, Ticket.created_at.type), literal(ticket_id, Ticket.id.type))
+                    )
+                ))
+            
+            # Un elemento de más indica si quedan tickets sin necesidad de COUNT
+            return query.order_by(*ordering(Ticket)).limit(limit + 1)
+        
+        branches = [branch(status) for status in statuses]
+        queue = aliased(Ticket, (branches[0] if len(branches) == 1 else union_all(*branches)).subquery())
+        
+        result = await self.db.execute(select(queue).order_by(*ordering(queue)).limit(limit + 1))
+        tickets = list(result.scalars().all())
+        
+        return tickets[:limit], len(tickets) > limit
+    
+    async def count_by_status(self) -> dict:
+        """Número de tickets por estado contados sobre la tabla tickets (GROUP BY)."""
+        result = await self.db.execute(
+            select(Ticket.status, func.count(Ticket.id)).group_by(Ticket.status)
+        )
+        return {status: count for status, count in result.all()}
+    
+    async def get_status_counters(self) -> dict:
+        """
+        Número de tickets por estado según ticket_status_counters.
+        
+        Lee una fila por estado: no depende del volumen de tickets.
+        """
+        result = await self.db.execute(select(TicketStatusCounter.status, TicketStatusCounter.count))
+        return {status: count for status, count in result.all()}
+    
+    async def get_version(self, ticket_id: UUID) -> Optional[tuple]:
+        """
+        Marcadores de versión de un ticket para su ETag (una sola consulta).
+        
+        Solo columnas de tickets: la respuesta no incluye los mensajes, solo
+        message_count.
+        
+        Returns:
+            Tupla de (user_id, updated_at, nº de mensajes) o None si no existe
+        """
+        result = await self.db.execute(
+            select(Ticket.user_id, Ticket.updated_at, Ticket.message_count).where(Ticket.id == ticket_id)
+        )
+        row = result.first()
+        return tuple(row) if row else None
+    
+    async def list_version(self, condition) -> tuple:
+        """
+        Marcadores de versión de un listado para su ETag (una sola consulta).
+        
+        Solo agrega columnas de tickets, sin leer la tabla messages.
+        
+        Args:
+            condition: Filtro de los tickets del listado
+        
+        Returns:
+            Tupla de (nº de tickets, última modificación de ticket, nº de mensajes)
+        """
+        result = await self.db.execute(
+            select(
+                func.count(Ticket.id),
+                func.max(Ticket.updated_at),
+                func.coalesce(func.sum(Ticket.message_count), 0),
+            ).where(condition)
+        )
+        return tuple(result.first())
+    
+    async def list_version_by_user(self, user_id: UUID, status: Optional[TicketStatus] = None) -> tuple:
+        """Marcadores de versión de los tickets de un usuario (ver list_version)."""
+        condition = Ticket.user_id == user_id
+        
+        if status:
+            condition = condition & (Ticket.status == status)
+        
+        return await self.list_version(condition)
+    
+    async def list_version_by_status(self, statuses: list) -> tuple:
+        """Marcadores de versión de los tickets por estado (ver list_version)."""
+        return await self.list_version(Ticket.status.in_(statuses))
@@ -0,0 +1,54 @@
+"""
+Repositorio para operaciones de TicketSummary en la base de datos.
+"""
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+from db.models import TicketSummary
+
+
+class TicketSummaryRepository:
+    """Repositorio para gestionar los resúmenes de conversación."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_by_ticket(self, ticket_id: UUID) -> Optional[TicketSummary]:
+        """Obtiene el resumen de un ticket."""
+        return self.db.query(TicketSummary).filter(TicketSummary.ticket_id == ticket_id).first()
+    
+    def upsert(
+        self,
+        ticket_id: UUID,
+        content: str,
+        summarized_until: datetime,
+        summarized_message_count: int
+    ) -> TicketSummary:
+        """
+        Crea o reemplaza el resumen de un ticket.
+        
+        Args:
+            ticket_id: ID del ticket
+            content: Texto del resumen
+            summarized_until: Fecha del último mensaje incluido en el resumen
+            summarized_message_count: Total de mensajes cubiertos por el resumen
+        
+        Returns:
+            TicketSummary actualizado
+        """
+        summary = self.get_by_ticket(ticket_id)
+        
+        if summary is None:
+            summary = TicketSummary(ticket_id=ticket_id)
+            self.db.add(summary)
+        
+        summary.content = content
+        summary.summarized_until = summarized_until
+        summary.summarized_message_count = summarized_message_count
+        
+        self.db.commit()
+        self.db.refresh(summary)
+        
+        return summary
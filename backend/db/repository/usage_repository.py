@@ -0,0 +1,166 @@
+"""
+Repositorio para el registro de consumo de tokens del LLM.
+"""
+from typing import Optional
+from datetime import date
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db.models import LLMUsage, LLMUsageDaily
+
+
+# Columnas por las que se puede agrupar el agregado diario
+USAGE_GROUP_COLUMNS = {
+    "day": LLMUsageDaily.day,
+    "user": LLMUsageDaily.user_id,
+    "category": LLMUsageDaily.category,
+    "model": LLMUsageDaily.model,
+}
+
+
+class UsageRepository:
+    """Repositorio para gestionar el consumo de tokens."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_batch(self, records: list[dict]) -> None:
+        """
+        Inserta un lote de registros y actualiza los agregados diarios.
+
+        Todo ocurre en una única transacción: un INSERT masivo del detalle y
+        un UPSERT por cada clave (día, usuario, categoría, modelo) afectada.
+
+        Args:
+            records: Diccionarios con las columnas de LLMUsage
+        """
+        if not records:
+            return
+
+        # Agrupar en memoria los incrementos de cada clave del agregado
+        deltas: dict[tuple, dict] = {}
+        for record in records:
+            if record.get("user_id") is None:
+                continue
+            key = (record["created_at"].date(), record["user_id"], record["category"], record["model"])
+            delta = deltas.setdefault(key, {
+                "requests": 0, "tokens_prompt": 0, "tokens_completion": 0, "tokens_total": 0
+            })
+            delta["requests"] += 1
+            delta["tokens_prompt"] += record["tokens_prompt"]
+            delta["tokens_completion"] += record["tokens_completion"]
+            delta["tokens_total"] += record["tokens_total"]
+
+        try:
+            self.db.bulk_insert_mappings(LLMUsage, records)
+
+            for (day, user_id, category, model), delta in deltas.items():
+                self._upsert_daily(day, user_id, category, model, delta)
+
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _upsert_daily(self, day: date, user_id, category: str, model: str, delta: dict) -> None:
+        """Suma los incrementos a la fila del agregado (la crea si no existe)."""
+        dialect = self.db.get_bind().dialect.name
+
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+
+            stmt = insert(LLMUsageDaily).values(
+                day=day, user_id=user_id, category=category, model=model, **delta
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["day", "user_id", "category", "model"],
+                set_={
+                    column: getattr(LLMUsageDaily, column) + getattr(stmt.excluded, column)
+                    for column in delta
+                }
+            )
+            self.db.execute(stmt)
+            return
+
+        # Otros motores: lectura con bloqueo + actualización
+        row = (
+            self.db.query(LLMUsageDaily)
+            .filter(
+                LLMUsageDaily.day == day,
+                LLMUsageDaily.user_id == user_id,
+                LLMUsageDaily.category == category,
+                LLMUsageDaily.model == model
+            )
+            .with_for_update()
+            .first()
+        )
+
+        if row is None:
+            self.db.add(LLMUsageDaily(day=day, user_id=user_id, category=category, model=model, **delta))
+        else:
+            for column, value in delta.items():
+                setattr(row, column, getattr(row, column) + value)
+
+    def summarize(
+        self,
+        group_by: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        user_id=None,
+        category: Optional[str] = None,
+        model: Optional[str] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        """
+        Consulta el consumo agregado a partir de los agregados diarios.
+
+        Args:
+            group_by: day, user, category o model
+            start: Primer día incluido (opcional)
+            end: Último día incluido (opcional)
+            user_id: Filtrar por usuario (opcional)
+            category: Filtrar por categoría de ticket (opcional)
+            model: Filtrar por modelo (opcional)
+            limit: Número máximo de filas
+
+        Returns:
+            Filas {"key", "requests", "tokens_prompt", "tokens_completion", "tokens_total"}
+            ordenadas por tokens_total descendente
+        """
+        group_column = USAGE_GROUP_COLUMNS[group_by]
+        tokens_total = func.sum(LLMUsageDaily.tokens_total).label("tokens_total")
+
+        query = self.db.query(
+            group_column.label("key"),
+            func.sum(LLMUsageDaily.requests).label("requests"),
+            func.sum(LLMUsageDaily.tokens_prompt).label("tokens_prompt"),
+            func.sum(LLMUsageDaily.tokens_completion).label("tokens_completion"),
+            tokens_total
+        )
+
+        if start:
+            query = query.filter(LLMUsageDaily.day >= start)
+        if end:
+            query = query.filter(LLMUsageDaily.day <= end)
+        if user_id:
+            query = query.filter(LLMUsageDaily.user_id == user_id)
+        if category:
+            query = query.filter(LLMUsageDaily.category == category)
+        if model:
+            query = query.filter(LLMUsageDaily.model == model)
+
+        rows = query.group_by(group_column).order_by(tokens_total.desc()).limit(limit).all()
+
+        return [
+            {
+                "key": str(row.key),
+                "requests": int(row.requests or 0),
+                "tokens_prompt": int(row.tokens_prompt or 0),
+                "tokens_completion": int(row.tokens_completion or 0),
+                "tokens_total": int(row.tokens_total or 0),
+            }
+            for row in rows
+        ]
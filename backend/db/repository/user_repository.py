@@ -4,11 +4,14 @@ Patrón Repository para separar lógica de negocio del ORM.
 """
 from typing import Optional
 from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from db.models import User
-from core.security import get_password_hash, verify_password
+from core.auth_cache import get_principal_cache
+from core.security import get_password_hash, get_password_hash_async, verify_password, verify_password_async
 
 
 class UserRepository:
@@ -96,6 +99,7 @@ class UserRepository:
         try:
             self.db.commit()
             self.db.refresh(user)
+            get_principal_cache().invalidate(user_id)
             return user
         except Exception:
             self.db.rollback()
@@ -117,6 +121,7 @@ class UserRepository:
         
         try:
             self.db.commit()
+            get_principal_cache().invalidate(user_id)
             return True
         except Exception:
             self.db.rollback()
@@ -128,4 +133,76 @@ class UserRepository:
     
     def count(self) -> int:
         """Cuenta el total de usuarios."""
-        return self.db.query(User).count()
\ No newline at end of file
+        return self.db.query(User).count()
+
+
+class AsyncUserRepository:
+    """Repositorio de usuarios sobre la sesión asíncrona (endpoints)."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_id(self, user_id: UUID) -> Optional[User]:
+        """Obtiene un usuario por su ID."""
+        return await self.db.get(User, user_id)
+    
+    async def get_by_email(self, email: str) -> Optional[User]:
+        """Obtiene un usuario por su email."""
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalar_one_or_none()
+    
+    async def create(self, email: str, password: str, full_name: Optional[str] = None, is_admin: bool = False) -> Optional[User]:
+        """
+        Crea un nuevo usuario.
+        
+        Returns:
+            User creado o None si el email ya existe.
+        """
+        if await self.get_by_email(email):
+            return None
+        
+        try:
+            user = User(
+                email=email,
+                hashed_password=await get_password_hash_async(password),
+                full_name=full_name,
+                is_admin=is_admin,
+                is_active=True,
+            )
+            
+            self.db.add(user)
+            await self.db.commit()
+            
+            return user
+        
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+    
+    async def authenticate(self, email: str, password: str) -> Optional[User]:
+        """
+        Autentica un usuario con email y contraseña.
+        
+        Returns:
+            User si las credenciales son correctas, None en caso contrario.
+        """
+        user = await self.get_by_email(email)
+        
+        if not user or not user.is_active:
+            return None
+        
+        valid, new_hash = await verify_password_async(password, user.hashed_password)
+        
+        if not valid:
+            return None
+        
+        # Coste de bcrypt cambiado: se guarda el hash nuevo (el login no falla si no se puede)
+        if new_hash:
+            user.hashed_password = new_hash
+            try:
+                await self.db.commit()
+            except Exception:
+                await self.db.rollback()
+                await self.db.refresh(user)
+        
+        return user
@@ -0,0 +1,140 @@
+"""
+Servidor falso compatible con la API de OpenAI (/v1/chat/completions).
+
+Sirve para probar la resiliencia del cliente LLM sin gastar tokens reales:
+inyecta latencia, errores HTTP y cuelgues con las probabilidades indicadas.
+
+Uso:
+    python fake_openai_server.py --port 9100 --latency-ms 300 --error-rate 0.3
+
+Y en .env del backend:
+    LLM_BASE_URL=http://localhost:9100/v1
+    OPENAI_API_KEY=fake
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+FAKE_ANSWER = (
+    "Según la documentación AESA, en la subcategoría A2 debes mantener una "
+    "distancia horizontal mínima de 30 metros con personas no participantes, "
+    "que puede reducirse a 5 metros en modo de baja velocidad."
+)
+
+
+def create_app(
+    latency_ms: int = 0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    hang_rate: float = 0.0,
+    hang_seconds: float = 120.0,
+) -> FastAPI:
+    """Crea la app con la configuración de fallos indicada."""
+    app = FastAPI(title="Fake OpenAI")
+    app.state.calls = 0
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": app.state.calls}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.calls += 1
+        body = await request.json()
+
+        if hang_rate and random.random() < hang_rate:
+            await asyncio.sleep(hang_seconds)
+
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+        if error_rate and random.random() < error_rate:
+            return JSONResponse(
+                status_code=error_status,
+                content={"error": {"message": "Fallo inyectado", "type": "server_error"}}
+            )
+
+        model = body.get("model", "fake-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(m.get("content", "")) // 4 for m in body.get("messages", []))
+        words = FAKE_ANSWER.split(" ")
+
+        if body.get("stream"):
+            async def event_stream():
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word if i == 0 else f" {word}"},
+                            "finish_reason": None
+                        }]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(0.01)
+                done = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": FAKE_ANSWER},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(words),
+                "total_tokens": prompt_tokens + len(words)
+            }
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor falso compatible con OpenAI")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Latencia añadida a cada respuesta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de responder con error")
+    parser.add_argument("--error-status", type=int, default=503, help="Código HTTP de los errores inyectados")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Probabilidad de no responder (timeout)")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(
+            latency_ms=args.latency_ms,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            hang_rate=args.hang_rate,
+            hang_seconds=args.hang_seconds,
+        ),
+        host="127.0.0.1",
+        port=args.port
+    )
@@ -40,8 +40,15 @@ if not os.getenv("DATABASE_URL"):
 from db.base import Base, engine
 from db.models.user import User
 from db.models.ticket import Ticket, TicketStatus, TicketPriority, TicketCategory
+from db.models.ticket_counter import TicketStatusCounter
 from db.models.message import Message, MessageRole
 from db.models.document import Document, DocumentType
+from db.models.ticket_summary import TicketSummary
+from db.models.llm_usage import LLMUsage, LLMUsageDaily
+from db.models.faq import FAQEntry
+from db.models.agent_job import AgentJob, JobStatus
+from db.models.rate_limit import RateLimitBucket
+from db.models.refresh_token import RefreshToken
 
 # ───────────────────────────────
 # Función para inicializar la DB
@@ -59,6 +66,16 @@ def init_db():
         for table_name in Base.metadata.tables.keys():
             print(f"   ✓ {table_name}")
         
+        # Contadores por estado (una fila por estado, con los tickets existentes)
+        from db.base import SessionLocal
+        from db.repository.ticket_repository import TicketRepository
+        
+        db = SessionLocal()
+        try:
+            TicketRepository(db).rebuild_status_counters()
+        finally:
+            db.close()
+        
         print("\n🎉 Base de datos inicializada correctamente!")
         print("\n📝 Próximos pasos:")
         print("   1. (Opcional) Crea migraciones con Alembic:")
@@ -2,9 +2,10 @@
 Aplicación principal de FastAPI para Helpdesk AESA A2.
 """
 from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import logging
 import sys
 from pathlib import Path
@@ -14,6 +15,10 @@ backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
 from core.config import settings
+from core.compression import CompressionMiddleware
+from core.metrics import MetricsMiddleware, render_metrics
+from core.rate_limit import RateLimitMiddleware
+from core.responses import FastJSONResponse
 
 # Configurar logging
 logging.basicConfig(
@@ -45,10 +50,41 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Error conectando a ChromaDB: {e}")
     
+    # Difusión de mensajes nuevos a los clientes suscritos
+    from realtime import get_message_broker, register_message_events
+    register_message_events()
+    get_message_broker().bind(asyncio.get_running_loop())
+    
+    message_listener = None
+    if settings.REALTIME_BACKEND == "postgres":
+        from realtime.postgres import PostgresMessageListener
+        message_listener = PostgresMessageListener(get_message_broker())
+        message_listener.start()
+    
+    # Workers de la cola de respuestas dentro de la API (desarrollo)
+    if settings.AGENT_ASYNC_REPLIES and settings.AGENT_WORKER_IN_PROCESS:
+        from agent.jobs import get_agent_worker
+        get_agent_worker().start()
+    
     yield
     
     # Shutdown
     logger.info(f"🛑 Cerrando {settings.PROJECT_NAME}")
+    
+    if settings.AGENT_ASYNC_REPLIES and settings.AGENT_WORKER_IN_PROCESS:
+        from agent.jobs import get_agent_worker
+        get_agent_worker().stop(timeout=settings.LLM_DEADLINE_SECONDS)
+    
+    if message_listener is not None:
+        await message_listener.stop()
+    
+    # Escribir el consumo de tokens pendiente
+    from agent.usage_ledger import get_usage_ledger
+    get_usage_ledger().close()
+    
+    # Cerrar el pool de conexiones asíncronas
+    from db import async_engine
+    await async_engine.dispose()
 
 
 # Crear aplicación FastAPI
@@ -58,8 +94,14 @@ app = FastAPI(
     version="0.1.0",
     debug=settings.DEBUG,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# Límite de peticiones por IP, usuario y endpoints del LLM (429 + Retry-After).
+# Se registra antes que CORS para que las respuestas 429 lleven sus cabeceras.
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -67,8 +109,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
+# Comprimir las respuestas JSON grandes (historiales, listados)
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES)
+
+# Latencia por ruta y status (el más externo: también mide los 429)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -90,6 +141,16 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (latencias, etapas del chat, tokens, pools)."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # Incluir routers
 from api.auth import router as auth_router
 from api.tickets import router as tickets_router
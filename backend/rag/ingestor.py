@@ -12,6 +12,7 @@ sys.path.insert(0, str(backend_dir))
 
 from rag.document_processor import DocumentProcessor
 from rag.vector_store import get_vector_store
+from core.config import settings
 from db import SessionLocal
 from db.models import Document, DocumentType
 from datetime import datetime
@@ -145,6 +146,10 @@ def ingest_documents():
         logger.info(f"   - Chunks totales: {total_chunks}")
         logger.info(f"   - Documentos en ChromaDB: {vector_store.count()}")
         
+        # Publicar el snapshot que comparten los workers de la API
+        if settings.VECTOR_INDEX_SHARED:
+            vector_store.refresh_shared_index()
+        
         # Verificar en la BD
         doc_count = db.query(Document).filter(Document.processed == True).count()
         logger.info(f"   - Documentos en BD: {doc_count}")
@@ -0,0 +1,307 @@
+"""
+Índice vectorial compartido entre workers (ficheros de solo lectura en mmap).
+
+Cada worker de uvicorn tenía su propio PersistentClient de ChromaDB con el
+índice HNSW cargado en su memoria: la RAM del índice se multiplicaba por el
+número de workers y cada uno lo calentaba por separado.
+
+Una fase previa (python -m rag.shared_index, o el primer worker que arranca,
+bajo un lock de fichero) vuelca la colección a un snapshot:
+
+    <VECTOR_INDEX_DIR>/CURRENT             nombre de la versión vigente
+    <VECTOR_INDEX_DIR>/<versión>/
+        manifest.json                      filas, dimensión, espacio, filtros
+        embeddings.npy                     matriz float32 (filas x dim)
+        sq_norms.npy                       |x|² por fila (distancia l2)
+        <clave>.codes.npy                  códigos de los metadatos filtrables
+        ids / documents / metadatas        textos UTF-8 + offsets (.bin/.npy)
+
+Los workers lo abren con mmap: las páginas viven una sola vez en la page
+cache del sistema y se comparten sin copia, así que añadir workers añade CPU
+y no RAM. La búsqueda es exacta (producto matriz-vector con numpy), con el
+mismo espacio de distancia que la colección de ChromaDB; para los pocos miles
+de fragmentos de la documentación AESA tarda menos de un milisegundo.
+
+Las versiones se escriben en un directorio nuevo y se publican cambiando
+CURRENT de forma atómica; los workers detectan el cambio y se reabren. Los
+ficheros antiguos se borran, pero los mmaps abiertos siguen siendo válidos.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+import fcntl
+import json
+import logging
+import mmap
+import os
+import shutil
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Metadatos por los que se puede filtrar sin decodificar cada fila (where)
+FILTER_KEYS = ("document_type",)
+
+# Filas por lote al leer la colección de ChromaDB
+EXPORT_BATCH_SIZE = 1000
+
+
+class _StringTable:
+    """Lista de textos en un .bin (UTF-8 concatenado) con sus offsets en un .npy."""
+
+    def __init__(self, path: Path):
+        self.offsets = np.load(f"{path}.offsets.npy", mmap_mode="r")
+
+        with open(f"{path}.bin", "rb") as f:
+            # mmap de tamaño 0 no está permitido
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __getitem__(self, index: int) -> str:
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self._data[start:end].decode("utf-8")
+
+    @staticmethod
+    def write(path: Path, values: List[str]) -> None:
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+
+        with open(f"{path}.bin", "wb") as f:
+            for i, value in enumerate(values):
+                encoded = value.encode("utf-8")
+                f.write(encoded)
+                offsets[i + 1] = offsets[i] + len(encoded)
+
+        np.save(f"{path}.offsets.npy", offsets)
+
+
+class SharedVectorIndex:
+    """Snapshot de una colección abierto en modo solo lectura (mmap)."""
+
+    def __init__(self, version_dir: Path):
+        self.version = version_dir.name
+        self.manifest = json.loads((version_dir / "manifest.json").read_text())
+        self.space = self.manifest["space"]
+
+        self.embeddings = np.load(version_dir / "embeddings.npy", mmap_mode="r")
+        self.sq_norms = np.load(version_dir / "sq_norms.npy", mmap_mode="r")
+        self.codes = {
+            key: np.load(version_dir / f"{key}.codes.npy", mmap_mode="r")
+            for key in self.manifest["filter_keys"]
+        }
+
+        self.ids = _StringTable(version_dir / "ids")
+        self.documents = _StringTable(version_dir / "documents")
+        self.metadatas = _StringTable(version_dir / "metadatas")
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def _mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Filas que cumplen el filtro (None = todas). KeyError si no se soporta."""
+        if not where:
+            return None
+
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in where.items():
+            if isinstance(value, dict):
+                if list(value) != ["$eq"]:
+                    raise KeyError(key)
+                value = value["$eq"]
+
+            if key not in self.codes:
+                raise KeyError(key)
+
+            value = str(value)
+            vocabulary = self.manifest["filter_keys"][key]
+            if value not in vocabulary:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.codes[key] == vocabulary.index(value)
+
+        return mask
+
+    def search(self, query_embedding: List[float], n_results: int, where: Optional[Dict] = None) -> Dict:
+        """
+        Búsqueda exacta de los vecinos más cercanos.
+
+        Returns:
+            Mismo formato que collection.query de ChromaDB (una consulta)
+
+        Raises:
+            KeyError: Si el filtro usa claves u operadores no indexados
+        """
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        if len(self) == 0:
+            return empty
+
+        mask = self._mask(where)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        dots = self.embeddings @ query
+
+        if self.space == "cosine":
+            norms = np.sqrt(self.sq_norms) * float(np.linalg.norm(query))
+            distances = 1.0 - dots / np.maximum(norms, 1e-12)
+        elif self.space == "ip":
+            distances = 1.0 - dots
+        else:
+            # l2 de ChromaDB/hnswlib: distancia euclídea al cuadrado
+            distances = self.sq_norms - 2.0 * dots + float(query @ query)
+
+        candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        n_results = min(n_results, len(candidates))
+        if n_results == 0:
+            return empty
+
+        candidate_distances = distances[candidates]
+        top = np.argpartition(candidate_distances, n_results - 1)[:n_results]
+        top = top[np.argsort(candidate_distances[top])]
+        rows = candidates[top]
+
+        return {
+            "ids": [[self.ids[row] for row in rows]],
+            "documents": [[self.documents[row] for row in rows]],
+            "metadatas": [[json.loads(self.metadatas[row]) for row in rows]],
+            "distances": [[float(distances[row]) for row in rows]],
+        }
+
+
+def export_collection(collection, index_dir: Path) -> Path:
+    """
+    Vuelca la colección a una versión nueva del snapshot y la publica.
+
+    Returns:
+        Directorio de la versión creada
+    """
+    rows = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+    total = collection.count()
+
+    for offset in range(0, total, EXPORT_BATCH_SIZE):
+        batch = collection.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=EXPORT_BATCH_SIZE,
+            offset=offset
+        )
+        rows["ids"].extend(batch["ids"])
+        rows["documents"].extend(document or "" for document in batch["documents"])
+        rows["metadatas"].extend(metadata or {} for metadata in batch["metadatas"])
+        rows["embeddings"].extend(batch["embeddings"])
+
+    index_dir.mkdir(parents=True, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    tmp_dir = index_dir / f".{version}.tmp"
+    tmp_dir.mkdir()
+
+    embeddings = (
+        np.asarray(rows["embeddings"], dtype=np.float32)
+        if rows["embeddings"]
+        else np.zeros((0, 0), dtype=np.float32)
+    )
+    np.save(tmp_dir / "embeddings.npy", embeddings)
+    np.save(tmp_dir / "sq_norms.npy", np.einsum("ij,ij->i", embeddings, embeddings))
+
+    filter_keys = {}
+    for key in FILTER_KEYS:
+        vocabulary = sorted({str(metadata[key]) for metadata in rows["metadatas"] if key in metadata})
+        codes = np.array(
+            [vocabulary.index(str(metadata[key])) if key in metadata else -1 for metadata in rows["metadatas"]],
+            dtype=np.int32
+        )
+        np.save(tmp_dir / f"{key}.codes.npy", codes)
+        filter_keys[key] = vocabulary
+
+    _StringTable.write(tmp_dir / "ids", rows["ids"])
+    _StringTable.write(tmp_dir / "documents", rows["documents"])
+    _StringTable.write(tmp_dir / "metadatas", [json.dumps(metadata, ensure_ascii=False) for metadata in rows["metadatas"]])
+
+    (tmp_dir / "manifest.json").write_text(json.dumps({
+        "collection": collection.name,
+        "count": len(rows["ids"]),
+        "dimension": int(embeddings.shape[1]) if len(embeddings) else 0,
+        "space": (collection.metadata or {}).get("hnsw:space", "l2"),
+        "filter_keys": filter_keys,
+        "created_at": time.time(),
+    }))
+
+    version_dir = index_dir / version
+    tmp_dir.rename(version_dir)
+    _publish(index_dir, version)
+
+    logger.info(f"✅ Índice compartido {version}: {len(rows['ids'])} fragmentos en {index_dir}")
+
+    return version_dir
+
+
+def _publish(index_dir: Path, version: str) -> None:
+    """Apunta CURRENT a la versión (rename atómico) y borra las anteriores."""
+    pointer = index_dir / "CURRENT.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, index_dir / "CURRENT")
+
+    for path in index_dir.iterdir():
+        if path.is_dir() and path.name != version:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def current_version(index_dir: Path) -> Optional[str]:
+    """Versión publicada del snapshot (None si no hay ninguna)."""
+    try:
+        return (index_dir / "CURRENT").read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def open_index(index_dir: Path) -> Optional[SharedVectorIndex]:
+    """Abre la versión publicada del snapshot, si existe."""
+    version = current_version(index_dir)
+    if version is None:
+        return None
+
+    return SharedVectorIndex(index_dir / version)
+
+
+@contextmanager
+def _build_lock(index_dir: Path):
+    """Lock de fichero entre procesos: un solo proceso genera el snapshot."""
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(index_dir / ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ensure_index(collection, index_dir: Path) -> SharedVectorIndex:
+    """
+    Abre el snapshot y, si falta o no coincide con la colección, lo genera.
+
+    Al arrancar varios workers a la vez solo uno lo genera; el resto espera
+    el lock y se adjunta al resultado.
+    """
+    with _build_lock(index_dir):
+        index = open_index(index_dir)
+        if index is None or len(index) != collection.count() or index.manifest["collection"] != collection.name:
+            index = SharedVectorIndex(export_collection(collection, index_dir))
+
+    return index
+
+
+def rebuild_index(collection, index_dir: Path) -> SharedVectorIndex:
+    """Genera y publica un snapshot nuevo aunque el actual parezca vigente (tras una ingesta)."""
+    with _build_lock(index_dir):
+        return SharedVectorIndex(export_collection(collection, index_dir))
+
+
+if __name__ == "__main__":
+    # Fase previa al arranque de los workers: python -m rag.shared_index
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from rag.vector_store import VectorStore, shared_index_dir
+
+    index = ensure_index(VectorStore(shared=False).collection, shared_index_dir())
+    logger.info(f"📚 Índice compartido listo: {len(index)} fragmentos (versión {index.version})")
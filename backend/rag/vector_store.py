@@ -2,19 +2,39 @@
 Vector Store usando ChromaDB para almacenar embeddings de documentos.
 """
 import chromadb
+from chromadb.utils import embedding_functions
+from pathlib import Path
 from typing import List, Dict, Optional
 import logging
+import time
 
 from core.config import settings
+from core.metrics import observe_stage
 
 logger = logging.getLogger(__name__)
 
 
+def shared_index_dir() -> Path:
+    """Directorio del snapshot compartido entre workers (VECTOR_INDEX_DIR)."""
+    return Path(settings.VECTOR_INDEX_DIR or Path(settings.CHROMA_PERSIST_DIRECTORY) / "shared_index")
+
+
 class VectorStore:
     """Gestiona el almacenamiento y búsqueda de vectores en ChromaDB."""
     
-    def __init__(self):
-        """Inicializa la conexión con ChromaDB."""
+    def __init__(self, shared: Optional[bool] = None):
+        """
+        Inicializa la conexión con ChromaDB.
+        
+        Args:
+            shared: Buscar en el snapshot mmap compartido (por defecto VECTOR_INDEX_SHARED)
+        """
+        # La misma función de embeddings para la colección y para las
+        # consultas contra el snapshot compartido
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.shared_index = None
+        self._shared_checked_at = 0.0
+        
         try:
             # Usar PersistentClient para persistir en disco
             self.client = chromadb.PersistentClient(
@@ -24,7 +44,8 @@ class VectorStore:
             # Crear o obtener colección
             self.collection = self.client.get_or_create_collection(
                 name="aesa_documents",
-                metadata={"description": "Documentos AESA A1/A2/A3"}
+                metadata={"description": "Documentos AESA A1/A2/A3"},
+                embedding_function=self.embedding_function
             )
             
             logger.info(f"✅ ChromaDB conectado. Documentos: {self.collection.count()}")
@@ -32,6 +53,44 @@ class VectorStore:
         except Exception as e:
             logger.error(f"❌ Error conectando a ChromaDB: {e}")
             raise
+        
+        if settings.VECTOR_INDEX_SHARED if shared is None else shared:
+            self._attach_shared_index()
+    
+    def _attach_shared_index(self) -> None:
+        """Se adjunta al snapshot compartido (generándolo si falta o está desfasado)."""
+        from rag.shared_index import ensure_index
+        
+        try:
+            self.shared_index = ensure_index(self.collection, shared_index_dir())
+            self._shared_checked_at = time.monotonic()
+            logger.info(f"📎 Índice compartido {self.shared_index.version} ({len(self.shared_index)} fragmentos, mmap)")
+        except Exception as e:
+            # Sin snapshot se sigue buscando en ChromaDB
+            logger.error(f"❌ Error abriendo el índice compartido: {e}")
+            self.shared_index = None
+    
+    def _reload_shared_index(self) -> None:
+        """Cambia a la versión nueva del snapshot si se ha publicado otra."""
+        from rag.shared_index import current_version, open_index
+        
+        now = time.monotonic()
+        if now - self._shared_checked_at < settings.VECTOR_INDEX_CHECK_SECONDS:
+            return
+        self._shared_checked_at = now
+        
+        try:
+            if current_version(shared_index_dir()) != self.shared_index.version:
+                self.shared_index = open_index(shared_index_dir()) or self.shared_index
+                logger.info(f"🔄 Índice compartido actualizado a {self.shared_index.version}")
+        except Exception as e:
+            logger.error(f"❌ Error recargando el índice compartido: {e}")
+    
+    def refresh_shared_index(self) -> None:
+        """Publica un snapshot nuevo con el contenido actual de la colección (tras una ingesta)."""
+        from rag.shared_index import rebuild_index
+        
+        self.shared_index = rebuild_index(self.collection, shared_index_dir())
     
     def add_documents(
         self,
@@ -80,11 +139,15 @@ class VectorStore:
             }
         """
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where=where
-            )
+            with observe_stage("vector_search"):
+                results = self._search_shared(query, n_results, where)
+                
+                if results is None:
+                    results = self.collection.query(
+                        query_texts=[query],
+                        n_results=n_results,
+                        where=where
+                    )
             
             logger.info(f"🔍 Búsqueda realizada. Resultados: {len(results['documents'][0])}")
             
@@ -98,6 +161,30 @@ class VectorStore:
                 "distances": [[]]
             }
     
+    def _search_shared(self, query: str, n_results: int, where: Optional[Dict]) -> Optional[Dict]:
+        """Busca en el snapshot compartido (None si no hay o el filtro no está indexado)."""
+        if self.shared_index is None:
+            return None
+        
+        self._reload_shared_index()
+        index = self.shared_index
+        
+        try:
+            query_embedding = self.embedding_function([query])[0]
+            return index.search(query_embedding, n_results=n_results, where=where)
+        except KeyError:
+            return None
+    
+    def get_collection(self, name: str, metadata: Optional[Dict] = None):
+        """
+        Obtiene (o crea) otra colección en el mismo cliente de ChromaDB.
+        
+        Args:
+            name: Nombre de la colección
+            metadata: Metadatos de creación (ej: {"hnsw:space": "cosine"})
+        """
+        return self.client.get_or_create_collection(name=name, metadata=metadata)
+    
     def delete_collection(self) -> None:
         """Elimina la colección completa (útil para reset)."""
         try:
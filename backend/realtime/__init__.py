@@ -0,0 +1,16 @@
+"""
+Módulo realtime: difusión de mensajes nuevos a los clientes suscritos.
+"""
+from realtime.broker import (
+    MessageBroker,
+    get_message_broker,
+    register_message_events,
+    serialize_message,
+)
+
+__all__ = [
+    "MessageBroker",
+    "get_message_broker",
+    "register_message_events",
+    "serialize_message",
+]
@@ -0,0 +1,219 @@
+"""
+Difusión en tiempo real de los mensajes nuevos de cada ticket.
+
+Los clientes del chat y del panel de operador se suscriben a un ticket
+(WebSocket o SSE) y reciben cada Message en cuanto se confirma en la BD, en
+lugar de volver a descargar el historial completo.
+
+Los mensajes se crean desde muchos sitios (endpoints asíncronos, generador
+del streaming en el threadpool, workers de la cola en hilos o en otro
+proceso), así que se capturan con eventos de la sesión de SQLAlchemy:
+after_flush serializa los Message nuevos y after_commit los publica; si la
+transacción se deshace no se publica nada.
+
+Backends (REALTIME_BACKEND):
+- memory: el broker de este proceso entrega directamente a sus suscriptores.
+  Vale con un único proceso de API y los workers dentro de él.
+- postgres: cada mensaje se envía con pg_notify dentro de la misma
+  transacción (Postgres lo entrega solo si hay commit) y cada proceso de API
+  lo recibe con LISTEN (ver realtime.postgres) y lo reparte a sus
+  suscriptores. Necesario con varios workers de uvicorn o python -m worker.
+"""
+from collections import defaultdict
+from typing import Dict, Optional, Set
+import asyncio
+import json
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+NOTIFY_CHANNEL = "ticket_messages"
+
+# Límite de pg_notify (8000 bytes); por encima se notifica solo el ID y el
+# listener lee el mensaje de la BD
+NOTIFY_MAX_PAYLOAD = 7500
+
+_PENDING_KEY = "realtime_pending_messages"
+
+
+class MessageBroker:
+    """
+    Pub/sub en memoria de los mensajes de cada ticket.
+
+    Los suscriptores son colas asyncio del event loop de la API. publish se
+    puede llamar desde cualquier hilo: la entrega se agenda en el loop.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.published = 0
+        self.disconnected = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Fija el event loop en el que viven los suscriptores."""
+        self._loop = loop
+
+    def subscribe(self, ticket_id: str) -> asyncio.Queue:
+        """
+        Suscribe al ticket. Debe llamarse desde el event loop.
+
+        Returns:
+            Cola con los mensajes (dict) del ticket; None indica que el
+            suscriptor se ha quedado atrás y debe reconectar
+        """
+        self._loop = asyncio.get_running_loop()
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[str(ticket_id)].add(queue)
+        return queue
+
+    def unsubscribe(self, ticket_id: str, queue: asyncio.Queue) -> None:
+        """Elimina una suscripción. Debe llamarse desde el event loop."""
+        subscribers = self._subscribers.get(str(ticket_id))
+        if subscribers is None:
+            return
+
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[str(ticket_id)]
+
+    def publish(self, ticket_id: str, message: Dict) -> None:
+        """Publica un mensaje del ticket (desde cualquier hilo)."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self.deliver(str(ticket_id), message)
+        else:
+            loop.call_soon_threadsafe(self.deliver, str(ticket_id), message)
+
+    def deliver(self, ticket_id: str, message: Dict) -> None:
+        """Entrega un mensaje a los suscriptores locales (en el event loop)."""
+        self.published += 1
+
+        for queue in list(self._subscribers.get(ticket_id, ())):
+            if queue.full():
+                # Cliente lento: se corta su suscripción y reconecta con el
+                # cursor `after` en lugar de acumular eventos sin límite
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(ticket_id, queue)
+                self.disconnected += 1
+                continue
+
+            queue.put_nowait(message)
+
+    def has_subscribers(self, ticket_id: str) -> bool:
+        """Indica si hay clientes suscritos al ticket en este proceso."""
+        return bool(self._subscribers.get(str(ticket_id)))
+
+    def get_stats(self) -> Dict:
+        """Retorna suscripciones activas y mensajes entregados."""
+        return {
+            "backend": settings.REALTIME_BACKEND,
+            "tickets": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "disconnected_slow": self.disconnected,
+        }
+
+
+def serialize_message(message) -> Dict:
+    """Serializa un Message con el mismo formato que la API (MessageResponse)."""
+    from schemas import MessageResponse
+
+    return MessageResponse.model_validate(message).model_dump(mode="json")
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    from db.models import Message
+
+    new_messages = [obj for obj in session.new if isinstance(obj, Message)]
+    if not new_messages:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, [])
+
+    for message in new_messages:
+        data = serialize_message(message)
+
+        if settings.REALTIME_BACKEND == "postgres":
+            payload = json.dumps({"ticket_id": data["ticket_id"], "message": data}, ensure_ascii=False)
+            if len(payload.encode("utf-8")) > NOTIFY_MAX_PAYLOAD:
+                payload = json.dumps({"ticket_id": data["ticket_id"], "message_id": data["id"]})
+
+            # NOTIFY es transaccional: Postgres lo entrega al hacer commit
+            session.connection().execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": NOTIFY_CHANNEL, "payload": payload}
+            )
+        else:
+            pending.append(data)
+
+
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    broker = get_message_broker()
+    for data in pending:
+        broker.publish(data["ticket_id"], data)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_events_registered = False
+
+def register_message_events() -> None:
+    """
+    Registra los eventos de sesión que publican los mensajes nuevos.
+
+    Se llama al arrancar la API y los workers. Cubre las sesiones síncronas y
+    las asíncronas (AsyncSession usa una Session por debajo).
+    """
+    global _events_registered
+
+    if _events_registered:
+        return
+
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    _events_registered = True
+
+    logger.info(f"✅ Difusión de mensajes en tiempo real ({settings.REALTIME_BACKEND})")
+
+
+# Instancia global del broker
+_message_broker = None
+
+def get_message_broker() -> MessageBroker:
+    """
+    Dependency para obtener el broker de mensajes de este proceso.
+    Usa singleton pattern.
+    """
+    global _message_broker
+
+    if _message_broker is None:
+        _message_broker = MessageBroker(queue_size=settings.REALTIME_QUEUE_SIZE)
+
+    return _message_broker
@@ -0,0 +1,109 @@
+"""
+Listener de Postgres (LISTEN/NOTIFY) para REALTIME_BACKEND=postgres.
+
+Cada proceso de API mantiene una conexión asyncpg dedicada escuchando el
+canal de mensajes y reparte las notificaciones a los suscriptores de su
+broker local. Si la conexión se cae se reconecta; lo notificado mientras
+tanto se pierde, pero los clientes recuperan el hueco al reconectar con el
+cursor `after`.
+"""
+from typing import Optional
+import asyncio
+import json
+import logging
+from uuid import UUID
+
+from core.config import settings
+from realtime.broker import NOTIFY_CHANNEL, MessageBroker, serialize_message
+
+logger = logging.getLogger(__name__)
+
+
+RECONNECT_DELAY_SECONDS = 5.0
+
+
+def _listen_dsn() -> str:
+    """DATABASE_URL en el formato que acepta asyncpg (sin el driver)."""
+    url = settings.async_database_url
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class PostgresMessageListener:
+    """Escucha NOTIFY del canal de mensajes y los entrega al broker local."""
+
+    def __init__(self, broker: MessageBroker):
+        self.broker = broker
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Arranca la escucha en el event loop actual."""
+        self.broker.bind(asyncio.get_running_loop())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Detiene la escucha y cierra la conexión."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(_listen_dsn())
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda conn: closed.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+
+                logger.info(f"✅ Escuchando mensajes nuevos en el canal {NOTIFY_CHANNEL}")
+                await closed.wait()
+                logger.warning("⚠️ Conexión LISTEN cerrada, reconectando...")
+
+            except asyncio.CancelledError:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+                raise
+
+            except Exception as e:
+                logger.error(f"❌ Error en LISTEN {NOTIFY_CHANNEL}: {e}")
+
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning(f"⚠️ Notificación inválida en {channel}")
+            return
+
+        ticket_id = data["ticket_id"]
+        if not self.broker.has_subscribers(ticket_id):
+            return
+
+        if "message" in data:
+            self.broker.deliver(ticket_id, data["message"])
+        else:
+            # Mensaje demasiado grande para NOTIFY: se lee de la BD
+            asyncio.create_task(self._deliver_by_id(ticket_id, data["message_id"]))
+
+    async def _deliver_by_id(self, ticket_id: str, message_id: str) -> None:
+        from db import AsyncSessionLocal
+        from db.repository import AsyncMessageRepository
+
+        try:
+            async with AsyncSessionLocal() as db:
+                message = await AsyncMessageRepository(db).get_by_id(UUID(message_id))
+        except Exception as e:
+            logger.error(f"❌ Error leyendo el mensaje notificado {message_id}: {e}")
+            return
+
+        if message is not None:
+            self.broker.deliver(ticket_id, serialize_message(message))
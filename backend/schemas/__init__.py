@@ -9,6 +9,7 @@ from schemas.user import (
     UserInDB,
     Token,
     TokenData,
+    RefreshRequest,
 )
 from schemas.ticket import (
     TicketCreate,
@@ -20,6 +21,13 @@ from schemas.message import (
     MessageCreate,
     MessageResponse,
     ChatHistoryResponse,
+    AgentJobResponse,
+)
+from schemas.faq import (
+    FAQSource,
+    FAQCreate,
+    FAQUpdate,
+    FAQResponse,
 )
 
 __all__ = [
@@ -31,6 +39,7 @@ __all__ = [
     "UserInDB",
     "Token",
     "TokenData",
+    "RefreshRequest",
     # Ticket
     "TicketCreate",
     "TicketUpdate",
@@ -40,4 +49,10 @@ __all__ = [
     "MessageCreate",
     "MessageResponse",
     "ChatHistoryResponse",
+    "AgentJobResponse",
+    # FAQ
+    "FAQSource",
+    "FAQCreate",
+    "FAQUpdate",
+    "FAQResponse",
 ]
\ No newline at end of file
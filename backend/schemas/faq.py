@@ -0,0 +1,51 @@
+"""
+Schemas Pydantic para las preguntas frecuentes (FAQ).
+"""
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+from uuid import UUID
+from typing import Optional
+
+from db.models import TicketCategory
+
+
+class FAQSource(BaseModel):
+    """Fuente citada en una respuesta de FAQ."""
+    source: str = Field(..., min_length=1)
+    document_type: Optional[str] = None
+    excerpt: Optional[str] = None
+
+
+class FAQBase(BaseModel):
+    """Schema base para FAQ."""
+    question: str = Field(..., min_length=5)
+    answer: str = Field(..., min_length=1)
+    keywords: list[str] = []
+    sources: list[FAQSource] = []
+    category: Optional[TicketCategory] = None
+
+
+class FAQCreate(FAQBase):
+    """Schema para crear una FAQ."""
+    pass
+
+
+class FAQUpdate(BaseModel):
+    """Schema para actualizar una FAQ."""
+    question: Optional[str] = Field(None, min_length=5)
+    answer: Optional[str] = Field(None, min_length=1)
+    keywords: Optional[list[str]] = None
+    sources: Optional[list[FAQSource]] = None
+    category: Optional[TicketCategory] = None
+    is_active: Optional[bool] = None
+
+
+class FAQResponse(FAQBase):
+    """Schema de respuesta de FAQ."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    is_active: bool
+    hit_count: int
+    created_at: datetime
+    updated_at: datetime
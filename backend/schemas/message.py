@@ -6,7 +6,7 @@ from datetime import datetime
 from uuid import UUID
 from typing import Optional
 
-from db.models import MessageRole
+from db.models import MessageRole, JobStatus
 
 
 class MessageBase(BaseModel):
@@ -40,4 +40,16 @@ class ChatHistoryResponse(BaseModel):
     """Schema para historial de chat de un ticket."""
     ticket_id: UUID
     messages: list[MessageResponse]
-    total_messages: int
\ No newline at end of file
+    total_messages: Optional[int] = None  # Solo en la primera página (sin cursores)
+    has_more: bool = False  # Quedan mensajes en la dirección pedida
+    before_cursor: Optional[str] = None  # Para cargar mensajes anteriores
+    after_cursor: Optional[str] = None  # Para pedir solo los mensajes nuevos
+
+class AgentJobResponse(BaseModel):
+    """Schema del estado de una respuesta del agente en diferido."""
+    id: UUID
+    status: JobStatus
+    attempts: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    reply: Optional[MessageResponse] = None
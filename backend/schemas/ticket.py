@@ -45,7 +45,7 @@ class TicketInDB(TicketBase):
 
 class TicketResponse(TicketInDB):
     """Schema de respuesta pública de ticket."""
-    message_count: int = 0  # Será calculado
+    message_count: int = 0  # Columna denormalizada de tickets
 
 
 class TicketListResponse(BaseModel):
@@ -53,4 +53,19 @@ class TicketListResponse(BaseModel):
     tickets: list[TicketResponse]
     total: int
     page: int
-    page_size: int
\ No newline at end of file
+    page_size: int
+
+
+class OperatorQueueTicket(TicketResponse):
+    """Ticket de la cola del operador con su estado de SLA."""
+    queued_at: datetime  # Escalado o, si no lo hubo, creación
+    sla_due_at: Optional[datetime] = None
+    sla_breached: bool = False
+
+
+class OperatorQueueResponse(BaseModel):
+    """Schema de una página de la cola del operador (paginación por cursor)."""
+    tickets: list[OperatorQueueTicket]
+    total: int  # Tickets en los estados de la cola
+    has_more: bool = False
+    next_cursor: Optional[str] = None  # Para pedir la página siguiente
\ No newline at end of file
@@ -50,6 +50,13 @@ class Token(BaseModel):
     """Schema de token JWT."""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Segundos de validez del access token
+
+
+class RefreshRequest(BaseModel):
+    """Schema para renovar el access token o cerrar la sesión."""
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -0,0 +1,8 @@
+"""
+Configuración de pytest: los módulos del backend se importan como en la app.
+"""
+import sys
+from pathlib import Path
+
+# Añadir el directorio backend al path para imports relativos
+sys.path.insert(0, str(Path(__file__).parent.parent))
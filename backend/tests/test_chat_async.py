@@ -0,0 +1,89 @@
+"""
+Envío de mensajes con respuestas del agente en diferido (api/chat.py).
+
+Necesita la base de datos de DATABASE_URL con las migraciones aplicadas; si no
+está disponible los tests se omiten.
+"""
+import uuid
+from uuid import UUID
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from core.config import settings
+from db import get_async_db
+from db.base import SessionLocal, engine
+from db.models import AgentJob, JobStatus, Message
+
+
+@pytest.fixture(scope="module")
+def database():
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("Base de datos no disponible")
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    monkeypatch.setattr(settings, "AGENT_ASYNC_REPLIES", True)
+
+    # Sin pool: cada petición del TestClient corre en su propio event loop
+    test_engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
+    session_factory = async_sessionmaker(test_engine, expire_on_commit=False, autoflush=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    try:
+        # Sin "with": no arranca el lifespan (ni el worker en proceso)
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+
+
+@pytest.fixture
+def auth_headers(client):
+    email = f"chat-{uuid.uuid4().hex[:12]}@example.com"
+    password = "password-de-prueba"
+
+    response = client.post("/api/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_send_message_async_persists_message_and_job(client, auth_headers):
+    response = client.post("/api/tickets/", json={"title": "Registro de dron"}, headers=auth_headers)
+    assert response.status_code == 201
+    ticket_id = response.json()["id"]
+
+    response = client.post(
+        f"/api/chat/{ticket_id}/messages",
+        json={"content": "¿Tengo que registrar un dron de 300 g?"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    message = response.json()
+    job_id = message["meta_data"]["agent_job_id"]
+
+    with SessionLocal() as db:
+        job = db.get(AgentJob, UUID(job_id))
+        assert job is not None
+        assert job.message_id == UUID(message["id"])
+        assert job.ticket_id == UUID(ticket_id)
+        assert job.status == JobStatus.PENDING
+
+        stored = db.get(Message, UUID(message["id"]))
+        assert stored.meta_data == {"agent_job_id": job_id}
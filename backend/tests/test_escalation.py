@@ -0,0 +1,50 @@
+"""
+Reglas de escalado por términos (agent/escalation.py).
+"""
+import pytest
+
+from agent.escalation import REASON_LEGAL, EscalationClassifier
+
+
+@pytest.fixture
+def classifier():
+    return EscalationClassifier()
+
+
+@pytest.mark.parametrize("query", [
+    "Me han puesto una multa",
+    "Me han puesto dos multas",
+    "Me han multado por volar en un parque",
+    "He tenido varios accidentes con el dron",
+    "¿Qué sanciones hay?",
+    "Me han sancionado",
+    "Tengo un expediente sancionador abierto",
+    "me denunciaron por volar cerca de casa",
+    "Quiero demandar al fabricante",
+    "¿Necesito abogados?",
+    "Presenté un recurso de alzada",
+])
+def test_check_query_escalates_legal_terms_and_inflections(classifier, query):
+    assert classifier.check_query(query) == REASON_LEGAL
+
+
+@pytest.mark.parametrize("query", [
+    "¿Es legal volar en la playa?",
+    "¿Qué distancia debo mantener de las personas?",
+    "Sin perjuicio de lo anterior, ¿qué peso máximo admite la A2?",
+])
+def test_check_query_ignores_regulatory_questions(classifier, query):
+    assert classifier.check_query(query) is None
+
+
+@pytest.mark.parametrize("answer", [
+    "Las sanciones por volar sin registro incluyen multas de hasta 225.000 €.",
+    "Volar sobre aglomeraciones es ilegal en la subcategoría A2.",
+    "Tras un accidente debes notificarlo a AESA.",
+])
+def test_check_answer_escalates_legal_answers(classifier, answer):
+    assert classifier.check_answer(answer) == REASON_LEGAL
+
+
+def test_check_answer_accepts_plain_answer(classifier):
+    assert classifier.check_answer("Debes mantener 30 metros de distancia horizontal con personas.") is None
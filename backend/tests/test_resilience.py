@@ -0,0 +1,63 @@
+"""
+Circuit breaker y reintentos de las llamadas al LLM (agent/resilience.py).
+"""
+import pytest
+
+from agent.resilience import CircuitBreaker, LLMUnavailableError, call_with_retries
+
+
+class ProviderDown(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _call(fn, breaker):
+    return call_with_retries(
+        fn,
+        breaker,
+        is_retryable=lambda e: isinstance(e, ProviderDown),
+        max_retries=0,
+        timeout=1.0,
+        deadline=5.0,
+        base_delay=0.0,
+        max_delay=0.0,
+    )
+
+
+def _provider_down(timeout):
+    raise ProviderDown()
+
+
+def _bad_request(timeout):
+    raise BadRequest()
+
+
+def test_non_retryable_error_does_not_reset_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    with pytest.raises(LLMUnavailableError):
+        _call(_provider_down, breaker)
+    with pytest.raises(BadRequest):
+        _call(_bad_request, breaker)
+    with pytest.raises(LLMUnavailableError):
+        _call(_provider_down, breaker)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_non_retryable_error_releases_half_open_probe_without_closing():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+
+    with pytest.raises(LLMUnavailableError):
+        _call(_provider_down, breaker)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    with pytest.raises(BadRequest):
+        _call(_bad_request, breaker)
+
+    # Sigue a prueba y se puede volver a probar
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
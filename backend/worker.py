@@ -0,0 +1,63 @@
+"""
+Worker de la cola de respuestas del agente.
+
+Uso:
+    python -m worker
+
+Toma los trabajos encolados por POST /api/chat/{ticket_id}/messages, genera
+la respuesta del agente y la guarda en el ticket. Se pueden lanzar tantos
+procesos como se quiera (los trabajos se reparten con SKIP LOCKED).
+"""
+import logging
+import signal
+import sys
+from pathlib import Path
+
+# Añadir el directorio backend al path para imports relativos
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from core.config import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    from agent.jobs import AgentWorker
+    from agent.usage_ledger import get_usage_ledger
+    from realtime import register_message_events
+    
+    # Notificar a la API los mensajes que guarde el worker (REALTIME_BACKEND=postgres)
+    register_message_events()
+    
+    worker = AgentWorker(
+        concurrency=settings.AGENT_WORKER_CONCURRENCY,
+        poll_interval=settings.AGENT_WORKER_POLL_SECONDS
+    )
+    
+    def shutdown(signum, frame):
+        logger.info("🛑 Señal recibida, terminando los trabajos en curso...")
+        worker.stop(timeout=settings.LLM_DEADLINE_SECONDS)
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    # Métricas de las etapas y tokens de este proceso (Prometheus)
+    if settings.METRICS_ENABLED and settings.METRICS_WORKER_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(settings.METRICS_WORKER_PORT)
+        logger.info(f"📈 Métricas en el puerto {settings.METRICS_WORKER_PORT}")
+    
+    worker.start()
+    worker.wait()
+    
+    # Escribir el consumo de tokens pendiente
+    get_usage_ledger().close()
+
+
+if __name__ == "__main__":
+    main()